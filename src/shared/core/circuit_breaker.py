@@ -0,0 +1,104 @@
+import time
+
+from loguru import logger as log
+
+from src.shared.core.redis_service import RedisService
+
+# Атомарно увеличивает счетчик подряд идущих ошибок и размыкает цепь при достижении порога.
+# Ошибка в half-open (пробный запрос) сразу размыкает цепь заново.
+RECORD_FAILURE_SCRIPT = """
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+if failures >= tonumber(ARGV[1]) or redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[2])
+    redis.call('DEL', KEYS[2])
+end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return failures
+"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для каналов доставки с состоянием в Redis (общим для всех воркеров).
+
+    - closed: запросы идут в канал; подряд идущие ошибки считаются.
+    - open: после `failure_threshold` ошибок канал пропускается `reset_timeout` секунд.
+    - half-open: по истечении таймаута ровно один воркер получает право на пробный запрос;
+      успех замыкает цепь, ошибка снова размыкает.
+
+    При недоступности Redis канал считается доступным (fail-open).
+    """
+
+    STATE_OPEN = "open"
+
+    def __init__(
+        self,
+        redis_service: RedisService,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        failure_window: int = 300,
+        key_prefix: str = "circuit",
+    ):
+        self.redis = redis_service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_window = failure_window
+        self.key_prefix = key_prefix
+
+    def _state_key(self, channel: str) -> str:
+        return f"{self.key_prefix}:{channel}"
+
+    def _probe_key(self, channel: str) -> str:
+        return f"{self.key_prefix}:{channel}:probe"
+
+    async def allow_request(self, channel: str) -> bool:
+        """Можно ли сейчас отправлять через канал."""
+        state = await self.redis.get_all_hash(self._state_key(channel))
+        if not state or state.get("state") != self.STATE_OPEN:
+            return True
+
+        opened_at = float(state.get("opened_at", 0))
+        if time.time() - opened_at < self.reset_timeout:
+            return False
+
+        # half-open: пробный запрос разрешается только одному воркеру
+        probe_ttl = max(int(self.reset_timeout), 1)
+        allowed = await self.redis.set_value_if_not_exists(self._probe_key(channel), "1", ttl=probe_ttl)
+        if allowed is None:
+            # Ошибка Redis: пробный запрос не согласовать, канал считается доступным (fail-open)
+            log.warning(f"CircuitBreaker | action=probe status=failed channel={channel} reason='Redis error'")
+            return True
+        if allowed:
+            log.info(f"CircuitBreaker | action=probe channel={channel} state=half_open")
+        return allowed
+
+    async def record_success(self, channel: str) -> None:
+        """Успешная отправка: сбрасывает счетчик ошибок и замыкает цепь."""
+        state_key = self._state_key(channel)
+        probe_key = self._probe_key(channel)
+
+        def builder(pipe):
+            pipe.hget(state_key, "state")
+            pipe.delete(state_key, probe_key)
+
+        results = await self.redis.execute_pipeline(builder)
+        if results and results[0] == self.STATE_OPEN:
+            log.info(f"CircuitBreaker | action=close channel={channel}")
+
+    async def record_failure(self, channel: str) -> None:
+        """Ошибка отправки: при достижении порога размыкает цепь для всех воркеров."""
+        ttl = max(self.failure_window, int(self.reset_timeout) * 2)
+        failures = await self.redis.run_script(
+            RECORD_FAILURE_SCRIPT,
+            [self._state_key(channel), self._probe_key(channel)],
+            [self.failure_threshold, time.time(), ttl],
+        )
+        if failures is not None and int(failures) == self.failure_threshold:
+            log.warning(f"CircuitBreaker | action=open channel={channel} failures={failures}")
+
+    async def record_result(self, channel: str, success: bool) -> None:
+        """Фиксирует результат отправки через канал."""
+        if success:
+            await self.record_success(channel)
+        else:
+            await self.record_failure(channel)
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from urllib.parse import quote_plus
 
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # Определяем корень проекта
@@ -27,11 +28,28 @@ class CommonSettings(BaseSettings):
     # --- Redis Keys ---
     redis_site_settings_key: str = "site_settings_hash"
 
+    # --- Redis Streams ---
+    # Количество партиций стрима bot_events (1 = один ключ, как раньше)
+    redis_stream_partitions: int = 1
+
     # --- Logging ---
+    # ВНИМАНИЕ: при DEBUG=True (не production) консоль не маскируется — в выводе видны
+    # телефоны, email, пароли и токены. Консольный вывод dev-окружения нельзя пересылать и сохранять.
+    # Файлы логов маскируются всегда
     log_level_console: str = "DEBUG"
     log_level_file: str = "DEBUG"
     log_rotation: str = "10 MB"
     log_dir: str = "logs"
+    # Сэмплирование DEBUG-записей в файле: компонент (начало сообщения, "RedisHash | ...") или модуль -> 1 из N.
+    # WARNING и выше пишутся всегда
+    log_debug_sample_rates: dict[str, int] = Field(
+        default_factory=lambda: dict.fromkeys(
+            ("RedisHash", "RedisString", "RedisList", "RedisKey", "RedisJSON", "RedisZSet", "RedisSet", "RedisStream"),
+            10,
+        )
+    )
+    # Повторы одинаковой ошибки в пределах окна (секунды) сворачиваются в счетчик; 0 — без подавления
+    log_error_burst_window: float = 60.0
 
     # --- System ---
     system_user_id: int = 2_000_000_000
@@ -1,3 +1,39 @@
+import zlib
+from typing import Any
+
+
+class ArqQueues:
+    """
+    Имена очередей ARQ.
+    Транзакционные уведомления (подтверждения, отмены) не должны ждать за массовыми рассылками.
+    """
+
+    # Очередь ARQ по умолчанию — все существующие продюсеры продолжают работать без изменений
+    TRANSACTIONAL = "arq:queue"
+    # Массовые рассылки (re-engagement и т.п.) — обрабатываются отдельным пулом воркеров
+    BULK = "arq:queue:bulk"
+
+    ALL = (TRANSACTIONAL, BULK)
+
+
+class NotificationProviders:
+    """Внешние провайдеры доставки уведомлений (ключи rate limit и метрик)."""
+
+    SMTP = "smtp"
+    SENDGRID = "sendgrid"
+    TWILIO = "twilio"
+
+
+class NotificationChannels:
+    """Каналы доставки уведомлений (у каждого свой circuit breaker)."""
+
+    SMTP = "smtp"
+    SENDGRID = "sendgrid"
+    WHATSAPP_TEMPLATE = "whatsapp_template"
+    WHATSAPP = "whatsapp"
+    SMS = "sms"
+
+
 class RedisStreams:
     """
     Константы для Redis Streams.
@@ -11,8 +47,70 @@ class RedisStreams:
         GROUP = "bot_group"
         # Префикс для имени потребителя (добавляется hostname или uuid)
         CONSUMER_PREFIX = "bot_instance_"
+        # Стрим для событий, исчерпавших все попытки повторной обработки
+        DEAD_LETTER = "bot_events:dead_letter"
 
     # Пример будущего стрима
     # class EmailEvents:
     #     NAME = "email_events"
     #     GROUP = "email_workers"
+
+    DEAD_LETTER_SUFFIX = ":dead_letter"
+
+    @staticmethod
+    def dead_letter_name(stream_name: str) -> str:
+        """Имя dead-letter стрима для указанного стрима."""
+        return f"{stream_name}{RedisStreams.DEAD_LETTER_SUFFIX}"
+
+    @staticmethod
+    def partition_name(stream_name: str, index: int, partitions: int) -> str:
+        """
+        Имя ключа партиции стрима.
+        При одной партиции используется исходное имя (обратная совместимость).
+        """
+        if partitions <= 1:
+            return stream_name
+        return f"{stream_name}:{index}"
+
+    @staticmethod
+    def partition_names(stream_name: str, partitions: int) -> list[str]:
+        """Имена всех партиций стрима."""
+        return [RedisStreams.partition_name(stream_name, i, partitions) for i in range(max(partitions, 1))]
+
+    # Поля события, из которых берется ключ маршрутизации (в порядке приоритета)
+    ROUTING_KEY_FIELDS = ("appointment_id", "request_id", "id")
+
+    @staticmethod
+    def routing_key(data: dict[str, Any]) -> str | None:
+        """
+        Ключ маршрутизации события: id записи или заявки.
+        Один и тот же для исходной отправки и для повторных (requeue), поэтому порядок событий сохраняется.
+        """
+        for field in RedisStreams.ROUTING_KEY_FIELDS:
+            value = data.get(field)
+            if value not in (None, ""):
+                return str(value)
+        return None
+
+    @staticmethod
+    def partition_index(routing_key: str | int, partitions: int) -> int:
+        """
+        Номер партиции для ключа маршрутизации (например, id записи).
+        Используется crc32, а не hash(): результат стабилен между процессами.
+        """
+        if partitions <= 1:
+            return 0
+        return zlib.crc32(str(routing_key).encode("utf-8")) % partitions
+
+    @staticmethod
+    def owned_partitions(stream_name: str, partitions: int, member_index: int, members_count: int) -> list[str]:
+        """
+        Партиции, которые обслуживает конкретный экземпляр потребителя.
+        Партиции распределяются по кругу: i % members_count == member_index.
+        """
+        members_count = max(members_count, 1)
+        return [
+            RedisStreams.partition_name(stream_name, i, partitions)
+            for i in range(max(partitions, 1))
+            if i % members_count == member_index % members_count
+        ]
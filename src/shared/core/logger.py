@@ -1,51 +1,364 @@
+import atexit
+import itertools
+import json
 import logging
+import os
 import re
 import sys
+import threading
+import time
+import traceback
+import zipfile
+from collections.abc import Callable
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from loguru import logger
 
 from src.shared.core.config import CommonSettings
+from src.shared.core.tracing import TRACE_ID_FIELD, get_trace_id
 
 if TYPE_CHECKING:
     from types import FrameType
 
 
+# Телефоны (РФ/Германия/Международные): +49 176 12345678 -> +49 176 *** 78
+_PHONE_PATTERN = r"(?P<phone_head>\+?\d{1,3}[\s-]?\d{3})[\s-]?\d{3,}[\s-]?(?P<phone_tail>\d{2,4})"
+# Email: user@example.com -> u***@example.com
+_EMAIL_PATTERN = r"(?P<email_head>[a-zA-Z0-9_.+-])[a-zA-Z0-9_.+-]*+@(?P<email_domain>[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)"
+# Значения ключей: password=value, "token": "value", secret: value
+# Только имена секретов: общие слова вроде "key" (ключ Redis) не маскируются
+_SENSITIVE_KEYS = ("password", "token", "secret", "api_key", "authorization", "cookie", "session_id")
+_SENSITIVE_KEY_FIRST_CHARS = "".join(sorted({char for key in _SENSITIVE_KEYS for char in (key[0], key[0].upper())}))
+_SECRET_PATTERN = (
+    rf"(?=[{_SENSITIVE_KEY_FIRST_CHARS}])"  # Дешевая проверка первой буквы перед перебором ключей
+    rf"(?P<secret_key>(?i:{'|'.join(_SENSITIVE_KEYS)}))"
+    r'(?P<secret_sep>[\s:=("\']*+)'  # Разделители, в том числе кавычки (password='value'); "*+": "=" не уходит в значение
+    r'[^\s,;}"\']{4,}'  # Само значение (минимум 4 символа, чтобы не маскировать пустые или слишком короткие)
+)
+
+# Правила объединяются в одно выражение (текст просматривается за один проход). Выражения собраны заранее
+# для каждого набора правил: в него входят только правила, которые могут сработать на данном тексте
+_MASKING_PATTERNS = {
+    (phone, email, secret): re.compile(
+        "|".join(
+            pattern
+            for enabled, pattern in ((phone, _PHONE_PATTERN), (email, _EMAIL_PATTERN), (secret, _SECRET_PATTERN))
+            if enabled
+        )
+    )
+    for phone, email, secret in itertools.product((False, True), repeat=3)
+    if phone or email or secret
+}
+_DIGIT = re.compile(r"\d")
+
+# Флаг записи: сообщение уже замаскировано (маскирование выполняется один раз на запись, а не на каждый sink)
+_MASKED_FLAG = "masked"
+# Решение ErrorBurstFilter для записи (принимается один раз для всех sink'ов)
+_BURST_DECISION = "burst_decision"
+# Поле extra итоговой записи ErrorBurstFilter (число подавленных повторов): такие записи не подавляются
+_BURST_SUMMARY = "burst_summary"
+# Готовая JSON-строка записи (подставляется в формат sink'а)
+_JSON_FIELD = "json"
+
+
+def _mask_match(match: re.Match[str]) -> str:
+    # Последняя закрытая именованная группа определяет сработавшее правило
+    rule = match.lastgroup
+    if rule == "phone_tail":
+        return f"{match['phone_head']} *** {match['phone_tail']}"
+    if rule == "email_domain":
+        return f"{match['email_head']}***@{match['email_domain']}"
+    return f"{match['secret_key']}{match['secret_sep']}***"
+
+
 def mask_sensitive_data(text: str) -> str:
     """
     Маскирует чувствительные данные в тексте (телефоны, email, пароли, токены).
+    Текст без цифр, "@" и ключевых слов возвращается без запуска регулярного выражения.
     """
     if not isinstance(text, str):
         return text
 
-    # 1. Маскируем телефоны (РФ/Германия/Международные)
-    # Пример: +49 176 12345678 -> +49 176 *** 5678
-    phone_pattern = r"(\+?\d{1,3}[\s-]?\d{3})[\s-]?\d{3,}[\s-]?(\d{2,4})"
-    text = re.sub(phone_pattern, r"\1 *** \2", text)
-
-    # 2. Маскируем Email
-    # Пример: user@example.com -> u***@example.com
-    email_pattern = r"([a-zA-Z0-9_.+-])[a-zA-Z0-9_.+-]*@([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)"
-    text = re.sub(email_pattern, r"\1***@\2", text)
-
-    # 3. Маскируем значения ключей (password, token, secret, key, api_key)
-    # Ищет паттерны типа password=value, "token": "value", secret: value
-    sensitive_keys_pattern = (
-        r"(?i)(password|token|secret|api_key|key|authorization|cookie|session_id)"
-        r'([\s:=("]*)'  # Разделители
-        r'([^\s,;}"\']{4,})'  # Само значение (минимум 4 символа, чтобы не маскировать пустые или слишком короткие)
-    )
-    text = re.sub(sensitive_keys_pattern, r"\1\2***", text)
+    phone = _DIGIT.search(text) is not None
+    email = "@" in text
+    lowered = text.lower()
+    secret = any(key in lowered for key in _SENSITIVE_KEYS)
+    if not (phone or email or secret):
+        return text
+    return _MASKING_PATTERNS[phone, email, secret].sub(_mask_match, text)
+
+
+def masking_filter(record) -> bool:
+    """
+    Фильтр loguru для sink'ов, которым нужны замаскированные сообщения.
+    Маскирует сообщение записи (один раз для всех таких sink'ов) и пропускает запись.
+    Sink'и без маскирования должны добавляться раньше — они получают исходное сообщение.
+    """
+    if not record.get(_MASKED_FLAG):
+        record["message"] = mask_sensitive_data(record["message"])
+        record[_MASKED_FLAG] = True
+    return True
+
+
+class DebugSamplingFilter:
+    """
+    Фильтр loguru: из DEBUG-записей (и ниже) компонента пропускается 1 из N.
+    Компонент — начало сообщения до пробела ("RedisHash | action=..." -> "RedisHash") или имя модуля записи.
+    Записи уровня INFO и выше и компоненты без настроенной частоты пропускаются всегда.
+    """
+
+    def __init__(self, sample_rates: dict[str, int]):
+        self.sample_rates = {prefix: rate for prefix, rate in sample_rates.items() if rate > 1}
+        self._counters = {prefix: itertools.count() for prefix in self.sample_rates}
+
+    def __call__(self, record) -> bool:
+        if not self.sample_rates or record["level"].no >= logging.INFO:
+            return True
+        prefix = record["message"].partition(" ")[0]
+        rate = self.sample_rates.get(prefix)
+        if rate is None:
+            prefix = record["name"]
+            rate = self.sample_rates.get(prefix)
+            if rate is None:
+                return True
+        return next(self._counters[prefix]) % rate == 0
+
+
+class ErrorBurstFilter:
+    """
+    Фильтр loguru: подавление повторов одинаковых ошибок (уровень и текст сообщения).
+    Первая ошибка пишется сразу, повторы в пределах `window` секунд отбрасываются и считаются;
+    первый повтор после окна пишется с числом подавленных записей (extra["suppressed_repeats"])
+    и открывает новое окно.
+
+    Если повторов после окна нет, счетчик не теряется: по таймеру в конце окна и при остановке
+    процесса (flush) пишется запись с тем же сообщением и extra["suppressed_repeats"].
+
+    Решение принимается один раз на запись, поэтому один экземпляр можно подключить к нескольким sink'ам.
+    """
+
+    def __init__(self, window: float, max_tracked: int = 1000):
+        self.window = window
+        self.max_tracked = max_tracked
+        # (уровень, сообщение) -> [начало окна, подавлено в окне]
+        self._bursts: dict[tuple[str, str], list[float | int]] = {}
+        self._lock = threading.Lock()
+        # Таймер записи счетчиков истекших окон (запускается только при подавлении)
+        self._timer: threading.Timer | None = None
+
+    def __call__(self, record) -> bool:
+        if self.window <= 0 or record["level"].no < logging.ERROR or record["extra"].get(_BURST_SUMMARY):
+            return True
+        decision = record.get(_BURST_DECISION)
+        if decision is None:
+            decision = record[_BURST_DECISION] = self._decide(record)
+        return decision
+
+    def _decide(self, record) -> bool:
+        key = (record["level"].name, record["message"])
+        now = record["time"].timestamp()
+        with self._lock:
+            burst = self._bursts.get(key)
+            if burst is None or now - burst[0] >= self.window:
+                suppressed = int(burst[1]) if burst else 0
+                if burst is None and len(self._bursts) >= self.max_tracked:
+                    # Ограничение памяти: старые окна сбрасываются целиком
+                    self._bursts.clear()
+                self._bursts[key] = [now, 0]
+            else:
+                burst[1] += 1
+                self._schedule_flush(burst[0] + self.window - now)
+                return False
+
+        if suppressed:
+            record["extra"]["suppressed_repeats"] = suppressed
+        return True
+
+    def flush(self, expired_only: bool = False) -> None:
+        """
+        Пишет накопленные счетчики подавленных повторов (отдельной записью на каждое сообщение)
+        и закрывает их окна. `expired_only` — только окна, время которых истекло.
+        """
+        now = time.time()
+        with self._lock:
+            pending = []
+            for key, burst in list(self._bursts.items()):
+                if burst[1] and (not expired_only or now - burst[0] >= self.window):
+                    pending.append((key, int(burst[1])))
+                    del self._bursts[key]
+            next_window = min((burst[0] for burst in self._bursts.values() if burst[1]), default=None)
+            if next_window is not None:
+                self._schedule_flush(next_window + self.window - now)
+
+        for (level, message), suppressed in pending:
+            logger.bind(**{_BURST_SUMMARY: True, "suppressed_repeats": suppressed}).log(level, message)
+
+    def _schedule_flush(self, delay: float) -> None:
+        # Вызывается под self._lock
+        if self._timer is None:
+            self._timer = threading.Timer(max(delay, 0.0), self._flush_expired)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_expired(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.flush(expired_only=True)
+
 
-    return text
+# Фильтр повторов ошибок, подключенный последним вызовом setup_logging
+_error_burst_filter: ErrorBurstFilter | None = None
 
 
-def masking_patcher(record):
+def flush_suppressed_errors() -> None:
     """
-    Патчер для loguru, который маскирует сообщение перед выводом.
+    Дописывает в лог накопленные счетчики подавленных повторов ошибок.
+    Вызывается при остановке сервиса (и через atexit): дочерние процессы multiprocessing
+    завершаются без atexit, поэтому shutdown сервиса вызывает функцию явно.
     """
-    record["message"] = mask_sensitive_data(record["message"])
+    if _error_burst_filter is not None:
+        _error_burst_filter.flush()
+
+
+atexit.register(flush_suppressed_errors)
+
+
+# Ограничения размера записи JSON-лога: длинные значения и traceback обрезаются
+MAX_LOG_VALUE_LENGTH = 2048
+MAX_LOG_TRACEBACK_LENGTH = 8192
+
+# Сообщение "Component | key=value key='value with spaces'": компонент -> event, пары -> поля
+_EVENT_SEPARATOR = " | "
+_LOG_FIELD = re.compile(r"""(?P<key>\w+)=(?P<value>'[^']*'|"[^"]*"|.*?)(?=\s+\w+=|\s*$)""")
+
+
+def _truncate(value: str, limit: int = MAX_LOG_VALUE_LENGTH) -> str:
+    return value if len(value) <= limit else value[:limit] + "…"
+
+
+def _mask_field(key: str, value: str, masked: bool = False) -> str:
+    # Значение чувствительного поля (password, smtp_password, auth_token) скрывается целиком всегда —
+    # даже если сообщение уже прошло masking_filter; остальные значения проверяются правилами маскирования,
+    # если этого еще не сделал фильтр (masked)
+    if key.lower().endswith(_SENSITIVE_KEYS):
+        return "***"
+    return value if masked else mask_sensitive_data(value)
+
+
+class JsonLogFormatter:
+    """
+    Формат loguru для файлов: одна компактная JSON-строка на запись со стабильной схемой
+    {timestamp, level, service, source, event, message, trace_id, fields, exception}.
+
+    Сообщения вида "Component | key=value ..." разбираются на event и поля, и маскирование применяется
+    к значениям полей, а не ко всему сообщению. Поля extra (bind/contextualize) попадают в fields.
+    Вместо объектов исключения пишутся тип, текст и обрезанный traceback — размер записи ограничен.
+    """
+
+    def __init__(self, service: str):
+        self.service = service
+
+    def __call__(self, record) -> str:
+        # Запись сериализуется один раз для всех sink'ов с этим форматом
+        if _JSON_FIELD not in record:
+            record[_JSON_FIELD] = self.serialize(record)
+        return "{" + _JSON_FIELD + "}\n"
+
+    def serialize(self, record) -> str:
+        masked = bool(record.get(_MASKED_FLAG))
+        message = record["message"]
+        event, fields, text = self._parse_message(message, masked)
+
+        extra = record["extra"]
+        for key, value in extra.items():
+            if key == TRACE_ID_FIELD:
+                continue
+            if isinstance(value, str):
+                value = _mask_field(key, _truncate(value))
+            elif not isinstance(value, int | float | bool) and value is not None:
+                value = _mask_field(key, _truncate(str(value)))
+            fields[key] = value
+
+        payload: dict[str, Any] = {
+            "timestamp": record["time"].isoformat(timespec="milliseconds"),
+            "level": record["level"].name,
+            "service": self.service,
+            "source": f"{record['name']}:{record['function']}:{record['line']}",
+            "event": event,
+            "message": text,
+            "trace_id": extra.get(TRACE_ID_FIELD) or get_trace_id(),
+            "fields": fields,
+            "exception": self._format_exception(record["exception"]),
+        }
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def _parse_message(self, message: str, masked: bool) -> tuple[str | None, dict[str, Any], str | None]:
+        event, separator, rest = message.partition(_EVENT_SEPARATOR)
+        if separator:
+            fields = self._parse_fields(rest, masked)
+            if fields:
+                return event, fields, None
+
+        # Неструктурированное сообщение пишется целиком
+        text = _truncate(message)
+        return None, {}, text if masked else mask_sensitive_data(text)
+
+    @staticmethod
+    def _parse_fields(text: str, masked: bool) -> dict[str, Any] | None:
+        """Поля "key=value ..."; None, если текст не состоит только из пар key=value."""
+        fields: dict[str, Any] = {}
+        position = 0
+        for match in _LOG_FIELD.finditer(text):
+            if text[position : match.start()].strip():
+                return None
+            key, value = match["key"], match["value"]
+            if len(value) > 1 and value[0] in "'\"" and value[-1] == value[0]:
+                value = value[1:-1]
+            value = _truncate(value)
+            fields[key] = _mask_field(key, value, masked)
+            position = match.end()
+        if text[position:].strip():
+            return None
+        return fields
+
+    @staticmethod
+    def _format_exception(exception) -> dict[str, str] | None:
+        if exception is None or exception.type is None:
+            return None
+        formatted = "".join(traceback.format_exception(exception.type, exception.value, exception.traceback))
+        return {
+            "type": exception.type.__name__,
+            "value": mask_sensitive_data(_truncate(str(exception.value))),
+            "traceback": mask_sensitive_data(formatted[-MAX_LOG_TRACEBACK_LENGTH:]),
+        }
+
+
+def chain_filters(*filters: Callable[..., bool]) -> Callable[..., bool]:
+    """Последовательное применение фильтров loguru: запись проходит, если ее пропустили все."""
+    return lambda record: all(record_filter(record) for record_filter in filters)
+
+
+def _zip_log_file(path: str) -> None:
+    archive_path = f"{path}.zip"
+    try:
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, arcname=os.path.basename(path))
+        os.remove(path)
+    except OSError as e:
+        sys.stderr.write(f"LoggerSetup | action=compress status=failed path='{path}' error={e}\n")
+
+
+def compress_in_background(path: str) -> None:
+    """
+    Сжатие ротированного файла лога в zip в отдельном потоке.
+    Поток записи логов не ждет архивации и продолжает разбирать очередь.
+    При завершении интерпретатора новый поток не запустить — файл сжимается сразу.
+    """
+    try:
+        threading.Thread(target=_zip_log_file, args=(path,), name="log-compression").start()
+    except RuntimeError:
+        _zip_log_file(path)
 
 
 class InterceptHandler(logging.Handler):
@@ -72,30 +385,38 @@ class InterceptHandler(logging.Handler):
         )
 
 
-def setup_logging(settings: CommonSettings, service_name: str) -> None:
+def setup_logging(
+    settings: CommonSettings, service_name: str, process_index: int | None = None, enqueue: bool = True
+) -> None:
     """
-    Настраивает loguru с маскированием данных.
+    Настраивает loguru: консоль (текст) и файлы debug/errors (JSON) с маскированием данных
+    (в файлах всегда, в консоли — в production).
 
     Args:
         settings: Объект настроек (CommonSettings или наследник).
         service_name: Имя сервиса ('backend' или '02_telegram_bot').
                       Используется для создания подпапки в логах.
+        process_index: Номер процесса при запуске нескольких процессов сервиса (супервизор):
+                       у каждого процесса свои файлы (debug_1.log), общий файл ротировали бы все процессы сразу.
+        enqueue: Запись файлов через очередь loguru. Процесс, который делает fork (супервизор), передает False:
+                 loguru не останавливает унаследованные после fork очереди в дочернем процессе (logger.remove()
+                 пропускает их, так как pid отличается), и дочерний процесс держал бы их открытыми.
     """
     logger.remove()
 
-    # Применяем маскирование ко всем логам через patcher
-    logger.configure(patcher=masking_patcher)
-
     # Формируем пути к логам: logs/backend/debug.log или logs/02_telegram_bot/debug.log
     base_log_dir = Path(settings.log_dir) / service_name
+    suffix = f"_{process_index}" if process_index is not None else ""
 
-    log_file_debug = base_log_dir / "debug.log"
-    log_file_errors = base_log_dir / "errors.json"
+    log_file_debug = base_log_dir / f"debug{suffix}.log"
+    log_file_errors = base_log_dir / f"errors{suffix}.json"
 
-    # Консольный вывод (общий формат)
+    # Консольный вывод (общий формат). Маскируется только в production:
+    # при разработке в консоли нужны исходные данные (в файлах данные маскируются всегда)
     logger.add(
         sink=sys.stdout,
         level=settings.log_level_console.upper(),
+        filter=masking_filter if settings.is_production else None,
         colorize=True,
         format=(
             "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
@@ -106,22 +427,36 @@ def setup_logging(settings: CommonSettings, service_name: str) -> None:
         ),
     )
 
-    # Файл debug
+    # Файлы пишутся через очередь (enqueue=True): запись и ротация выполняются в фоновом потоке loguru,
+    # сжатие ротированного файла — в отдельном потоке, поэтому event loop не ждет диск и архивацию.
+    # Без event loop (супервизор) очередь не нужна
+
+    # Повторы одной ошибки сворачиваются в обоих файлах (общий экземпляр — одно решение на запись)
+    global _error_burst_filter
+    error_burst_filter = _error_burst_filter = ErrorBurstFilter(settings.log_error_burst_window)
+    # Оба файла — JSON-строки одной схемы; маскирование выполняет формат (по полям записи)
+    json_formatter = JsonLogFormatter(service_name)
+
+    # Файл debug (частые DEBUG-записи сэмплируются)
     logger.add(
         sink=str(log_file_debug),
+        enqueue=enqueue,
         level=settings.log_level_file.upper(),
+        filter=chain_filters(DebugSamplingFilter(settings.log_debug_sample_rates), error_burst_filter),
         rotation=settings.log_rotation,
-        compression="zip",
-        format="{time} | {level: <8} | {name}:{function}:{line} - {message}",
+        compression=compress_in_background,
+        format=json_formatter,
     )
 
-    # Файл errors (JSON)
+    # Файл errors
     logger.add(
         sink=str(log_file_errors),
+        enqueue=enqueue,
         level="ERROR",
-        serialize=True,
+        filter=error_burst_filter,
         rotation=settings.log_rotation,
-        compression="zip",
+        compression=compress_in_background,
+        format=json_formatter,
     )
 
     # Перехват стандартного logging
@@ -140,4 +475,4 @@ def setup_logging(settings: CommonSettings, service_name: str) -> None:
     logging.getLogger("aiosqlite").setLevel(logging.INFO)
     logging.getLogger("arq").setLevel(logging.INFO)
 
-    logger.info(f"LoggerSetup | service={service_name} status=success path='{base_log_dir}'")
+    logger.info(f"LoggerSetup | service={service_name} status=success path='{log_file_debug}'")
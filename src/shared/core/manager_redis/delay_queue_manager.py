@@ -0,0 +1,168 @@
+import json
+import time
+from typing import Any
+
+from loguru import logger as log
+
+from ..redis_service import RedisService
+
+# Атомарно забирает готовые элементы за один вызов: переносит их из очереди в ZSET `<name>:processing`
+# (score — время, до которого элемент "занят"), payload остается в HASH до подтверждения (ACK_SCRIPT).
+# Несколько воркеров могут опрашивать одну очередь — каждый элемент достанется только одному.
+# Элементы, не подтвержденные до истечения visibility timeout (воркер упал или был остановлен посреди пачки),
+# возвращаются в очередь; NX — не перезаписывает время, если элемент успели запланировать заново.
+CLAIM_DUE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[3], id)
+    redis.call('ZADD', KEYS[1], 'NX', ARGV[1], id)
+end
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local result = {}
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    local payload = redis.call('HGET', KEYS[2], id)
+    if payload then
+        redis.call('ZADD', KEYS[3], ARGV[3], id)
+        table.insert(result, id)
+        table.insert(result, payload)
+    end
+end
+return result
+"""
+
+# Подтверждает обработку элемента: убирает его из processing и удаляет payload,
+# если элемент не был запланирован заново, пока обрабатывался
+ACK_SCRIPT = """
+local removed = redis.call('ZREM', KEYS[1], ARGV[1])
+if not redis.call('ZSCORE', KEYS[2], ARGV[1]) then
+    redis.call('HDEL', KEYS[3], ARGV[1])
+end
+return removed
+"""
+
+# Возвращает забранные, но не обработанные элементы в очередь (остановка воркера посреди пачки)
+RELEASE_SCRIPT = """
+local released = 0
+for i = 2, #ARGV do
+    if redis.call('ZREM', KEYS[1], ARGV[i]) == 1 then
+        redis.call('ZADD', KEYS[2], 'NX', ARGV[1], ARGV[i])
+        released = released + 1
+    end
+end
+return released
+"""
+
+
+class DelayQueueManager:
+    """
+    Очередь отложенных задач на Redis Sorted Set.
+
+    - ZSET `<name>`: id элемента -> время запуска (unix timestamp), вставка O(log n).
+    - HASH `<name>:payloads`: id элемента -> JSON с описанием действия.
+    - ZSET `<name>:processing`: забранные элементы -> время, после которого они возвращаются в очередь,
+      если обработка не подтверждена (`ack`). Элемент не теряется при падении или остановке воркера.
+
+    Повторное планирование с тем же id перезаписывает время и payload,
+    поэтому id вида `reminder:<appointment_id>` делает планирование идемпотентным.
+    """
+
+    KIND_JOB = "job"
+    KIND_EVENT = "event"
+
+    def __init__(self, redis_service: RedisService, queue_name: str, visibility_timeout: float = 60.0):
+        self.redis = redis_service
+        self.queue_key = queue_name
+        self.payloads_key = f"{queue_name}:payloads"
+        self.processing_key = f"{queue_name}:processing"
+        self.dead_letter_key = f"{queue_name}:dead_letter"
+        self.visibility_timeout = visibility_timeout
+
+    async def schedule(self, item_id: str, run_at: float, payload: dict[str, Any]) -> bool:
+        """Планирует элемент на время `run_at` (unix timestamp). Забранный элемент снова становится запланированным."""
+        payload_json = json.dumps(payload)
+
+        def builder(pipe):
+            pipe.hset(self.payloads_key, item_id, payload_json)
+            pipe.zadd(self.queue_key, {item_id: run_at})
+            pipe.zrem(self.processing_key, item_id)
+
+        results = await self.redis.execute_pipeline(builder)
+        return bool(results)
+
+    async def schedule_job(self, item_id: str, run_at: float, function: str, **kwargs: Any) -> bool:
+        """Планирует постановку задачи ARQ `function(**kwargs)` на время `run_at`."""
+        return await self.schedule(item_id, run_at, {"kind": self.KIND_JOB, "function": function, "kwargs": kwargs})
+
+    async def schedule_event(self, item_id: str, run_at: float, stream_name: str, data: dict[str, Any]) -> bool:
+        """Планирует запись события `data` в стрим `stream_name` на время `run_at`."""
+        return await self.schedule(item_id, run_at, {"kind": self.KIND_EVENT, "stream": stream_name, "data": data})
+
+    async def cancel(self, item_id: str) -> bool:
+        """Отменяет запланированный элемент."""
+
+        def builder(pipe):
+            pipe.zrem(self.queue_key, item_id)
+            pipe.hdel(self.payloads_key, item_id)
+            pipe.zrem(self.processing_key, item_id)
+
+        results = await self.redis.execute_pipeline(builder)
+        return bool(results and results[0])
+
+    async def claim_due(self, batch_size: int = 100, now: float | None = None) -> list[tuple[str, dict[str, Any]]]:
+        """
+        Забирает из очереди до `batch_size` элементов, время которых наступило.
+        Каждый элемент нужно подтвердить (`ack`), запланировать заново или перенести в dead-letter —
+        иначе через `visibility_timeout` он вернется в очередь.
+        """
+        now = time.time() if now is None else now
+        raw = await self.redis.run_script(
+            CLAIM_DUE_SCRIPT,
+            [self.queue_key, self.payloads_key, self.processing_key],
+            [now, batch_size, now + self.visibility_timeout],
+        )
+        if not raw:
+            return []
+
+        items: list[tuple[str, dict[str, Any]]] = []
+        for item_id, payload_json in zip(raw[::2], raw[1::2], strict=True):
+            try:
+                items.append((str(item_id), json.loads(payload_json)))
+            except json.JSONDecodeError:
+                log.error(f"DelayQueue | action=claim status=skipped reason='Invalid payload' item_id='{item_id}'")
+                await self.ack(str(item_id))
+        return items
+
+    async def ack(self, item_id: str) -> bool:
+        """Подтверждает обработку забранного элемента."""
+        removed = await self.redis.run_script(
+            ACK_SCRIPT, [self.processing_key, self.queue_key, self.payloads_key], [item_id]
+        )
+        return bool(removed)
+
+    async def release(self, item_ids: list[str], now: float | None = None) -> int:
+        """Возвращает забранные, но не обработанные элементы в очередь сразу, не дожидаясь visibility timeout."""
+        if not item_ids:
+            return 0
+        now = time.time() if now is None else now
+        released = await self.redis.run_script(RELEASE_SCRIPT, [self.processing_key, self.queue_key], [now, *item_ids])
+        return int(released or 0)
+
+    async def dead_letter(self, item_id: str, payload: dict[str, Any], reason: str) -> bool:
+        """
+        Переносит элемент, который не удалось доставить, в `<name>:dead_letter` (id -> payload и причина)
+        и подтверждает его обработку.
+        """
+        payload_json = json.dumps({**payload, "_dead_letter_reason": reason, "_dead_letter_at": time.time()})
+
+        def builder(pipe):
+            pipe.hset(self.dead_letter_key, item_id, payload_json)
+
+        results = await self.redis.execute_pipeline(builder)
+        if results:
+            await self.ack(item_id)
+        return bool(results)
+
+    async def size(self) -> int:
+        """Количество запланированных элементов."""
+        return await self.redis.zset_count(self.queue_key)
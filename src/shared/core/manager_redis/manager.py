@@ -1,29 +1,84 @@
+import itertools
 from typing import Any
 
+from ..constants import RedisStreams
 from ..redis_service import RedisService
+from ..tracing import TRACE_ID_FIELD, get_trace_id
 
 
 class StreamManager:
     """
     Менеджер для работы с Redis Streams.
     Использует публичные методы RedisService.
+
+    Стримы из `partitioned_streams` разбиваются на N партиций (`<name>:<i>`).
+    Событие попадает в партицию по ключу маршрутизации (RedisStreams.routing_key: id записи или заявки),
+    поэтому порядок событий одной записи сохраняется, в том числе при повторной отправке.
     """
 
-    def __init__(self, redis_service: RedisService):
+    def __init__(self, redis_service: RedisService, partitioned_streams: dict[str, int] | None = None):
         self.redis = redis_service
+        self.partitioned_streams = {name: n for name, n in (partitioned_streams or {}).items() if n > 1}
+        # Для событий без ключа маршрутизации — равномерное распределение по кругу
+        self._round_robin = itertools.count()
+
+    def get_partitions(self, stream_name: str) -> int:
+        """Количество партиций стрима (1 — стрим не разбит)."""
+        return self.partitioned_streams.get(stream_name, 1)
+
+    def resolve_stream(self, stream_name: str, data: dict[str, Any], routing_key: str | int | None = None) -> str:
+        """Определяет ключ партиции, в которую нужно записать событие."""
+        partitions = self.get_partitions(stream_name)
+        if partitions <= 1:
+            return stream_name
+
+        if routing_key is None:
+            routing_key = RedisStreams.routing_key(data)
 
-    async def add_event(self, stream_name: str, data: dict[str, Any]) -> str | None:
-        """Добавляет событие в стрим."""
-        return await self.redis.stream_add(stream_name, data)
+        if routing_key is None:
+            index = next(self._round_robin) % partitions
+        else:
+            index = RedisStreams.partition_index(routing_key, partitions)
+        return RedisStreams.partition_name(stream_name, index, partitions)
+
+    async def add_event(
+        self, stream_name: str, data: dict[str, Any], routing_key: str | int | None = None
+    ) -> str | None:
+        """Добавляет событие в стрим (в нужную партицию, если стрим разбит)."""
+        trace_id = get_trace_id()
+        if trace_id and TRACE_ID_FIELD not in data:
+            data = {**data, TRACE_ID_FIELD: trace_id}
+        return await self.redis.stream_add(self.resolve_stream(stream_name, data, routing_key), data)
+
+    def owned_streams(self, stream_name: str, member_index: int = 0, members_count: int = 1) -> list[str]:
+        """Партиции стрима, которые обслуживает экземпляр потребителя `member_index` из `members_count`."""
+        return RedisStreams.owned_partitions(stream_name, self.get_partitions(stream_name), member_index, members_count)
 
     async def create_group(self, stream_name: str, group_name: str) -> None:
-        """Создает группу потребителей (если не существует)."""
-        await self.redis.stream_create_group(stream_name, group_name)
+        """Создает группу потребителей (если не существует) во всех партициях стрима."""
+        for name in RedisStreams.partition_names(stream_name, self.get_partitions(stream_name)):
+            await self.redis.stream_create_group(name, group_name)
 
     async def read_events(self, stream_name: str, group_name: str, consumer_name: str, count: int = 10) -> list[tuple]:
         """Читает новые события."""
         return await self.redis.stream_read_group(stream_name, group_name, consumer_name, count)
 
+    async def read_owned_events(
+        self,
+        stream_name: str,
+        group_name: str,
+        consumer_name: str,
+        member_index: int = 0,
+        members_count: int = 1,
+        count: int = 10,
+    ) -> list[tuple[str, list[tuple]]]:
+        """
+        Читает новые события из партиций, закрепленных за экземпляром потребителя.
+        Возвращает пары (имя партиции, события) — имя нужно для ack_event.
+        """
+        streams = self.owned_streams(stream_name, member_index, members_count)
+        return await self.redis.stream_read_group_multi(streams, group_name, consumer_name, count)
+
     async def ack_event(self, stream_name: str, group_name: str, event_id: str) -> None:
         """Подтверждает обработку события."""
         await self.redis.stream_ack(stream_name, group_name, event_id)
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from collections.abc import Callable
+
+from arq import Retry
+from loguru import logger as log
+
+from src.shared.core.redis_service import RedisService
+
+# Token bucket, общий для всех процессов: состояние в HASH (tokens, ts), время — от Redis (TIME),
+# поэтому расхождение часов между репликами воркера не влияет на лимит.
+# Возвращает 0, если токен выдан, иначе — сколько миллисекунд подождать до следующей попытки.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local wait_ms = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait_ms = math.ceil((requested - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait_ms
+"""
+
+
+class RedisRateLimiter:
+    """
+    Распределенный rate limiter (token bucket на Redis + Lua) для внешних провайдеров.
+    Один bucket на провайдера, общий для всех воркеров и реплик.
+
+    При недоступности Redis работает в режиме fail-open: отправка не блокируется.
+    Если токен не освобождается за `max_wait`, задача откладывается через arq.Retry — без токена отправки нет.
+    """
+
+    def __init__(
+        self,
+        redis_service: RedisService,
+        limits: dict[str, tuple[float, int]],
+        key_prefix: str = "rate_limit",
+        max_wait: float = 30.0,
+        on_wait: Callable[[str, float, bool], None] | None = None,
+    ):
+        """
+        :param limits: {провайдер: (запросов в секунду, размер burst)}. Скорость <= 0 — без лимита.
+        :param max_wait: Максимальное ожидание токена (сек); дальше — arq.Retry с задержкой до следующего токена.
+        :param on_wait: Вызывается после ожидания токена: (провайдер, секунды ожидания, задача отложена) — метрики.
+        """
+        self.redis = redis_service
+        self.limits = limits
+        self.key_prefix = key_prefix
+        self.max_wait = max_wait
+        self.on_wait = on_wait
+
+    async def acquire(self, provider: str, tokens: int = 1) -> float:
+        """
+        Ждет свободный токен провайдера. Возвращает время ожидания в секундах.
+        Если ожидание превышает `max_wait`, поднимает arq.Retry: ARQ повторит задачу, когда токен освободится.
+        """
+        rate, capacity = self.limits.get(provider, (0.0, 0))
+        if rate <= 0:
+            return 0.0
+
+        key = f"{self.key_prefix}:{provider}"
+        started = time.monotonic()
+        while True:
+            wait_ms = await self.redis.run_script(TOKEN_BUCKET_SCRIPT, [key], [rate, max(capacity, tokens), tokens])
+            if wait_ms is None or int(wait_ms) <= 0:
+                break
+
+            delay = int(wait_ms) / 1000
+            if time.monotonic() - started + delay > self.max_wait:
+                log.warning(
+                    f"RateLimiter | action=acquire status=deferred provider={provider} "
+                    f"max_wait={self.max_wait} defer={delay:.3f}s"
+                )
+                self._record(provider, time.monotonic() - started, deferred=True)
+                raise Retry(defer=delay)
+            await asyncio.sleep(delay)
+
+        waited = time.monotonic() - started
+        self._record(provider, waited, deferred=False)
+        if waited >= 0.01:
+            log.debug(f"RateLimiter | action=acquire status=waited provider={provider} wait={waited:.3f}s")
+        return waited
+
+    def _record(self, provider: str, waited: float, deferred: bool) -> None:
+        # Токен, выданный сразу, ожиданием не считается
+        if self.on_wait is None or (waited < 0.01 and not deferred):
+            return
+        try:
+            self.on_wait(provider, waited, deferred)
+        except Exception as e:
+            log.warning(f"RateLimiter | action=record_wait status=failed provider={provider} error='{e}'")
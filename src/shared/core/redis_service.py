@@ -1,12 +1,15 @@
 # mypy: ignore-errors
 import json
 from collections.abc import Callable
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from loguru import logger as log
 from redis.asyncio import Redis
 from redis.asyncio.client import Pipeline
-from redis.exceptions import RedisError
+from redis.exceptions import RedisError, ResponseError
+
+if TYPE_CHECKING:
+    from redis.commands.core import AsyncScript
 
 
 class RedisService:
@@ -17,6 +20,8 @@ class RedisService:
 
     def __init__(self, client: Redis):
         self.redis_client = client
+        # Зарегистрированные Lua-скрипты (EVALSHA с автоматическим fallback на EVAL)
+        self._scripts: dict[str, AsyncScript] = {}
         log.debug(f"RedisService | status=initialized client={client}")
 
     async def execute_pipeline(self, builder_func: Callable[[Pipeline], None]) -> list[Any]:
@@ -239,6 +244,37 @@ class RedisService:
             log.exception(f"RedisList | action=len status=failed reason='Redis error' key='{key}'")
             return 0
 
+    # --- Sorted Set (ZSET) Methods ---
+
+    async def zset_count(self, key: str) -> int:
+        """Возвращает количество элементов в ZSET."""
+        try:
+            count = await self.redis_client.zcard(key)
+            log.debug(f"RedisZSet | action=count status=success key='{key}' count={count}")
+            return int(count) if count else 0
+        except RedisError:
+            log.exception(f"RedisZSet | action=count status=failed reason='Redis error' key='{key}'")
+            return 0
+
+    # --- Lua Script Methods ---
+
+    async def run_script(self, script: str, keys: list[str], args: list[Any]) -> Any:
+        """
+        Выполняет Lua-скрипт атомарно на стороне Redis.
+        Скрипт регистрируется один раз и далее вызывается по SHA.
+        """
+        try:
+            registered = self._scripts.get(script)
+            if registered is None:
+                registered = self.redis_client.register_script(script)
+                self._scripts[script] = registered
+            result = await registered(keys=keys, args=args)
+            log.debug(f"RedisScript | action=run status=success keys={keys}")
+            return result
+        except RedisError:
+            log.exception(f"RedisScript | action=run status=failed reason='Redis error' keys={keys}")
+            return None
+
     # --- Key/String Methods ---
 
     async def expire(self, key: str, time: int) -> bool:
@@ -269,6 +305,20 @@ class RedisService:
         except RedisError:
             log.exception(f"RedisString | action=set status=failed reason='Redis error' key='{key}'")
 
+    async def set_value_if_not_exists(self, key: str, value: str, ttl: int | None = None) -> bool | None:
+        """
+        Устанавливает значение, только если ключа еще нет (SET NX).
+        True — ключ установлен, False — ключ уже существует, None — ошибка Redis
+        (вызывающий код сам решает, пропускать операцию или выполнять ее без блокировки).
+        """
+        try:
+            result = await self.redis_client.set(key, value, ex=ttl, nx=True)
+            log.debug(f"RedisString | action=set_nx status=success key='{key}' ttl={ttl} result={bool(result)}")
+            return bool(result)
+        except RedisError:
+            log.exception(f"RedisString | action=set_nx status=failed reason='Redis error' key='{key}'")
+            return None
+
     async def get_value(self, key: str) -> str | None:
         """Получает строковое значение по ключу Redis."""
         try:
@@ -358,6 +408,32 @@ class RedisService:
             log.exception(f"RedisStream | action=read_group status=failed reason='Redis error' stream='{stream_name}'")
             return []
 
+    async def stream_read_group_multi(
+        self, stream_names: list[str], group_name: str, consumer_name: str, count: int = 10
+    ) -> list[tuple[str, list[tuple[Any, ...]]]]:
+        """Читает новые события сразу из нескольких стримов (партиций) одним XREADGROUP."""
+        if not stream_names:
+            return []
+        try:
+            streams = await self.redis_client.xreadgroup(
+                groupname=group_name,
+                consumername=consumer_name,
+                streams=dict.fromkeys(stream_names, ">"),
+                count=count,
+            )
+            result = [(str(name), events) for name, events in streams or [] if events]
+            if result:
+                log.debug(
+                    f"RedisStream | action=read_group_multi status=success streams_count={len(stream_names)} "
+                    f"count={sum(len(events) for _, events in result)}"
+                )
+            return result
+        except RedisError:
+            log.exception(
+                f"RedisStream | action=read_group_multi status=failed reason='Redis error' streams={stream_names}"
+            )
+            return []
+
     async def stream_ack(self, stream_name: str, group_name: str, event_id: str) -> None:
         """Подтверждает обработку события."""
         try:
@@ -367,3 +443,20 @@ class RedisService:
             log.exception(
                 f"RedisStream | action=ack status=failed reason='Redis error' stream='{stream_name}' id='{event_id}'"
             )
+
+    async def stream_groups_info(self, stream_name: str) -> list[dict[str, Any]]:
+        """
+        Информация о группах потребителей стрима (XINFO GROUPS): pending, lag и т.д.
+        Для несуществующего стрима возвращает пустой список.
+        """
+        try:
+            groups = await self.redis_client.xinfo_groups(stream_name)
+            return [dict(group) for group in groups or []]
+        except ResponseError as e:
+            if "no such key" in str(e).lower():
+                return []
+            log.exception(f"RedisStream | action=groups_info status=failed reason='Redis error' stream='{stream_name}'")
+            return []
+        except RedisError:
+            log.exception(f"RedisStream | action=groups_info status=failed reason='Redis error' stream='{stream_name}'")
+            return []
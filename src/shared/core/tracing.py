@@ -0,0 +1,41 @@
+import uuid
+from contextvars import ContextVar, Token
+
+# Поле, в котором trace_id передается между сервисами (kwargs задач ARQ, события Redis Streams, ResponseHeader)
+TRACE_ID_FIELD = "trace_id"
+
+_trace_id: ContextVar[str | None] = ContextVar("trace_id", default=None)
+
+# Задачи ARQ, принимающие trace_id в kwargs (обернутые traced_job). Остальным задачам он не передается:
+# лишний аргумент сломал бы вызов функции
+_traced_functions: set[str] = set()
+
+
+def new_trace_id() -> str:
+    """Генерирует новый trace_id."""
+    return uuid.uuid4().hex
+
+
+def get_trace_id() -> str | None:
+    """trace_id текущей задачи/запроса (None — вне трассируемого контекста)."""
+    return _trace_id.get()
+
+
+def set_trace_id(trace_id: str | None) -> Token[str | None]:
+    """Устанавливает trace_id для текущего контекста. Возвращает токен для reset_trace_id."""
+    return _trace_id.set(trace_id)
+
+
+def reset_trace_id(token: Token[str | None]) -> None:
+    """Восстанавливает предыдущий trace_id."""
+    _trace_id.reset(token)
+
+
+def register_traced_function(name: str) -> None:
+    """Отмечает задачу ARQ как принимающую trace_id (вызывается traced_job)."""
+    _traced_functions.add(name)
+
+
+def accepts_trace_id(name: str) -> bool:
+    """Можно ли передать trace_id в kwargs задачи `name`."""
+    return name in _traced_functions
@@ -0,0 +1,66 @@
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, field_validator
+
+# Значение, которое форма записи сохраняет вместо отсутствующего email
+EMAIL_NOT_SPECIFIED = "не указан"
+
+
+class AppointmentNotificationPayload(BaseModel):
+    """
+    Pydantic-схема данных записи в кеше уведомлений (`notifications:cache:{appointment_id}`).
+    Разбирается из JSON одним вызовом `model_validate_json`: разбор, типы и значения по умолчанию
+    за один проход вместо json.loads и проверок `.get()` в задачах.
+
+    Поля, не описанные в схеме (например, данные для шаблонов), сохраняются как есть.
+    """
+
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+    id: int | None = None
+
+    # Клиент
+    client_email: str | None = None
+    client_phone: str | None = None
+    first_name: str = Field(default="Guest")
+    name: str | None = None
+    visits_count: int = Field(default=0)
+
+    # Запись ("ДД.ММ.ГГГГ ЧЧ:ММ")
+    datetime: str = Field(default="")
+    duration_minutes: int = Field(default=30)
+    service_name: str | None = None
+
+    # Токен для ссылок подтверждения/отмены
+    action_token: str | None = None
+
+    @field_validator("first_name", "datetime", mode="before")
+    @classmethod
+    def _none_to_default(cls, value: Any, info: ValidationInfo) -> Any:
+        return cls.model_fields[str(info.field_name)].default if value is None else value
+
+    @field_validator("duration_minutes", "visits_count", mode="before")
+    @classmethod
+    def _tolerate_invalid_int(cls, value: Any, info: ValidationInfo) -> Any:
+        # Некорректное число не должно отменять уведомление целиком — берется значение по умолчанию
+        default = cls.model_fields[str(info.field_name)].default
+        if value is None or value == "":
+            return default
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return default
+
+    @property
+    def email(self) -> str | None:
+        """Email клиента, если он указан."""
+        if self.client_email and self.client_email.lower() != EMAIL_NOT_SPECIFIED:
+            return self.client_email
+        return None
+
+    def to_data(self) -> dict[str, Any]:
+        """
+        Данные для задач и шаблонов: только поля, присутствовавшие в кеше (с приведенными типами).
+        Отсутствующие поля не подставляются, чтобы в шаблонах не появлялись значения по умолчанию.
+        """
+        return self.model_dump(exclude_unset=True)
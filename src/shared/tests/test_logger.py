@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from loguru import logger
+
+from src.shared.core import logger as logger_module
+from src.shared.core.config import CommonSettings
+from src.shared.core.constants import ArqQueues
+from src.shared.core.logger import (
+    ErrorBurstFilter,
+    JsonLogFormatter,
+    compress_in_background,
+    mask_sensitive_data,
+    setup_logging,
+)
+
+# Типичные строки логов воркера и бэкенда: большинство не содержит персональных данных
+REPRESENTATIVE_LINES = [
+    "RedisHash | action=get_all status=found key='notifications:cache:123'",
+    "NotificationWorkerStartup | All dependencies initialized.",
+    f"ArqService | action=enqueue_job function=send_email_task queue={ArqQueues.TRANSACTIONAL} job_id=4f1c2d",
+    f"ArqService | action=enqueue_job function=send_bulk_email_task queue={ArqQueues.BULK} job_id=9a0b3e",
+    "Sending email to anna.schmidt@example.com with subject 'Terminbestätigung' using template 'confirmation.html'",
+    "Attempting Free-form WhatsApp to +49 176 12345678",
+    "SMTP failed (535 authentication failed password=hunter22) Switching to SendGrid API...",
+    "SMTP | action=login status=failed smtp_password='hunter22' user=admin",
+    "Http | action=request cookie=abcdef123 session_id=zzzz9999",
+]
+
+# Бюджет на строку с большим запасом для CI (локально около 5 мкс)
+MASKING_BUDGET_PER_LINE_SECONDS = 50e-6
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        ("Attempting Free-form WhatsApp to +49 176 12345678", "Attempting Free-form WhatsApp to +49 176 *** 78"),
+        ("Email sent successfully to anna@example.com", "Email sent successfully to a***@example.com"),
+        ("login failed password=hunter22", "login failed password=***"),
+        ('{"token": "abcdef123456"}', '{"token": "***"}'),
+        ("SMTP login smtp_password='hunter22'", "SMTP login smtp_password='***'"),
+        ("request cookie=abcdef123 session_id=zzzz9999", "request cookie=*** session_id=***"),
+    ],
+)
+def test_mask_sensitive_data(line: str, expected: str):
+    assert mask_sensitive_data(line) == expected
+
+
+@pytest.mark.unit
+def test_mask_sensitive_data_skips_clean_lines():
+    # Строка без цифр, "@" и ключевых слов возвращается как есть, без запуска регулярного выражения
+    line = "NotificationWorkerStartup | All dependencies initialized."
+    assert mask_sensitive_data(line) is line
+
+
+@pytest.mark.unit
+def test_mask_sensitive_data_cost():
+    lines = REPRESENTATIVE_LINES * 2000
+    started = time.perf_counter()
+    for line in lines:
+        mask_sensitive_data(line)
+    per_line = (time.perf_counter() - started) / len(lines)
+    assert per_line < MASKING_BUDGET_PER_LINE_SECONDS, f"masking took {per_line * 1e6:.1f}us per line"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("masked", [False, True])
+def test_json_field_masking_cost(masked: bool):
+    # Разбор полей с проверкой имен секретов (smtp_password, cookie, session_id); masked — сообщение
+    # уже замаскировано консольным фильтром, имена полей проверяются все равно
+    formatter = JsonLogFormatter("test")
+    lines = REPRESENTATIVE_LINES * 2000
+    started = time.perf_counter()
+    for line in lines:
+        formatter._parse_message(line, masked)
+    per_line = (time.perf_counter() - started) / len(lines)
+    assert per_line < MASKING_BUDGET_PER_LINE_SECONDS, f"field masking took {per_line * 1e6:.1f}us per line"
+
+
+# Допустимая задержка event loop, пока файл лога пишется, ротируется и сжимается
+MAX_LOOP_LAG_SECONDS = 0.05
+
+
+@pytest.mark.unit
+async def test_file_rotation_does_not_block_event_loop(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # Медленный диск: сжатие ротированного файла занимает заметное время
+    zip_log_file = logger_module._zip_log_file
+
+    def slow_zip_log_file(path: str) -> None:
+        time.sleep(0.2)
+        zip_log_file(path)
+
+    monkeypatch.setattr(logger_module, "_zip_log_file", slow_zip_log_file)
+
+    # Запись на уровне TRACE: стандартный sink loguru (stderr, DEBUG) ее не получает
+    handler_id = logger.add(
+        str(tmp_path / "debug.log"),
+        enqueue=True,
+        level="TRACE",
+        filter=lambda record: record["level"].name == "TRACE",
+        rotation="64 KB",
+        compression=compress_in_background,
+        format=JsonLogFormatter("test"),
+    )
+    max_lag = 0.0
+    writing = True
+
+    async def measure_lag() -> None:
+        nonlocal max_lag
+        while writing:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.001)
+
+    lag_task = asyncio.create_task(measure_lag())
+    try:
+        for index in range(5000):
+            logger.trace(
+                f"RedisHash | action=get_all status=found key='notifications:cache:{index}' payload={'x' * 200}"
+            )
+            if index % 50 == 0:
+                await asyncio.sleep(0)
+    finally:
+        writing = False
+        await lag_task
+        logger.remove(handler_id)
+        for thread in threading.enumerate():
+            if thread.name == "log-compression":
+                thread.join()
+
+    assert list(tmp_path.glob("*.zip")) or len(list(tmp_path.glob("debug*.log"))) > 1, "no rotation happened"
+    assert max_lag < MAX_LOOP_LAG_SECONDS, f"event loop blocked for {max_lag * 1000:.1f}ms"
+
+
+def _capture_errors(burst_filter: ErrorBurstFilter) -> tuple[list[tuple[str, int | None]], int]:
+    records: list[tuple[str, int | None]] = []
+    handler_id = logger.add(
+        lambda message: records.append((message.record["message"], message.record["extra"].get("suppressed_repeats"))),
+        level="ERROR",
+        filter=burst_filter,
+    )
+    return records, handler_id
+
+
+@pytest.mark.unit
+def test_error_burst_filter_flushes_count_after_window():
+    # Повторов после окна нет: счетчик пишется по таймеру в конце окна
+    records, handler_id = _capture_errors(ErrorBurstFilter(window=0.2))
+    try:
+        for _ in range(5):
+            logger.error("SMTP | action=send status=failed")
+        time.sleep(0.5)
+    finally:
+        logger.remove(handler_id)
+
+    assert records == [("SMTP | action=send status=failed", None), ("SMTP | action=send status=failed", 4)]
+
+
+@pytest.mark.unit
+def test_error_burst_filter_flush_on_shutdown():
+    burst_filter = ErrorBurstFilter(window=60)
+    records, handler_id = _capture_errors(burst_filter)
+    try:
+        for _ in range(3):
+            logger.error("Twilio | action=send status=failed")
+        logger.error("Redis | action=get status=failed")
+        burst_filter.flush()
+    finally:
+        logger.remove(handler_id)
+
+    assert records == [
+        ("Twilio | action=send status=failed", None),
+        ("Redis | action=get status=failed", None),
+        ("Twilio | action=send status=failed", 2),
+    ]
+
+
+def _json_fields(message: str) -> dict:
+    lines: list[str] = []
+    handler_id = logger.add(lines.append, level="TRACE", format=JsonLogFormatter("test"))
+    try:
+        logger.trace(message)
+    finally:
+        logger.remove(handler_id)
+    return json.loads(lines[0])["fields"]
+
+
+@pytest.mark.unit
+def test_json_log_masks_only_secret_fields():
+    # Ключ Redis — не секрет и пишется как есть
+    fields = _json_fields("RedisString | action=get status=found key='notifications:cache:42'")
+    assert fields == {"action": "get", "status": "found", "key": "notifications:cache:42"}
+
+    fields = _json_fields("SMTP | action=login status=failed smtp_password='hunter22' user=admin")
+    assert fields == {"action": "login", "status": "failed", "smtp_password": "***", "user": "admin"}
+
+
+@pytest.mark.unit
+def test_json_log_masks_cookie_and_session_fields():
+    fields = _json_fields("Http | action=request cookie=abcdef123 session_id=zzzz9999")
+    assert fields == {"action": "request", "cookie": "***", "session_id": "***"}
+
+
+@pytest.fixture
+def production_logging(tmp_path: Path):
+    """setup_logging с настройками production (DEBUG=False): консоль маскируется, файлы пишутся в tmp_path."""
+    root_handlers = logging.root.handlers[:]
+
+    def configure(debug: bool = False) -> Path:
+        settings = CommonSettings(debug=debug, log_dir=str(tmp_path))
+        setup_logging(settings, "test", enqueue=False)
+        return tmp_path / "test"
+
+    yield configure
+
+    logger.remove()
+    logger.add(sys.stderr)
+    logging.root.handlers = root_handlers
+
+
+@pytest.mark.unit
+def test_production_json_log_masks_secret_fields(production_logging):
+    # В production masking_filter консоли маскирует сообщение раньше файлов: имена секретных полей
+    # все равно проверяются при разборе полей JSON
+    log_dir = production_logging(debug=False)
+    logger.error("SMTP | action=login status=failed smtp_password='hunter22' user=admin")
+    logger.error("Http | action=request cookie=abcdef123 session_id=zzzz9999")
+    # Короткое значение правила маскирования текста не трогают, имя поля — секрет
+    logger.error("Auth | action=check api_token=x1y")
+
+    records = [json.loads(line) for line in (log_dir / "errors.json").read_text().splitlines()]
+    assert [record["fields"] for record in records] == [
+        {"action": "login", "status": "failed", "smtp_password": "***", "user": "admin"},
+        {"action": "request", "cookie": "***", "session_id": "***"},
+        {"action": "check", "api_token": "***"},
+    ]
+    assert "hunter22" not in (log_dir / "debug.log").read_text()
+
+
+# Записей на замер пропускной способности setup_logging и бюджет на запись (консоль и оба JSON-файла)
+LOGGING_THROUGHPUT_RECORDS = 2000
+LOGGING_BUDGET_PER_RECORD_SECONDS = 500e-6
+
+
+@pytest.mark.unit
+def test_setup_logging_throughput_with_and_without_masking(production_logging, capsys: pytest.CaptureFixture[str]):
+    # production (DEBUG=False): консоль маскируется; dev: консоль без маскирования. Файлы маскируются всегда
+    per_record: dict[str, float] = {}
+    for mode, debug in (("production", False), ("dev", True)):
+        production_logging(debug=debug)
+        started = time.perf_counter()
+        for index in range(LOGGING_THROUGHPUT_RECORDS):
+            logger.info(REPRESENTATIVE_LINES[index % len(REPRESENTATIVE_LINES)])
+        logger.complete()
+        per_record[mode] = (time.perf_counter() - started) / LOGGING_THROUGHPUT_RECORDS
+        capsys.readouterr()
+
+    report = ", ".join(f"{mode}: {1 / seconds:.0f} records/s" for mode, seconds in per_record.items())
+    print(f"setup_logging throughput — {report}")
+    assert max(per_record.values()) < LOGGING_BUDGET_PER_RECORD_SECONDS, report
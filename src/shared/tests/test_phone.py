@@ -0,0 +1,24 @@
+import pytest
+
+from src.shared.utils.phone import normalize_phone, normalize_phones
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("phone", "expected"),
+    [
+        ("+49 151 1234567", "+491511234567"),
+        ("0049 (151) 123-45-67", "+491511234567"),
+        ("0151 1234567", "+491511234567"),
+        ("491511234567", "+491511234567"),
+    ],
+)
+def test_normalize_phone(phone: str, expected: str):
+    assert normalize_phone(phone) == expected
+
+
+@pytest.mark.unit
+def test_normalize_phones_keeps_positions():
+    # Пустые номера не сдвигают остальные: результат сопоставляется с получателями по индексу
+    phones = ["0151 1234567", "", None, "+43 660 1234567"]
+    assert normalize_phones(phones) == ["+491511234567", "", "", "+436601234567"]
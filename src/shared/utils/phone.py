@@ -0,0 +1,38 @@
+import functools
+import re
+from collections.abc import Iterable
+
+# Код страны для номеров в национальном формате (0151... -> +49151...)
+DEFAULT_COUNTRY_CODE = "49"
+
+_PHONE_SEPARATORS = re.compile(r"[\s\-\(\)]")
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_phone(phone: str, default_country_code: str = DEFAULT_COUNTRY_CODE) -> str:
+    """
+    Нормализация номера в E.164 ("+491511234567").
+    - "+49 151 1234567" -> разделители удаляются;
+    - "0049151..." -> международный префикс "00" заменяется на "+";
+    - "0151..." -> национальный номер, добавляется код страны `default_country_code`;
+    - "49151..." -> добавляется "+".
+
+    Результат кешируется: повторные отправки одним клиентам не разбирают номер заново.
+    """
+    clean_phone = _PHONE_SEPARATORS.sub("", phone)
+    if clean_phone.startswith("+"):
+        return clean_phone
+    if clean_phone.startswith("00"):
+        return "+" + clean_phone[2:]
+    if clean_phone.startswith("0"):
+        return f"+{default_country_code}{clean_phone[1:]}"
+    return "+" + clean_phone
+
+
+def normalize_phones(phones: Iterable[str | None], default_country_code: str = DEFAULT_COUNTRY_CODE) -> list[str]:
+    """
+    Нормализация списка номеров (получатели рассылки).
+    Результат той же длины и в том же порядке, что и вход: i-й номер соответствует i-му получателю,
+    пустое значение ("" / None) остается пустой строкой.
+    """
+    return [normalize_phone(phone, default_country_code) if phone else "" for phone in phones]
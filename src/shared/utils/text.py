@@ -1,4 +1,80 @@
 import re
+from collections.abc import Iterable
+
+_SMS_WHITESPACE = re.compile(r"[\r\n\t]+")
+_SMS_UNSAFE_CHARS = re.compile(r"[^\w\s\.\-]")
+
+# Таблица транслитерации строится один раз при импорте
+_TRANSLIT_TABLE = str.maketrans(
+    {
+        "а": "a",
+        "б": "b",
+        "в": "v",
+        "г": "g",
+        "д": "d",
+        "е": "e",
+        "ё": "yo",
+        "ж": "zh",
+        "з": "z",
+        "и": "i",
+        "й": "y",
+        "к": "k",
+        "л": "l",
+        "м": "m",
+        "н": "n",
+        "о": "o",
+        "п": "p",
+        "р": "r",
+        "с": "s",
+        "т": "t",
+        "у": "u",
+        "ф": "f",
+        "х": "kh",
+        "ц": "ts",
+        "ч": "ch",
+        "ш": "sh",
+        "щ": "shch",
+        "ъ": "",
+        "ы": "y",
+        "ь": "",
+        "э": "e",
+        "ю": "yu",
+        "я": "ya",
+        "А": "A",
+        "Б": "B",
+        "В": "V",
+        "Г": "G",
+        "Д": "D",
+        "Е": "E",
+        "Ё": "Yo",
+        "Ж": "Zh",
+        "З": "Z",
+        "И": "I",
+        "Й": "Y",
+        "К": "K",
+        "Л": "L",
+        "М": "M",
+        "Н": "N",
+        "О": "O",
+        "П": "P",
+        "Р": "R",
+        "С": "S",
+        "Т": "T",
+        "У": "U",
+        "Ф": "F",
+        "Х": "Kh",
+        "Ц": "Ts",
+        "Ч": "Ch",
+        "Ш": "Sh",
+        "Щ": "Shch",
+        "Ъ": "",
+        "Ы": "Y",
+        "Ь": "",
+        "Э": "E",
+        "Ю": "Yu",
+        "Я": "Ya",
+    }
+)
 
 
 def transliterate(text: str) -> str:
@@ -7,78 +83,16 @@ def transliterate(text: str) -> str:
     """
     if not text:
         return ""
+    return text.translate(_TRANSLIT_TABLE)
+
 
-    translit_map = str.maketrans(
-        {
-            "а": "a",
-            "б": "b",
-            "в": "v",
-            "г": "g",
-            "д": "d",
-            "е": "e",
-            "ё": "yo",
-            "ж": "zh",
-            "з": "z",
-            "и": "i",
-            "й": "y",
-            "к": "k",
-            "л": "l",
-            "м": "m",
-            "н": "n",
-            "о": "o",
-            "п": "p",
-            "р": "r",
-            "с": "s",
-            "т": "t",
-            "у": "u",
-            "ф": "f",
-            "х": "kh",
-            "ц": "ts",
-            "ч": "ch",
-            "ш": "sh",
-            "щ": "shch",
-            "ъ": "",
-            "ы": "y",
-            "ь": "",
-            "э": "e",
-            "ю": "yu",
-            "я": "ya",
-            "А": "A",
-            "Б": "B",
-            "В": "V",
-            "Г": "G",
-            "Д": "D",
-            "Е": "E",
-            "Ё": "Yo",
-            "Ж": "Zh",
-            "З": "Z",
-            "И": "I",
-            "Й": "Y",
-            "К": "K",
-            "Л": "L",
-            "М": "M",
-            "Н": "N",
-            "О": "O",
-            "П": "P",
-            "Р": "R",
-            "С": "S",
-            "Т": "T",
-            "У": "U",
-            "Ф": "F",
-            "Х": "Kh",
-            "Ц": "Ts",
-            "Ч": "Ch",
-            "Ш": "Sh",
-            "Щ": "Shch",
-            "Ъ": "",
-            "Ы": "Y",
-            "Ь": "",
-            "Э": "E",
-            "Ю": "Yu",
-            "Я": "Ya",
-        }
-    )
-    return text.translate(translit_map)
+def transliterate_many(texts: Iterable[str | None]) -> list[str]:
+    """
+    Транслитерация списка строк (например, имен получателей рассылки) с сохранением порядка.
+    Пустые значения превращаются в "".
+    """
+    translate = str.translate
+    return [translate(text, _TRANSLIT_TABLE) if text else "" for text in texts]
 
 
 def sanitize_for_sms(text: str, max_length: int = 50) -> str:
@@ -88,7 +102,7 @@ def sanitize_for_sms(text: str, max_length: int = 50) -> str:
     if not text:
         return ""
     # Удаляем переносы строк и лишние пробелы
-    clean = re.sub(r"[\r\n\t]+", " ", text)
+    clean = _SMS_WHITESPACE.sub(" ", text)
     # Оставляем только безопасные символы
-    clean = re.sub(r"[^\w\s\.\-]", "", clean)
+    clean = _SMS_UNSAFE_CHARS.sub("", clean)
     return clean[:max_length].strip()
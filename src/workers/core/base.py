@@ -1,8 +1,20 @@
+import uuid
 from typing import Any
 
 from arq.connections import ArqRedis, RedisSettings, create_pool
+from arq.constants import job_key_prefix, result_key_prefix
 from loguru import logger as log
 
+from src.shared.core.tracing import TRACE_ID_FIELD, accepts_trace_id, get_trace_id
+
+# Маркер "последней версии" для debounce-задач: arq:debounce:<key> -> токен последнего enqueue
+DEBOUNCE_KEY_PREFIX = "arq:debounce:"
+
+
+def get_debounce_marker_key(debounce_key: str) -> str:
+    """Ключ Redis с токеном последней поставленной debounce-задачи."""
+    return f"{DEBOUNCE_KEY_PREFIX}{debounce_key}"
+
 
 class ArqService:
     """
@@ -10,9 +22,11 @@ class ArqService:
     Позволяет создавать пул один раз и переиспользовать его.
     """
 
-    def __init__(self, redis_settings: RedisSettings):
+    def __init__(self, redis_settings: RedisSettings, default_queue_name: str | None = None):
         self.pool: ArqRedis | None = None
         self.redis_settings = redis_settings
+        # Очередь по умолчанию (None — очередь ARQ по умолчанию). Переопределяется через _queue_name.
+        self.default_queue_name = default_queue_name
 
     async def init(self):
         """Инициализация пула (вызывать при старте приложения)."""
@@ -36,20 +50,88 @@ class ArqService:
     async def enqueue_job(self, function: str, *args: Any, **kwargs: Any) -> Any | None:
         """
         Отправка задачи в очередь.
+        Очередь выбирается аргументом `_queue_name` (например, ArqQueues.BULK).
         """
         if not self.pool:
             await self.init()
 
+        if self.default_queue_name and "_queue_name" not in kwargs:
+            kwargs["_queue_name"] = self.default_queue_name
+
+        # Продолжаем трассировку текущей задачи в дочерней: trace_id получают только задачи, обернутые traced_job
+        trace_id = get_trace_id()
+        if trace_id and TRACE_ID_FIELD not in kwargs and accepts_trace_id(function):
+            kwargs[TRACE_ID_FIELD] = trace_id
+
         if self.pool:
             try:
                 job = await self.pool.enqueue_job(function, *args, **kwargs)
-                log.debug(f"ArqService | action=enqueue_job function={function} job_id={job.job_id if job else 'None'}")
+                log.debug(
+                    f"ArqService | action=enqueue_job function={function} queue={kwargs.get('_queue_name', 'default')} "
+                    f"job_id={job.job_id if job else 'None'}"
+                )
                 return job
             except Exception as e:
                 log.exception(f"ArqService | action=enqueue_job status=failed function={function} error={e}")
                 return None
         return None
 
+    async def job_exists(self, job_id: str) -> bool:
+        """
+        Задача с `job_id` уже поставлена или выполнена (результат еще хранится).
+        В этом случае ARQ не ставит задачу с тем же `_job_id` повторно и enqueue_job возвращает None.
+        """
+        if not self.pool:
+            await self.init()
+        if not self.pool:
+            return False
+        return bool(await self.pool.exists(job_key_prefix + job_id, result_key_prefix + job_id))
+
+    async def get_queue_depth(self, queue_name: str) -> int:
+        """Количество задач, ожидающих в очереди (включая отложенные)."""
+        if not self.pool:
+            await self.init()
+        if not self.pool:
+            return 0
+        try:
+            return int(await self.pool.zcard(queue_name))
+        except Exception as e:
+            log.exception(f"ArqService | action=queue_depth status=failed queue={queue_name} error={e}")
+            return 0
+
+    async def get_queue_depths(self, queue_names: tuple[str, ...] | list[str]) -> dict[str, int]:
+        """Глубина нескольких очередей: {имя очереди: количество задач}."""
+        return {name: await self.get_queue_depth(name) for name in queue_names}
+
+    async def enqueue_debounced(
+        self, function: str, debounce_key: str, window: float, *args: Any, **kwargs: Any
+    ) -> Any | None:
+        """
+        Постановка задачи в режиме debounce ("последняя версия побеждает").
+        Задача откладывается на `window` секунд и получает `debounce_token`;
+        при выполнении она сравнивает токен с маркером в Redis и пропускает работу,
+        если за это время была поставлена более новая задача с тем же ключом.
+        При `window <= 0` работает как обычный enqueue_job.
+        """
+        if window <= 0:
+            return await self.enqueue_job(function, *args, **kwargs)
+
+        if not self.pool:
+            await self.init()
+        if not self.pool:
+            return None
+
+        token = uuid.uuid4().hex
+        try:
+            # Маркер живет дольше окна, чтобы задача гарантированно его увидела
+            await self.pool.set(get_debounce_marker_key(debounce_key), token, ex=int(window) + 300)
+        except Exception as e:
+            log.exception(f"ArqService | action=enqueue_debounced status=failed function={function} error={e}")
+            return None
+
+        log.debug(f"ArqService | action=enqueue_debounced function={function} key={debounce_key} window={window}")
+        return await self.enqueue_job(function, *args, debounce_token=token, _defer_by=window, **kwargs)
+
 
 async def base_startup(ctx: dict) -> None:
     """
@@ -76,10 +158,9 @@ class BaseArqSettings:
     job_timeout = 60
     keep_result = 5
 
-    # Настройки повторных попыток (Retries)
-    # По умолчанию 5 попыток с задержкой
-    max_retries = 5
-    retry_delay = 10  # секунд между попытками
+    # Попыток выполнения задачи (опция ARQ). Отложенные через arq.Retry запуски попыткой не считаются
+    # (см. adaptive_concurrency), учитываются прерванные запуски (отмена при остановке воркера)
+    max_tries = 5
 
     on_startup = base_startup
     on_shutdown = base_shutdown
@@ -1,4 +1,6 @@
-from collections.abc import Awaitable, Callable
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Sequence
 from typing import Any
 
 from loguru import logger as log
@@ -11,6 +13,80 @@ from src.workers.core.config import WorkerSettings
 # Определение типа для функций-зависимостей
 DependencyFunction = Callable[[dict[str, Any], Any], Awaitable[None]]
 
+# Атрибут функции-зависимости со списком зависимостей, которые должны быть инициализированы до нее
+REQUIRES_ATTR = "__dependency_requires__"
+
+
+def requires(*dependencies: DependencyFunction) -> Callable[[DependencyFunction], DependencyFunction]:
+    """
+    Декоратор: объявляет, от каких зависимостей зависит функция инициализации.
+    Используется в run_dependencies для построения графа.
+    """
+
+    def decorator(func: DependencyFunction) -> DependencyFunction:
+        setattr(func, REQUIRES_ATTR, tuple(dependencies))
+        return func
+
+    return decorator
+
+
+def _get_requirements(
+    func: DependencyFunction, available: Sequence[DependencyFunction]
+) -> tuple[DependencyFunction, ...]:
+    # Зависимости, которых нет в списке (например, отключенные), считаются уже выполненными
+    return tuple(dep for dep in getattr(func, REQUIRES_ATTR, ()) if dep in available)
+
+
+def _check_graph(dependencies: Sequence[DependencyFunction]) -> None:
+    """Проверяет отсутствие циклов (иначе задачи будут ждать друг друга вечно)."""
+    resolved: set[DependencyFunction] = set()
+    pending = list(dependencies)
+    while pending:
+        ready = [func for func in pending if set(_get_requirements(func, dependencies)) <= resolved]
+        if not ready:
+            names = ", ".join(func.__name__ for func in pending)
+            raise ValueError(f"Circular dependencies detected: {names}")
+        resolved.update(ready)
+        pending = [func for func in pending if func not in resolved]
+
+
+async def run_dependencies(
+    ctx: dict[str, Any], settings: Any, dependencies: Sequence[DependencyFunction], component: str
+) -> None:
+    """
+    Инициализирует зависимости по графу: каждая ждет только объявленные через @requires,
+    независимые выполняются параллельно (asyncio.gather). Время каждой логируется.
+    """
+    _check_graph(dependencies)
+
+    started = time.monotonic()
+    tasks: dict[DependencyFunction, asyncio.Task[None]] = {}
+
+    async def run(func: DependencyFunction) -> None:
+        requirements = _get_requirements(func, dependencies)
+        if requirements:
+            await asyncio.gather(*(tasks[dep] for dep in requirements))
+
+        func_started = time.monotonic()
+        await func(ctx, settings)
+        log.info(
+            f"{component} | action=init dependency={func.__name__} duration={time.monotonic() - func_started:.3f}s "
+            f"ready_at={time.monotonic() - started:.3f}s"
+        )
+
+    for func in dependencies:
+        tasks[func] = asyncio.create_task(run(func), name=f"dependency:{func.__name__}")
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    log.info(f"{component} | action=init status=done dependencies={len(tasks)} total={time.monotonic() - started:.3f}s")
+
 
 async def init_common_dependencies(ctx: dict[str, Any], settings: WorkerSettings) -> None:
     """
@@ -1,16 +1,50 @@
 from email.message import EmailMessage
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import aiosmtplib
-import httpx
+from arq import Retry
 from loguru import logger
 
+from src.shared.core.constants import NotificationChannels, NotificationProviders
+from src.workers.core.concurrency import provider_call
+from src.workers.core.metrics import PROVIDER_ERRORS
+
+if TYPE_CHECKING:
+    from src.shared.core.circuit_breaker import CircuitBreaker
+    from src.shared.core.rate_limiter import RedisRateLimiter
+
+
+# Текстовая часть письма, если текстовая версия шаблона не передана
+DEFAULT_TEXT_CONTENT = "Please enable HTML to view this email."
+
+
+def is_channel_error(error: Exception) -> bool:
+    """
+    Ошибка канала (учитывается circuit breaker'ом): сеть, таймаут, сбой сервера, HTTP 5xx и 429,
+    неверные учетные данные SMTP. Ошибки получателя и письма (адрес отклонен, SMTP 5xx, HTTP 4xx)
+    канал не размыкают: из-за одного неверного адреса письма остальным получателям не должны откладываться.
+    """
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused | aiosmtplib.SMTPRecipientRefused):
+        return False
+    if isinstance(error, aiosmtplib.SMTPResponseException) and not isinstance(
+        error, aiosmtplib.SMTPAuthenticationError
+    ):
+        # 4xx — временный отказ сервера, 5xx — постоянный отказ для этого письма
+        return error.code < 500
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status_code, int):
+        return status_code >= 500 or status_code == 429
+    return True
+
 
 class AsyncEmailClient:
     """
     Клиент для отправки Email с двойной страховкой:
     1. Попытка через SMTP.
     2. Если SMTP недоступен — попытка через SendGrid HTTP API.
+
+    Если у канала разомкнут circuit breaker, он пропускается без ожидания таймаута.
+    Без ключа SendGrid резерва нет, поэтому SMTP используется независимо от состояния breaker'а.
     """
 
     def __init__(
@@ -22,6 +56,8 @@ class AsyncEmailClient:
         smtp_from_email: str | None = None,
         smtp_use_tls: bool = False,
         sendgrid_api_key: str | None = None,
+        rate_limiter: "RedisRateLimiter | None" = None,
+        circuit_breaker: "CircuitBreaker | None" = None,
     ):
         self.smtp_host = smtp_host
         self.smtp_port = smtp_port
@@ -31,30 +67,87 @@ class AsyncEmailClient:
         self.smtp_use_tls = smtp_use_tls
         self.sendgrid_api_key = sendgrid_api_key
         self.sendgrid_url = "https://api.sendgrid.com/v3/mail/send"
+        # Общий для всех воркеров лимит отправки на провайдера
+        self.rate_limiter = rate_limiter
+        # Общее для всех воркеров состояние каналов (SMTP / SendGrid)
+        self.circuit_breaker = circuit_breaker
 
-    async def send_email(self, to_email: str, subject: str, html_content: str, timeout: int = 15):
+    async def send_email(
+        self, to_email: str, subject: str, html_content: str, timeout: int = 15, text_content: str | None = None
+    ):
         """
         Основной метод отправки.
+        :param text_content: Текстовая версия письма (text/plain); без нее — стандартная заглушка.
         """
+        smtp_error: Exception
+        smtp_skipped = False
+        # Разомкнутый SMTP пропускается, только если есть резервный канал: иначе письмо было бы потеряно
+        if not self.sendgrid_api_key or await self._is_available(NotificationChannels.SMTP):
+            # Исчерпанный лимит (arq.Retry) — не ошибка канала: задача откладывается целиком
+            await self._acquire(NotificationProviders.SMTP)
+            try:
+                # ПОПЫТКА 1: SMTP
+                with provider_call():
+                    await self._send_via_smtp(to_email, subject, html_content, timeout, text_content)
+                await self._record(NotificationChannels.SMTP, success=True)
+                return
+            except Exception as e:
+                # Отказ получателя — не сбой канала: для breaker'а SMTP ответил
+                await self._record(NotificationChannels.SMTP, success=not is_channel_error(e))
+                logger.warning(f"SMTP failed ({e}). Switching to SendGrid API...")
+                smtp_error = e
+        else:
+            logger.warning("SMTP circuit is open. Switching to SendGrid API...")
+            smtp_error = ConnectionError("SMTP circuit is open")
+            smtp_skipped = True
+
+        # ПОПЫТКА 2: SendGrid API (если есть ключ)
+        if not self.sendgrid_api_key:
+            logger.error("SendGrid API Key is missing. Cannot fallback.")
+            raise smtp_error
+
+        if not await self._is_available(NotificationChannels.SENDGRID):
+            logger.error("SendGrid circuit is open. No email channel available.")
+            if smtp_skipped and self.circuit_breaker:
+                # Ни один канал не пробовали: письмо откладывается до окончания таймаута breaker'а
+                raise Retry(defer=self.circuit_breaker.reset_timeout)
+            raise ConnectionError("All email channels are unavailable") from smtp_error
+
+        await self._acquire(NotificationProviders.SENDGRID)
         try:
-            # ПОПЫТКА 1: SMTP
-            await self._send_via_smtp(to_email, subject, html_content, timeout)
+            with provider_call():
+                await self._send_via_api(to_email, subject, html_content, timeout, text_content)
+            await self._record(NotificationChannels.SENDGRID, success=True)
         except Exception as e:
-            logger.warning(f"SMTP failed ({e}). Switching to SendGrid API...")
+            await self._record(NotificationChannels.SENDGRID, success=not is_channel_error(e))
+            raise
 
-            # ПОПЫТКА 2: SendGrid API (если есть ключ)
-            if self.sendgrid_api_key:
-                await self._send_via_api(to_email, subject, html_content, timeout)
-            else:
-                logger.error("SendGrid API Key is missing. Cannot fallback.")
-                raise e
+    async def _is_available(self, channel: str) -> bool:
+        """Проверка circuit breaker канала (без breaker канал всегда доступен)."""
+        if not self.circuit_breaker:
+            return True
+        return await self.circuit_breaker.allow_request(channel)
 
-    async def _send_via_smtp(self, to_email: str, subject: str, html_content: str, timeout: int):
+    async def _record(self, channel: str, success: bool) -> None:
+        """Результат обращения к каналу для circuit breaker и метрик (success — канал ответил)."""
+        if not success:
+            PROVIDER_ERRORS.labels(channel).inc()
+        if self.circuit_breaker:
+            await self.circuit_breaker.record_result(channel, success)
+
+    async def _acquire(self, provider: str) -> None:
+        """Ожидание свободного слота провайдера (если rate limiter подключен). Может поднять arq.Retry."""
+        if self.rate_limiter:
+            await self.rate_limiter.acquire(provider)
+
+    async def _send_via_smtp(
+        self, to_email: str, subject: str, html_content: str, timeout: int, text_content: str | None = None
+    ):
         message = EmailMessage()
         message["From"] = self.smtp_from_email
         message["To"] = to_email
         message["Subject"] = subject
-        message.set_content("Please enable HTML to view this email.")
+        message.set_content(text_content or DEFAULT_TEXT_CONTENT)
         message.add_alternative(html_content, subtype="html")
 
         use_ssl = self.smtp_port == 465
@@ -76,15 +169,23 @@ class AsyncEmailClient:
         await aiosmtplib.send(message, **send_kwargs)
         logger.info(f"SMTP | Email sent successfully to {to_email}")
 
-    async def _send_via_api(self, to_email: str, subject: str, html_content: str, timeout: int):
+    async def _send_via_api(
+        self, to_email: str, subject: str, html_content: str, timeout: int, text_content: str | None = None
+    ):
         """Отправка через SendGrid HTTP API (порт 443)."""
+        # Ленивый импорт: httpx нужен только для резервного канала
+        import httpx
+
         headers = {"Authorization": f"Bearer {self.sendgrid_api_key}", "Content-Type": "application/json"}
 
-        payload = {
+        payload: dict[str, Any] = {
             "personalizations": [{"to": [{"email": to_email}], "subject": subject}],
             "from": {"email": self.smtp_from_email, "name": "Lily Beauty Salon"},
             "content": [{"type": "text/html", "value": html_content}],
         }
+        if text_content:
+            # SendGrid требует text/plain перед text/html
+            payload["content"].insert(0, {"type": "text/plain", "value": text_content})
 
         async with httpx.AsyncClient() as client:
             response = await client.post(self.sendgrid_url, headers=headers, json=payload, timeout=timeout)
@@ -93,4 +194,7 @@ class AsyncEmailClient:
             logger.info(f"API | Email sent successfully via SendGrid to {to_email}")
         else:
             logger.error(f"API | SendGrid Error: {response.status_code} - {response.text}")
-            raise Exception(f"SendGrid API failed: {response.text}")
+            # Код ответа нужен для классификации ошибки (is_channel_error)
+            raise httpx.HTTPStatusError(
+                f"SendGrid API failed: {response.text}", request=response.request, response=response
+            )
@@ -1,29 +1,374 @@
+import html
 import os
+import re
+import uuid
+from collections.abc import Mapping, Sequence
+from typing import Any
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemLoader, TemplateNotFound, meta, nodes, pass_eval_context, select_autoescape
+from jinja2.nodes import EvalContext
 from loguru import logger
+from markupsafe import Markup, escape
+
+from src.workers.core.metrics import EMAIL_SIZE, EMAIL_SIZE_OVER_BUDGET
+
+# HTML-комментарии, кроме условных комментариев Outlook: <!--[if mso]>, <!--<![endif]-->, <!-->
+_HTML_COMMENT_RE = re.compile(r"<!--(?!\[if|<!\[endif\]|>).*?-->", re.DOTALL)
+_LINE_BREAK_RE = re.compile(r"[ \t]*(?:\r?\n[ \t]*)+")
+_SPACES_RE = re.compile(r"[ \t]{2,}")
+# В этих тегах пробелы значимы — такие шаблоны не минифицируются
+_WHITESPACE_SENSITIVE_RE = re.compile(r"<(?:pre|textarea)\b", re.IGNORECASE)
+
+
+def minify_html(source: str) -> str:
+    """
+    Безопасная минификация исходника шаблона: удаляет HTML-комментарии (условные комментарии MSO
+    сохраняются), отступы и повторяющиеся пробелы. Переносы строк схлопываются в один,
+    поэтому пробел между inline-элементами не теряется.
+    """
+    if _WHITESPACE_SENSITIVE_RE.search(source):
+        return source
+    source = _HTML_COMMENT_RE.sub("", source)
+    source = _LINE_BREAK_RE.sub("\n", source)
+    return _SPACES_RE.sub(" ", source).strip()
+
+
+class MinifyingLoader(FileSystemLoader):
+    """FileSystemLoader, минифицирующий HTML-шаблоны один раз при загрузке (до компиляции Jinja2)."""
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        if template.endswith((".html", ".htm")):
+            source = minify_html(source)
+        return source, filename, uptodate
+
+
+# Преобразование HTML-исходника шаблона в текстовый шаблон (теги Jinja2 сохраняются)
+_TEXT_DROP_RE = re.compile(r"<(head|style|script)\b.*?</\1\s*>|<!--.*?-->", re.DOTALL | re.IGNORECASE)
+_TEXT_LINK_RE = re.compile(r"<a\b[^>]*?href=\"([^\"]*)\"[^>]*>(.*?)</a\s*>", re.DOTALL | re.IGNORECASE)
+_TEXT_BREAK_RE = re.compile(r"<br\s*/?>|</(?:p|div|tr|table|h[1-6]|li)\s*>", re.IGNORECASE)
+_TEXT_CELL_RE = re.compile(r"</td\s*>", re.IGNORECASE)
+_TEXT_TAG_RE = re.compile(r"<[^>]+>")
+_TEXT_EXPRESSION_RE = re.compile(r"\{\{\s*(.+?)\s*\}\}")
+_TEXT_SPACES_RE = re.compile(r"[ \t\xa0]+")
+_TEXT_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _link_to_text(match: re.Match[str]) -> str:
+    url, label = match.group(1), _TEXT_TAG_RE.sub("", match.group(2)).strip()
+    if not label:
+        # Ссылка-картинка (логотип) в текстовой версии не нужна
+        return ""
+    if label == url:
+        return label
+    expression = _TEXT_EXPRESSION_RE.fullmatch(url)
+    if expression:
+        # Ссылка-заглушка ("#") в текстовой версии не выводится
+        return f"{label}{{% if ({expression.group(1)}) not in ('', '#') %}} ({url}){{% endif %}}"
+    return f"{label} ({url})"
+
+
+def html_to_text_template(source: str) -> str:
+    """
+    Строит текстовую версию шаблона из HTML-исходника: ссылки превращаются в "текст (url)",
+    блочные элементы — в переносы строк, остальные теги и комментарии удаляются.
+    Выполняется один раз при загрузке шаблона, а не при каждой отправке.
+    """
+    source = _TEXT_DROP_RE.sub("", source)
+    source = _TEXT_LINK_RE.sub(_link_to_text, source)
+    source = _TEXT_BREAK_RE.sub("\n", source)
+    source = _TEXT_CELL_RE.sub(" ", source)
+    source = html.unescape(_TEXT_TAG_RE.sub("", source))
+    lines = (_TEXT_SPACES_RE.sub(" ", line).strip() for line in source.splitlines())
+    return _TEXT_BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def normalize_text(text: str) -> str:
+    """Убирает пустые строки, оставшиеся после тегов Jinja2, в отрендеренном тексте."""
+    lines = (line.strip() for line in text.splitlines())
+    return _TEXT_BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+class TextTemplateLoader(FileSystemLoader):
+    """
+    Загрузчик текстовых версий шаблонов: для `name.html` берется парный `name.txt`,
+    а если его нет — текстовый шаблон, построенный из HTML (html_to_text_template).
+    """
+
+    def get_source(self, environment, template):
+        if template.endswith((".html", ".htm")):
+            try:
+                return super().get_source(environment, os.path.splitext(template)[0] + ".txt")
+            except TemplateNotFound:
+                source, filename, uptodate = super().get_source(environment, template)
+                return html_to_text_template(source), filename, uptodate
+        return super().get_source(environment, template)
+
+
+@pass_eval_context
+def linebreaksbr(eval_ctx: EvalContext, value: Any) -> str:
+    """Аналог фильтра Django `linebreaksbr`: переносы строк -> <br> (в HTML-шаблонах текст экранируется)."""
+    text = str(value).replace("\r\n", "\n").replace("\r", "\n")
+    if not eval_ctx.autoescape:
+        return text
+    return Markup("<br>").join(escape(line) for line in text.split("\n"))
+
+
+def _create_environment(loader: FileSystemLoader, autoescape: Any) -> Environment:
+    env = Environment(loader=loader, autoescape=autoescape)
+    # Шаблоны писем используют фильтры Django
+    env.filters["linebreaksbr"] = linebreaksbr
+    return env
+
+
+# Значение-маркер отсутствующего у получателя ключа (в шаблоне сработает default)
+_MISSING = object()
+
+
+def _is_plain_use(node: nodes.Node, parents: Mapping[int, nodes.Node]) -> bool:
+    """
+    Переменная выводится как есть (`{{ var }}`, `{{ var | default(...) }}`) или проверяется на истинность
+    (`{% if var %}`, `a if var else b`) — для таких мест подстановка значения в готовый текст
+    дает тот же результат, что и полный рендер.
+    """
+    parent = parents.get(id(node))
+    if isinstance(parent, nodes.Filter) and parent.name == "default" and parent.node is node:
+        node, parent = parent, parents.get(id(parent))
+    if isinstance(parent, nodes.Output):
+        return True
+    return isinstance(parent, nodes.If | nodes.CondExpr) and parent.test is node
+
+
+def fields_used_plainly(env: Environment, template_name: str, fields: frozenset[str]) -> bool:
+    """
+    Проверяет по AST шаблона (и всех шаблонов, которые он расширяет или включает),
+    что поля `fields` используются только как в _is_plain_use. Динамические include/extends — False.
+    """
+    if env.loader is None:
+        return False
+    pending, seen = [template_name], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        source, _, _ = env.loader.get_source(env, name)
+        ast = env.parse(source, name)
+
+        parents: dict[int, nodes.Node] = {}
+        stack: list[nodes.Node] = [ast]
+        while stack:
+            node = stack.pop()
+            for child in node.iter_child_nodes():
+                parents[id(child)] = node
+                stack.append(child)
+            if isinstance(node, nodes.Name) and node.name in fields and not _is_plain_use(node, parents):
+                return False
+
+        for referenced in meta.find_referenced_templates(ast):
+            if referenced is None:
+                return False
+            pending.append(referenced)
+    return True
+
+
+# Окружения Jinja2 по папке шаблонов. Общий кеш позволяет прогреть шаблоны
+# в процессе-супервизоре до fork: дочерние воркеры получают уже скомпилированные шаблоны.
+_ENVIRONMENTS: dict[tuple[str, bool], Environment] = {}
+_TEXT_ENVIRONMENTS: dict[str, Environment] = {}
 
 
 class TemplateRenderer:
-    def __init__(self, templates_dir: str):
+    def __init__(
+        self,
+        templates_dir: str,
+        minify: bool = False,
+        size_budget: int | None = None,
+        size_budgets: Mapping[str, int] | None = None,
+        strict_size_budget: bool = False,
+    ):
         """
         Инициализация Jinja2 Environment.
         :param templates_dir: Путь к папке с шаблонами.
+        :param minify: Минифицировать HTML-шаблоны при загрузке.
+        :param size_budget: Допустимый размер письма в байтах (None — без проверки).
+        :param size_budgets: Переопределение лимита для отдельных шаблонов.
+        :param strict_size_budget: Превышение лимита — ошибка (иначе только предупреждение и метрика).
         """
         if not os.path.exists(templates_dir):
             logger.error(f"Templates directory not found: {templates_dir}")
             raise FileNotFoundError(f"Templates directory not found: {templates_dir}")
 
-        self.env = Environment(loader=FileSystemLoader(templates_dir), autoescape=select_autoescape(["html", "xml"]))
+        templates_dir = os.path.abspath(templates_dir)
+        env = _ENVIRONMENTS.get((templates_dir, minify))
+        if env is None:
+            loader = MinifyingLoader(templates_dir) if minify else FileSystemLoader(templates_dir)
+            env = _create_environment(loader, select_autoescape(["html", "xml"]))
+            _ENVIRONMENTS[(templates_dir, minify)] = env
+        self.env = env
+
+        text_env = _TEXT_ENVIRONMENTS.get(templates_dir)
+        if text_env is None:
+            text_env = _create_environment(TextTemplateLoader(templates_dir), autoescape=False)
+            _TEXT_ENVIRONMENTS[templates_dir] = text_env
+        self.text_env = text_env
+        self.size_budget = size_budget
+        self.size_budgets = dict(size_budgets or {})
+        self.strict_size_budget = strict_size_budget
+        # Результат fields_used_plainly: (text, шаблон, персональные поля) -> можно ли рендерить пачкой
+        self._batch_safe: dict[tuple[bool, str, tuple[str, ...]], bool] = {}
         logger.info(f"TemplateRenderer initialized with dir: {templates_dir}")
 
+    def preload(self) -> int:
+        """
+        Компилирует все HTML-шаблоны папки и их текстовые версии заранее (прогрев кеша).
+        Возвращает количество загруженных шаблонов. Шаблон с ошибкой останавливает запуск (TemplateError).
+        """
+        loaded = 0
+        for name in self.env.list_templates(extensions=["html"]):
+            self.env.get_template(name)
+            self.text_env.get_template(name)
+            loaded += 1
+        logger.info(f"TemplateRenderer | action=preload count={loaded}")
+        return loaded
+
     def render(self, template_name: str, context: dict) -> str:
         """
         Рендеринг шаблона с переданным контекстом.
         """
+        return self._finalize(template_name, self._render(template_name, context))
+
+    def render_text(self, template_name: str, context: dict) -> str:
+        """Рендеринг текстовой версии шаблона (text/plain часть письма)."""
+        return normalize_text(self._render(template_name, context, text=True))
+
+    def render_email(self, template_name: str, context: dict) -> tuple[str, str]:
+        """Рендеринг обеих частей письма: (html, text)."""
+        return self.render(template_name, context), self.render_text(template_name, context)
+
+    def _render(self, template_name: str, context: Mapping[str, Any], text: bool = False) -> str:
         try:
-            template = self.env.get_template(template_name)
+            template = (self.text_env if text else self.env).get_template(template_name)
             return template.render(context)
         except Exception as e:
             logger.error(f"Error rendering template {template_name}: {e}")
             raise e
+
+    def render_batch(
+        self,
+        template_name: str,
+        base_context: Mapping[str, Any],
+        recipients: Sequence[Mapping[str, Any]],
+        text: bool = False,
+    ) -> list[str]:
+        """
+        Рендеринг одного шаблона для множества получателей (render once, send many).
+
+        Общий контекст рендерится один раз: вместо персональных значений (`recipients[i]`)
+        в шаблон подставляются маркеры, затем маркеры заменяются экранированными значениями получателя.
+        Получатели группируются по "форме" персональных значений (пустое / отсутствует / заполнено),
+        чтобы условия `{% if %}` в шаблоне давали тот же результат, что и при полном рендере.
+
+        Пачкой рендерится, только если персональные поля выводятся в шаблоне как есть
+        (fields_used_plainly); иначе, а также при ошибке рендера с маркерами, каждый получатель
+        рендерится полностью. `text=True` — текстовая версия шаблона.
+        """
+        if not recipients:
+            return []
+
+        keys = sorted({key for recipient in recipients for key in recipient})
+        env = self.text_env if text else self.env
+
+        groups: dict[tuple, list[int]] = {}
+        if self._is_batch_safe(env, template_name, keys, text):
+            for position, recipient in enumerate(recipients):
+                groups.setdefault(self._batch_signature(keys, recipient), []).append(position)
+        else:
+            logger.debug(f"TemplateRenderer | action=render_batch status=fallback template={template_name}")
+
+        nonce = uuid.uuid4().hex
+        placeholders = {key: f"@@{nonce}_{index}@@" for index, key in enumerate(keys)}
+        pattern = re.compile(f"@@{nonce}_(\\d+)@@")
+
+        # Значения экранируются так же, как это сделал бы Jinja2 для этого шаблона
+        autoescape = env.autoescape(template_name) if callable(env.autoescape) else env.autoescape
+        to_text = escape if autoescape else str
+
+        results: list[str | None] = [None] * len(recipients)
+        for positions in groups.values():
+            first = recipients[positions[0]]
+            context = dict(base_context)
+            for key in keys:
+                value = first.get(key, _MISSING)
+                if value is _MISSING:
+                    context.pop(key, None)
+                else:
+                    context[key] = placeholders[key] if value else value
+            try:
+                skeleton = env.get_template(template_name).render(context)
+            except Exception as e:
+                # Маркер вместо значения может сломать выражение шаблона — группа рендерится полностью
+                logger.debug(
+                    f"TemplateRenderer | action=render_batch status=fallback template={template_name} error={e}"
+                )
+                continue
+
+            def fill(recipient: Mapping[str, Any], skeleton: str = skeleton) -> str:
+                values = [str(to_text(recipient.get(key, ""))) for key in keys]
+                return pattern.sub(lambda match: values[int(match.group(1))], skeleton)
+
+            for position in positions:
+                results[position] = fill(recipients[position])
+
+        rendered = [
+            result if result is not None else self._render(template_name, {**base_context, **recipient}, text)
+            for result, recipient in zip(results, recipients, strict=True)
+        ]
+        if text:
+            rendered = [normalize_text(result) for result in rendered]
+        else:
+            rendered = [self._finalize(template_name, result) for result in rendered]
+        logger.debug(
+            f"TemplateRenderer | action=render_batch template={template_name} "
+            f"recipients={len(recipients)} groups={len(groups)}"
+        )
+        return rendered
+
+    def _is_batch_safe(self, env: Environment, template_name: str, keys: Sequence[str], text: bool) -> bool:
+        cache_key = (text, template_name, tuple(keys))
+        safe = self._batch_safe.get(cache_key)
+        if safe is None:
+            safe = self._batch_safe[cache_key] = fields_used_plainly(env, template_name, frozenset(keys))
+        return safe
+
+    @staticmethod
+    def _batch_signature(keys: Sequence[str], recipient: Mapping[str, Any]) -> tuple:
+        # Заполненные значения неразличимы для шаблона; пустые значения ("" / None / 0) рендерятся как есть
+        signature = []
+        for key in keys:
+            value = recipient.get(key, _MISSING)
+            if value is _MISSING:
+                signature.append("missing")
+            elif value:
+                signature.append("value")
+            else:
+                signature.append(repr(value))
+        return tuple(signature)
+
+    def _finalize(self, template_name: str, html: str) -> str:
+        """Пост-обработка отрендеренного письма: метрика размера и проверка лимита (Gmail обрезает > 102KB)."""
+        size = len(html.encode("utf-8"))
+        EMAIL_SIZE.labels(template_name).observe(size)
+
+        budget = self.size_budgets.get(template_name, self.size_budget)
+        if budget and size > budget:
+            EMAIL_SIZE_OVER_BUDGET.labels(template_name).inc()
+            message = (
+                f"TemplateRenderer | action=size_check status=over_budget "
+                f"template={template_name} size={size} budget={budget}"
+            )
+            if self.strict_size_budget:
+                logger.error(message)
+                raise ValueError(f"Rendered email {template_name} exceeds size budget: {size} > {budget} bytes")
+            logger.warning(message)
+        return html
@@ -1,29 +1,82 @@
 import json
-import re
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from loguru import logger as log
 from twilio.base.exceptions import TwilioRestException
 from twilio.rest import Client
 
+from src.shared.core.constants import NotificationProviders
+from src.shared.utils.phone import DEFAULT_COUNTRY_CODE, normalize_phone
+from src.workers.core.metrics import PROVIDER_ERRORS
+
+if TYPE_CHECKING:
+    from src.shared.core.circuit_breaker import CircuitBreaker
+    from src.shared.core.rate_limiter import RedisRateLimiter
+
+
+def _rest_error_result(error: TwilioRestException) -> bool | None:
+    """
+    Результат отправки при ошибке API Twilio: False — сбой канала (5xx, 429), None — отказ для получателя
+    или сообщения (4xx: неверный номер 21211, номер не в WhatsApp): канал работает, breaker его не учитывает.
+    """
+    status = error.status
+    if status is None or status >= 500 or status == 429:
+        return False
+    return None
+
 
 class TwilioService:
     """
     Сервис для отправки уведомлений через Twilio (SMS, WhatsApp).
     """
 
-    def __init__(self, account_sid: str, auth_token: str, from_number: str):
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        from_number: str,
+        rate_limiter: "RedisRateLimiter | None" = None,
+        circuit_breaker: "CircuitBreaker | None" = None,
+        default_country_code: str = DEFAULT_COUNTRY_CODE,
+    ):
         self.client = Client(account_sid, auth_token)
         self.from_number = from_number
+        self.default_country_code = default_country_code
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+
+    async def acquire_send_slot(self) -> float:
+        """
+        Ожидание свободного слота Twilio (общий лимит для всех воркеров).
+        Вызывается задачей перед каждой попыткой отправки. Возвращает время ожидания в секундах.
+        Если слот не освобождается за `max_wait` лимитера, поднимает arq.Retry.
+        """
+        if not self.rate_limiter:
+            return 0.0
+        return await self.rate_limiter.acquire(NotificationProviders.TWILIO)
+
+    async def is_channel_available(self, channel: str) -> bool:
+        """
+        Проверка circuit breaker канала (WhatsApp Template, WhatsApp, SMS).
+        Разомкнутый канал задача пропускает и сразу переходит к следующему в цепочке.
+        """
+        if not self.circuit_breaker:
+            return True
+        return await self.circuit_breaker.allow_request(channel)
+
+    async def record_channel_result(self, channel: str, success: bool | None) -> None:
+        """
+        Фиксирует результат отправки через канал для circuit breaker и метрик.
+        None (отказ для получателя) для breaker'а — успешный ответ канала.
+        """
+        if success is False:
+            PROVIDER_ERRORS.labels(channel).inc()
+        if self.circuit_breaker:
+            await self.circuit_breaker.record_result(channel, success is not False)
 
     def _format_phone(self, phone: str) -> str:
         """Нормализация номера для Twilio (E.164)."""
-        clean_phone = re.sub(r"[\s\-\(\)]", "", phone)
-        if clean_phone.startswith("+"):
-            return clean_phone
-        if clean_phone.startswith("0"):
-            return "+49" + clean_phone[1:]
-        return "+" + clean_phone
+        return normalize_phone(phone, self.default_country_code)
 
     def _is_valid_media_url(self, url: str | None) -> bool:
         """Проверяет, является ли URL публичным и абсолютным."""
@@ -33,8 +86,8 @@ class TwilioService:
         # Также игнорируем локальные адреса типа 'backend' или 'localhost'
         return url.startswith("http") and "localhost" not in url and "backend" not in url
 
-    def send_sms(self, to_number: str, message: str) -> bool:
-        """Отправка обычного SMS."""
+    def send_sms(self, to_number: str, message: str) -> bool | None:
+        """Отправка обычного SMS. True — отправлено, False — сбой канала, None — отказ для получателя."""
         try:
             formatted_to = self._format_phone(to_number)
             sent_message = self.client.messages.create(body=message, from_=self.from_number, to=formatted_to)
@@ -42,14 +95,14 @@ class TwilioService:
             return True
         except TwilioRestException as e:
             log.error(f"TwilioService | SMS failed (Twilio Error): {e}")
-            return False
+            return _rest_error_result(e)
         except Exception as e:
             log.error(f"TwilioService | SMS failed (Unexpected Error): {e}")
             return False
 
-    def send_whatsapp_template(self, to_number: str, content_sid: str, variables: dict) -> bool:
+    def send_whatsapp_template(self, to_number: str, content_sid: str, variables: dict) -> bool | None:
         """
-        Отправка WhatsApp через официальный Content Template.
+        Отправка WhatsApp через официальный Content Template. Результат — как у send_sms.
         """
         try:
             formatted_to = self._format_phone(to_number)
@@ -65,13 +118,13 @@ class TwilioService:
             return True
         except TwilioRestException as e:
             log.error(f"TwilioService | WhatsApp Template failed (Twilio Error): {e}")
-            return False
+            return _rest_error_result(e)
         except Exception as e:
             log.error(f"TwilioService | WhatsApp Template failed (Unexpected Error): {e}")
             return False
 
-    def send_whatsapp(self, to_number: str, message: str, media_url: str | None = None) -> bool:
-        """Обычная отправка WhatsApp (Free-form)."""
+    def send_whatsapp(self, to_number: str, message: str, media_url: str | None = None) -> bool | None:
+        """Обычная отправка WhatsApp (Free-form). Результат — как у send_sms."""
         try:
             formatted_to = self._format_phone(to_number)
             from_wa = f"whatsapp:{self.from_number}"
@@ -90,7 +143,7 @@ class TwilioService:
             return True
         except TwilioRestException as e:
             log.error(f"TwilioService | WhatsApp failed (Twilio Error): {e}")
-            return False
+            return _rest_error_result(e)
         except Exception as e:
             log.error(f"TwilioService | WhatsApp failed (Unexpected Error): {e}")
             return False
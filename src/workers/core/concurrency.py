@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import functools
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from arq import Retry
+from arq.constants import retry_key_prefix
+from loguru import logger as log
+
+
+class JobSlot:
+    """
+    Слот выполнения задачи. Задача может пометить его неуспешным (ошибка провайдера без исключения);
+    обращения к провайдеру внутри `provider_call()` учитываются в задержке для адаптивного лимита.
+    """
+
+    __slots__ = ("failed", "provider_calls", "provider_time")
+
+    def __init__(self) -> None:
+        self.failed = False
+        self.provider_calls = 0
+        self.provider_time = 0.0
+
+    @property
+    def provider_latency(self) -> float | None:
+        """Средняя задержка обращения к провайдеру; None — задача к провайдеру не обращалась."""
+        return self.provider_time / self.provider_calls if self.provider_calls else None
+
+
+# Слот выполняемой задачи — для измерений внутри сервисов (клиенты email, Twilio)
+_current_slot: ContextVar[JobSlot | None] = ContextVar("concurrency_slot", default=None)
+
+
+@contextlib.contextmanager
+def provider_call() -> Iterator[None]:
+    """
+    Измеряет обращение к провайдеру для адаптивного лимита (`with provider_call(): ...`).
+    Оборачивает только сам вызов после получения токена rate limiter: ожидание лимита — не задержка провайдера.
+    """
+    job_slot = _current_slot.get()
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        if job_slot is not None:
+            job_slot.provider_calls += 1
+            job_slot.provider_time += time.monotonic() - started
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Адаптивный лимит одновременно выполняемых задач (AIMD).
+
+    - Успешная задача с задержкой провайдера не выше `latency_target`: лимит растет на 1/limit
+      (примерно +1 за "раунд" задач).
+    - Ошибка или медленный ответ провайдера: лимит умножается на `decrease_factor`
+      (не чаще раза в `decrease_cooldown` секунд, чтобы пачка ошибок не обрушила лимит до минимума).
+    - Задача без обращений к провайдеру (дубль, отложена rate limiter'ом) лимит не меняет.
+
+    ARQ `max_jobs` задает верхнюю границу, лимитер — фактическое число задач в работе.
+    Ожидание слота ограничено `slot_wait_timeout` и не входит в `job_timeout`: бюджет задачи отсчитывается
+    от получения слота (ARQ job_timeout воркера увеличен на `slot_wait_timeout`).
+    """
+
+    def __init__(
+        self,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        initial_limit: int | None = None,
+        decrease_factor: float = 0.75,
+        decrease_cooldown: float = 1.0,
+        job_timeout: float | None = None,
+        slot_wait_timeout: float | None = None,
+    ):
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.job_timeout = job_timeout
+        self.slot_wait_timeout = slot_wait_timeout
+        self.limit = float(initial_limit or self.max_limit)
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    @property
+    def current_limit(self) -> int:
+        """Текущий эффективный лимит одновременных задач."""
+        return max(int(self.limit), self.min_limit)
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[JobSlot]:
+        """
+        Занимает слот на время выполнения задачи и обновляет лимит по результату.
+        Если слот не освободился за `slot_wait_timeout`, задача откладывается (arq.Retry).
+        """
+        async with self._condition:
+            try:
+                async with asyncio.timeout(self.slot_wait_timeout):
+                    await self._condition.wait_for(lambda: self.in_flight < self.current_limit)
+            except TimeoutError:
+                log.warning(
+                    f"AdaptiveConcurrency | action=acquire status=deferred limit={self.current_limit} "
+                    f"wait={self.slot_wait_timeout}s"
+                )
+                raise Retry(defer=self.slot_wait_timeout) from None
+            self.in_flight += 1
+
+        job_slot = JobSlot()
+        slot_token = _current_slot.set(job_slot)
+        try:
+            yield job_slot
+        except Retry:
+            # Отложенная задача (исчерпан лимит провайдера) — не ошибка провайдера
+            raise
+        except Exception:
+            job_slot.failed = True
+            raise
+        finally:
+            _current_slot.reset(slot_token)
+            async with self._condition:
+                self.in_flight -= 1
+                self._update(job_slot)
+                self._condition.notify_all()
+
+    def _update(self, job_slot: JobSlot) -> None:
+        latency = job_slot.provider_latency
+        success = not job_slot.failed
+        if success and latency is None:
+            return
+
+        previous = self.current_limit
+        if success and latency is not None and latency <= self.latency_target:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        else:
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+
+        if self.current_limit != previous:
+            log.info(
+                f"AdaptiveConcurrency | action=adjust limit={self.current_limit} previous={previous} "
+                f"latency={latency or 0.0:.2f}s success={success}"
+            )
+
+
+def mark_job_failed(ctx: dict[str, Any]) -> None:
+    """Помечает текущую задачу неуспешной для адаптивного лимита (если она выполняется в слоте)."""
+    job_slot = ctx.get("concurrency_slot")
+    if isinstance(job_slot, JobSlot):
+        job_slot.failed = True
+
+
+async def refund_job_try(ctx: dict[str, Any]) -> None:
+    """
+    Возвращает попытку отложенной задачи: ARQ увеличивает счетчик попыток (arq:retry:<job_id>) при каждом
+    запуске, и без возврата задача, которую откладывают rate limiter или лимит слотов, исчерпала бы max_tries
+    и не была бы выполнена. Число отложенных запусков ограничено сроком жизни задачи в ARQ.
+    """
+    redis = ctx.get("redis")
+    job_id = ctx.get("job_id")
+    if redis is None or job_id is None:
+        return
+    try:
+        await redis.decr(retry_key_prefix + job_id)
+    except Exception as e:
+        log.warning(f"AdaptiveConcurrency | action=refund_try status=failed job_id={job_id} error='{e}'")
+
+
+def adaptive_concurrency(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Декоратор задачи ARQ: выполнение в слоте AdaptiveConcurrencyLimiter из ctx["concurrency_limiter"].
+    Без лимитера в контексте задача выполняется как обычно.
+    Отложенный запуск (arq.Retry: нет слота, токена rate limiter'а, провайдеры недоступны) не расходует max_tries.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(ctx: dict[str, Any], *args: Any, **kwargs: Any) -> Any:
+        try:
+            limiter = ctx.get("concurrency_limiter")
+            if not isinstance(limiter, AdaptiveConcurrencyLimiter):
+                return await func(ctx, *args, **kwargs)
+
+            async with limiter.slot() as job_slot:
+                ctx["concurrency_slot"] = job_slot
+                # Бюджет задачи — от получения слота, а не от взятия job'а из очереди
+                async with asyncio.timeout(limiter.job_timeout):
+                    return await func(ctx, *args, **kwargs)
+        except Retry:
+            await refund_job_try(ctx)
+            raise
+
+    return wrapper
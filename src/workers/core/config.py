@@ -1,6 +1,9 @@
+import math
+
 from pydantic import Field
 
 from src.shared.core.config import CommonSettings
+from src.shared.core.constants import NotificationProviders
 
 
 class WorkerSettings(CommonSettings):
@@ -23,17 +26,88 @@ class WorkerSettings(CommonSettings):
     TWILIO_ACCOUNT_SID: str | None = None
     TWILIO_AUTH_TOKEN: str | None = None
     TWILIO_PHONE_NUMBER: str | None = None
+    # Код страны для номеров клиентов в национальном формате (0151... -> +49151...)
+    TWILIO_DEFAULT_COUNTRY_CODE: str = "49"
 
     # WhatsApp Content Template SID
     TWILIO_WHATSAPP_TEMPLATE_SID: str = "HXd8c4bef13f103fbd4f0796cd2ad03e8e"
 
+    # --- Provider Rate Limits (общие для всех реплик воркера) ---
+    # Запросов в секунду и размер burst; 0 — без ограничения
+    RATE_LIMIT_SMTP_PER_SECOND: float = 5.0
+    RATE_LIMIT_SMTP_BURST: int = 10
+    RATE_LIMIT_SENDGRID_PER_SECOND: float = 10.0
+    RATE_LIMIT_SENDGRID_BURST: int = 20
+    RATE_LIMIT_TWILIO_PER_SECOND: float = 1.0
+    RATE_LIMIT_TWILIO_BURST: int = 5
+    RATE_LIMIT_MAX_WAIT: float = 30.0
+
+    # --- Circuit Breaker (SMTP, SendGrid, WhatsApp, SMS) ---
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # подряд идущих ошибок до размыкания
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 60.0  # секунд до пробного запроса (half-open)
+    CIRCUIT_BREAKER_FAILURE_WINDOW: int = 300  # секунд хранения счетчика ошибок
+
     # --- Templates ---
     TEMPLATES_DIR: str = "src/workers/templates"
+    # Минификация HTML-шаблонов при загрузке (комментарии и отступы; условные комментарии MSO сохраняются)
+    EMAIL_MINIFY: bool = True
+    # Лимит размера письма в байтах (Gmail обрезает письма больше ~102KB); 0 — без проверки
+    EMAIL_SIZE_BUDGET: int = 102_000
+    # Лимиты для отдельных шаблонов, например {"reminder.html": 50000}
+    EMAIL_SIZE_BUDGETS: dict[str, int] = Field(default_factory=dict)
+    # True — письмо больше лимита не отправляется (ошибка), False — только предупреждение и метрика
+    EMAIL_SIZE_BUDGET_STRICT: bool = False
 
     # --- ARQ Configuration ---
     arq_max_jobs: int = 10
     arq_job_timeout: int = 60
     arq_keep_result: int = 60
+    # Отдельная емкость для массовых рассылок (очередь ArqQueues.BULK)
+    arq_bulk_max_jobs: int = 5
+    # Адаптивная параллельность (AIMD): arq_max_jobs — верхняя граница, arq_min_jobs — нижняя
+    arq_adaptive_concurrency: bool = True
+    arq_min_jobs: int = 2
+    arq_latency_target: float = 5.0  # секунд на обращение к провайдеру; медленнее — лимит снижается
+    # Максимальное ожидание слота (сек), дальше задача откладывается; не расходует arq_job_timeout
+    arq_slot_wait_timeout: float = 30.0
+    # Попыток выполнения задачи (ARQ max_tries); отложенные запуски (rate limit, слот, circuit breaker) не считаются
+    arq_max_tries: int = 5
+
+    # --- Supervisor (несколько процессов воркера в одном контейнере) ---
+    worker_processes: int = 0  # 0 — по числу CPU
+    worker_drain_timeout: float = 30.0  # секунд на завершение задач после SIGTERM
+    worker_process_index: int | None = None  # номер дочернего процесса (задает супервизор)
+
+    # --- Metrics (Prometheus /metrics воркера) ---
+    worker_metrics_enabled: bool = True
+    worker_metrics_port: int = 9100  # при запуске через supervisor: port + номер процесса
+    worker_metrics_interval: float = 15.0  # секунд между опросами Redis (глубина очередей, lag стримов)
+
+    # --- Stream Requeue (Retries) ---
+    # Общая политика повторов для requeue_to_stream и requeue_event_task
+    stream_requeue_max_retries: int = 5
+    stream_requeue_base_delay: float = 2.0  # секунд, удваивается с каждой попыткой
+    stream_requeue_max_delay: float = 300.0
+
+    # --- Notification Idempotency ---
+    # Сколько помнить об отправленном уведомлении (защита от повторной отправки при ретраях)
+    notification_dedup_ttl: int = 86400
+    # Блокировка на время отправки (должна быть больше effective_job_timeout)
+    notification_send_lock_ttl: int = 120
+
+    # --- Notification Debounce ---
+    # Окно (сек), в течение которого повторные уведомления по одной записи схлопываются (0 = выключено)
+    notification_debounce_seconds: float = 0
+
+    # --- Delay Queue (отложенные уведомления, напоминания) ---
+    delay_queue_enabled: bool = True
+    delay_queue_name: str = "delay_queue:notifications"
+    delay_queue_poll_interval: float = 1.0
+    delay_queue_batch_size: int = 100
+    # Попытки доставки элемента до переноса в <delay_queue_name>:dead_letter
+    delay_queue_max_attempts: int = 10
+    # Секунд, через которые забранный, но не подтвержденный элемент (воркер упал посреди пачки) вернется в очередь
+    delay_queue_visibility_timeout: float = 60.0
 
     # --- Redis (Internal field for ENV) ---
     redis_url_env: str | None = Field(default=None, alias="REDIS_URL")
@@ -50,3 +124,19 @@ class WorkerSettings(CommonSettings):
             port=self.redis_port,
             password=self.redis_password,
         )
+
+    @property
+    def provider_rate_limits(self) -> dict[str, tuple[float, int]]:
+        """Лимиты провайдеров в формате RedisRateLimiter: {провайдер: (в секунду, burst)}."""
+        return {
+            NotificationProviders.SMTP: (self.RATE_LIMIT_SMTP_PER_SECOND, self.RATE_LIMIT_SMTP_BURST),
+            NotificationProviders.SENDGRID: (self.RATE_LIMIT_SENDGRID_PER_SECOND, self.RATE_LIMIT_SENDGRID_BURST),
+            NotificationProviders.TWILIO: (self.RATE_LIMIT_TWILIO_PER_SECOND, self.RATE_LIMIT_TWILIO_BURST),
+        }
+
+    @property
+    def effective_job_timeout(self) -> int:
+        """job_timeout для ARQ: бюджет задачи плюс ожидание слота адаптивного лимита."""
+        if not self.arq_adaptive_concurrency:
+            return self.arq_job_timeout
+        return self.arq_job_timeout + math.ceil(self.arq_slot_wait_timeout)
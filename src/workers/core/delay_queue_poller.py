@@ -0,0 +1,163 @@
+import asyncio
+import contextlib
+import time
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger as log
+
+from src.workers.core.tasks import compute_backoff_delay
+
+if TYPE_CHECKING:
+    from src.shared.core.manager_redis.delay_queue_manager import DelayQueueManager
+    from src.shared.core.manager_redis.manager import StreamManager
+    from src.workers.core.base import ArqService
+
+
+class DelayQueuePoller:
+    """
+    Фоновый цикл воркера: забирает наступившие элементы DelayQueueManager
+    и передает их в ARQ (задачи) или в Redis Stream (события).
+    """
+
+    def __init__(
+        self,
+        delay_queue: "DelayQueueManager",
+        arq_service: "ArqService | None",
+        stream_manager: "StreamManager | None",
+        poll_interval: float = 1.0,
+        batch_size: int = 100,
+        max_attempts: int = 10,
+        max_retry_delay: float = 300.0,
+    ):
+        self.delay_queue = delay_queue
+        self.arq_service = arq_service
+        self.stream_manager = stream_manager
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        # Недоставленный элемент возвращается в очередь с экспоненциальной задержкой, после max_attempts — в dead-letter
+        self.max_attempts = max_attempts
+        self.max_retry_delay = max_retry_delay
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запускает цикл опроса в фоне."""
+        if not self._task:
+            self._task = asyncio.create_task(self.run())
+            log.info(f"DelayQueuePoller | action=start queue='{self.delay_queue.queue_key}'")
+
+    async def stop(self) -> None:
+        """Останавливает цикл опроса."""
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            log.info(f"DelayQueuePoller | action=stop queue='{self.delay_queue.queue_key}'")
+
+    async def run(self) -> None:
+        """Основной цикл: пока элементы идут полными пачками — опрашиваем без паузы."""
+        while True:
+            try:
+                processed = await self.poll_once()
+            except Exception as e:
+                log.exception(f"DelayQueuePoller | action=poll status=failed error={e}")
+                processed = 0
+
+            if processed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def poll_once(self) -> int:
+        """
+        Один проход: забрать наступившие элементы и передать их дальше.
+        При остановке посреди пачки необработанные элементы сразу возвращаются в очередь; элемент, который
+        обрабатывался в момент остановки, вернется после visibility timeout очереди.
+        """
+        items = await self.delay_queue.claim_due(self.batch_size)
+        processed = 0
+        try:
+            for item_id, payload in items:
+                # Ошибка одного элемента не должна мешать остальным
+                processed += 1
+                await self._process(item_id, payload)
+        except asyncio.CancelledError:
+            await self.delay_queue.release([item_id for item_id, _ in items[processed:]])
+            raise
+
+        if items:
+            log.debug(f"DelayQueuePoller | action=poll status=success count={len(items)}")
+        return len(items)
+
+    async def _process(self, item_id: str, payload: dict[str, Any]) -> None:
+        try:
+            delivered = await self._dispatch(item_id, payload)
+        except ValueError as e:
+            # Некорректный элемент не исправится повтором
+            await self._dead_letter(item_id, payload, str(e))
+            return
+        except Exception as e:
+            log.exception(f"DelayQueuePoller | action=dispatch status=failed item_id='{item_id}' error={e}")
+            delivered = False
+
+        if delivered:
+            await self.delay_queue.ack(item_id)
+        else:
+            await self._retry(item_id, payload)
+
+    async def _dispatch(self, item_id: str, payload: dict[str, Any]) -> bool:
+        """Передает элемент в ARQ или стрим. True — доставлен, False — повторить позже, ValueError — некорректный."""
+        kind = payload.get("kind")
+        if kind == self.delay_queue.KIND_JOB:
+            function = payload.get("function")
+            if not function:
+                raise ValueError("No function")
+            if not self.arq_service:
+                return self._no_target(item_id, kind)
+
+            kwargs = payload.get("kwargs") or {}
+            job = await self.arq_service.enqueue_job(function, **kwargs)
+            if job is not None:
+                return True
+            # ARQ не ставит задачу с уже существующим _job_id — такой элемент уже доставлен
+            job_id = kwargs.get("_job_id")
+            if job_id and await self.arq_service.job_exists(job_id):
+                log.info(f"DelayQueuePoller | action=dispatch status=duplicate item_id='{item_id}' job_id='{job_id}'")
+                return True
+            return False
+
+        if kind == self.delay_queue.KIND_EVENT:
+            stream = payload.get("stream")
+            if not stream:
+                raise ValueError("No stream")
+            if not self.stream_manager:
+                return self._no_target(item_id, kind)
+
+            message_id = await self.stream_manager.add_event(stream, payload.get("data") or {})
+            return message_id is not None
+
+        raise ValueError(f"Unknown kind: {kind}")
+
+    def _no_target(self, item_id: str, kind: str) -> bool:
+        log.error(
+            f"DelayQueuePoller | action=dispatch status=failed reason='No target' item_id='{item_id}' kind={kind}"
+        )
+        return False
+
+    async def _retry(self, item_id: str, payload: dict[str, Any]) -> None:
+        """Возвращает элемент в очередь с растущей задержкой; после `max_attempts` — в dead-letter."""
+        attempts = int(payload.get("_attempts", 0)) + 1
+        if attempts >= self.max_attempts:
+            await self._dead_letter(item_id, payload, f"Max attempts reached ({attempts})")
+            return
+
+        delay = compute_backoff_delay(attempts, self.poll_interval, self.max_retry_delay)
+        try:
+            await self.delay_queue.schedule(item_id, time.time() + delay, {**payload, "_attempts": attempts})
+        except Exception as e:
+            log.exception(f"DelayQueuePoller | action=retry status=failed item_id='{item_id}' error={e}")
+
+    async def _dead_letter(self, item_id: str, payload: dict[str, Any], reason: str) -> None:
+        log.error(f"DelayQueuePoller | action=dead_letter item_id='{item_id}' reason='{reason}'")
+        try:
+            await self.delay_queue.dead_letter(item_id, payload, reason)
+        except Exception as e:
+            log.exception(f"DelayQueuePoller | action=dead_letter status=failed item_id='{item_id}' error={e}")
@@ -0,0 +1,155 @@
+import contextlib
+import functools
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from loguru import logger as log
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from src.shared.core.tracing import (
+    TRACE_ID_FIELD,
+    new_trace_id,
+    register_traced_function,
+    reset_trace_id,
+    set_trace_id,
+)
+
+# Секунды: от быстрых обращений к Redis до медленных провайдеров и долгого ожидания в очереди
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+JOB_DURATION = Histogram(
+    "worker_job_duration_seconds",
+    "Время выполнения задачи ARQ",
+    ["function", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+JOB_QUEUE_WAIT = Histogram(
+    "worker_job_queue_wait_seconds",
+    "Время ожидания задачи в очереди (от запланированного запуска до начала выполнения)",
+    ["function"],
+    buckets=LATENCY_BUCKETS,
+)
+JOB_SPAN = Histogram(
+    "worker_job_span_seconds",
+    "Время этапа задачи (cache_fetch, render, send)",
+    ["function", "span"],
+    buckets=LATENCY_BUCKETS,
+)
+
+JOBS_IN_FLIGHT = Gauge("worker_jobs_in_flight", "Задачи, выполняемые в данный момент", ["function"])
+JOB_RETRIES = Counter("worker_job_retries_total", "Повторные запуски задач ARQ (job_try > 1)", ["function"])
+PROVIDER_ERRORS = Counter("worker_provider_errors_total", "Ошибки отправки через канал провайдера", ["channel"])
+STREAM_REQUEUES = Counter(
+    "worker_stream_requeues_total", "Возвраты событий в стрим (requeued / dead_letter)", ["stream", "outcome"]
+)
+
+EMAIL_SIZE = Histogram(
+    "worker_email_size_bytes",
+    "Размер отрендеренного письма",
+    ["template"],
+    buckets=(2_000, 5_000, 10_000, 20_000, 50_000, 80_000, 102_000, 150_000, 250_000),
+)
+EMAIL_SIZE_OVER_BUDGET = Counter(
+    "worker_email_size_over_budget_total", "Письма, превысившие лимит размера шаблона", ["template"]
+)
+
+# Значения ниже обновляет MetricsCollector с заданным интервалом, а не при каждом scrape
+QUEUE_DEPTH = Gauge("worker_queue_depth", "Задачи в очереди ARQ (включая отложенные)", ["queue"])
+STREAM_LAG = Gauge("worker_stream_lag", "Непрочитанные группой события стрима", ["stream", "group"])
+STREAM_PENDING = Gauge("worker_stream_pending", "Прочитанные, но не подтвержденные события", ["stream", "group"])
+CONCURRENCY_LIMIT = Gauge("worker_concurrency_limit", "Текущий адаптивный лимит параллельных задач")
+RATE_LIMIT_WAITS = Counter(
+    "worker_rate_limit_waits_total",
+    "Отправки, ожидавшие токен rate limiter (outcome: acquired — дождались, deferred — задача отложена)",
+    ["provider", "outcome"],
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "worker_rate_limit_wait_seconds",
+    "Время ожидания токена rate limiter",
+    ["provider"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Имя выполняемой задачи — метка для этапов, измеряемых внутри сервисов
+_current_job: ContextVar[str] = ContextVar("current_job", default="unknown")
+
+
+@contextlib.contextmanager
+def job_span(name: str) -> Iterator[None]:
+    """Измеряет этап текущей задачи (например, `with job_span("render"): ...`)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        JOB_SPAN.labels(_current_job.get(), name).observe(time.perf_counter() - started)
+
+
+def observe_rate_limit_wait(provider: str, waited: float, deferred: bool) -> None:
+    """Учитывает ожидание токена RedisRateLimiter (передается лимитеру как on_wait)."""
+    RATE_LIMIT_WAITS.labels(provider, "deferred" if deferred else "acquired").inc()
+    RATE_LIMIT_WAIT_SECONDS.labels(provider).observe(waited)
+
+
+def _queue_wait(ctx: dict[str, Any]) -> float | None:
+    # score — время запланированного запуска (мс), учитывает _defer_by; enqueue_time — время постановки
+    score = ctx.get("score")
+    if score:
+        return max(0.0, time.time() - score / 1000)
+    enqueue_time = ctx.get("enqueue_time")
+    if enqueue_time is not None:
+        return max(0.0, time.time() - enqueue_time.timestamp())
+    return None
+
+
+def traced_job(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Декоратор задачи ARQ: trace_id, ожидание в очереди и длительность задачи.
+
+    trace_id берется из kwargs задачи (ArqService.enqueue_job добавляет его только задачам,
+    зарегистрированным этим декоратором) или создается новый;
+    он доступен через get_trace_id() и попадает в логи (extra["trace_id"]) и в события стримов.
+    """
+    register_traced_function(func.__name__)
+
+    @functools.wraps(func)
+    async def wrapper(ctx: dict[str, Any], *args: Any, **kwargs: Any) -> Any:
+        trace_id = kwargs.pop(TRACE_ID_FIELD, None) or new_trace_id()
+        function = func.__name__
+
+        queue_wait = _queue_wait(ctx)
+        if queue_wait is not None:
+            JOB_QUEUE_WAIT.labels(function).observe(queue_wait)
+        if ctx.get("job_try", 1) > 1:
+            JOB_RETRIES.labels(function).inc()
+
+        trace_token = set_trace_id(trace_id)
+        job_token = _current_job.set(function)
+        started = time.perf_counter()
+        status = "failed"
+        JOBS_IN_FLIGHT.labels(function).inc()
+        try:
+            with log.contextualize(trace_id=trace_id):
+                result = await func(ctx, *args, **kwargs)
+            job_slot = ctx.get("concurrency_slot")
+            status = "failed" if getattr(job_slot, "failed", False) else "success"
+            return result
+        finally:
+            JOB_DURATION.labels(function, status).observe(time.perf_counter() - started)
+            JOBS_IN_FLIGHT.labels(function).dec()
+            _current_job.reset(job_token)
+            reset_trace_id(trace_token)
+
+    return wrapper
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> bool:
+    """Запускает HTTP сервер /metrics для Prometheus (в отдельном потоке)."""
+    try:
+        start_http_server(port, addr=addr)
+    except OSError as e:
+        log.error(f"WorkerMetrics | action=start_server status=failed port={port} error={e}")
+        return False
+    log.info(f"WorkerMetrics | action=start_server status=success port={port}")
+    return True
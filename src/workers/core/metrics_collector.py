@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+from typing import TYPE_CHECKING
+
+from loguru import logger as log
+
+from src.shared.core.constants import RedisStreams
+from src.workers.core.metrics import (
+    CONCURRENCY_LIMIT,
+    QUEUE_DEPTH,
+    STREAM_LAG,
+    STREAM_PENDING,
+)
+
+if TYPE_CHECKING:
+    from src.shared.core.manager_redis.manager import StreamManager
+    from src.shared.core.redis_service import RedisService
+    from src.workers.core.base import ArqService
+    from src.workers.core.concurrency import AdaptiveConcurrencyLimiter
+
+
+class MetricsCollector:
+    """
+    Фоновый цикл воркера: с интервалом `interval` обновляет gauge-метрики,
+    для которых нужны запросы к Redis (глубина очередей ARQ, lag стримов),
+    и снимает текущий адаптивный лимит параллельности. Scrape /metrics только читает готовые значения.
+    """
+
+    def __init__(
+        self,
+        redis_service: "RedisService",
+        arq_service: "ArqService | None",
+        stream_manager: "StreamManager | None",
+        queue_names: tuple[str, ...] | list[str],
+        stream_names: tuple[str, ...] | list[str],
+        concurrency_limiter: "AdaptiveConcurrencyLimiter | None" = None,
+        interval: float = 15.0,
+    ):
+        self.redis = redis_service
+        self.arq_service = arq_service
+        self.stream_manager = stream_manager
+        self.queue_names = queue_names
+        self.stream_names = stream_names
+        self.concurrency_limiter = concurrency_limiter
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запускает цикл сбора метрик в фоне."""
+        if not self._task:
+            self._task = asyncio.create_task(self.run())
+            log.info(f"MetricsCollector | action=start interval={self.interval}")
+
+    async def stop(self) -> None:
+        """Останавливает цикл сбора метрик."""
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            log.info("MetricsCollector | action=stop")
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.collect_once()
+            except Exception as e:
+                log.exception(f"MetricsCollector | action=collect status=failed error={e}")
+            await asyncio.sleep(self.interval)
+
+    async def collect_once(self) -> None:
+        """Один проход сбора метрик."""
+        if self.arq_service:
+            depths = await self.arq_service.get_queue_depths(self.queue_names)
+            for queue, depth in depths.items():
+                QUEUE_DEPTH.labels(queue).set(depth)
+
+        for stream_name in self.stream_names:
+            await self._collect_stream(stream_name)
+
+        if self.concurrency_limiter:
+            CONCURRENCY_LIMIT.set(self.concurrency_limiter.current_limit)
+
+    async def _collect_stream(self, stream_name: str) -> None:
+        # Lag и pending суммируются по партициям стрима
+        partitions = self.stream_manager.get_partitions(stream_name) if self.stream_manager else 1
+        lag: dict[str, int] = {}
+        pending: dict[str, int] = {}
+        for partition in RedisStreams.partition_names(stream_name, partitions):
+            for group in await self.redis.stream_groups_info(partition):
+                name = str(group.get("name"))
+                lag[name] = lag.get(name, 0) + int(group.get("lag") or 0)
+                pending[name] = pending.get(name, 0) + int(group.get("pending") or 0)
+
+        for group_name, value in lag.items():
+            STREAM_LAG.labels(stream_name, group_name).set(value)
+        for group_name, value in pending.items():
+            STREAM_PENDING.labels(stream_name, group_name).set(value)
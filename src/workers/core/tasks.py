@@ -1,34 +1,104 @@
-from typing import Any
+import random
+from typing import TYPE_CHECKING, Any, cast
 
 from loguru import logger as log
 
+from src.shared.core.constants import RedisStreams
+from src.workers.core.metrics import STREAM_REQUEUES
 
-async def requeue_to_stream(ctx: dict[str, Any], stream_name: str, payload: dict[str, Any]) -> None:
+if TYPE_CHECKING:
+    from src.shared.core.manager_redis.manager import StreamManager
+    from src.workers.core.base import ArqService
+    from src.workers.core.config import WorkerSettings
+
+# Значения по умолчанию, если настройки воркера недоступны в контексте
+DEFAULT_REQUEUE_MAX_RETRIES = 5
+DEFAULT_REQUEUE_BASE_DELAY = 2.0
+DEFAULT_REQUEUE_MAX_DELAY = 300.0
+
+
+def compute_backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
     """
-    Универсальная задача для возврата сообщения в Redis Stream.
-    Используется Ботом для повторной обработки событий при сбоях.
+    Экспоненциальная задержка с jitter для попытки `attempt` (начиная с 1).
+    Половина задержки фиксирована, вторая половина случайна — ретраи разных событий не синхронизируются.
     """
-    sm = ctx.get("stream_manager")
+    delay = min(max_delay, base_delay * (2 ** max(attempt - 1, 0)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def schedule_stream_requeue(ctx: dict[str, Any], stream_name: str, payload: dict[str, Any]) -> None:
+    """
+    Общая логика повторной отправки события в стрим.
+    Событие возвращается в стрим отложенной задачей ARQ с экспоненциальной задержкой,
+    после исчерпания попыток — уходит в dead-letter стрим.
+    """
+    sm = cast("StreamManager | None", ctx.get("stream_manager"))
     if not sm:
         log.error("requeue_to_stream | StreamManager not found in context")
         return
 
+    settings = cast("WorkerSettings | None", ctx.get("settings"))
+    max_retries = settings.stream_requeue_max_retries if settings else DEFAULT_REQUEUE_MAX_RETRIES
+    base_delay = settings.stream_requeue_base_delay if settings else DEFAULT_REQUEUE_BASE_DELAY
+    max_delay = settings.stream_requeue_max_delay if settings else DEFAULT_REQUEUE_MAX_DELAY
+
     # Увеличиваем счетчик попыток
     retries = int(payload.get("_retries", 0)) + 1
-    if retries > 5:
-        log.error(f"requeue_to_stream | Max retries reached for message type='{payload.get('type')}'. Dropping.")
+    if retries > max_retries:
+        STREAM_REQUEUES.labels(stream_name, "dead_letter").inc()
+        dead_letter = RedisStreams.dead_letter_name(stream_name)
+        log.error(
+            f"requeue_to_stream | Max retries reached for message type='{payload.get('type')}'. "
+            f"Moving to dead-letter stream '{dead_letter}'."
+        )
+        try:
+            await sm.add_event(dead_letter, {**payload, "_source_stream": stream_name})
+        except Exception as e:
+            log.error(f"requeue_to_stream | Failed to add event to dead-letter stream: {e}")
         return
 
+    STREAM_REQUEUES.labels(stream_name, "requeued").inc()
     payload["_retries"] = str(retries)
+    delay = compute_backoff_delay(retries, base_delay, max_delay)
+
+    arq_service = cast("ArqService | None", ctx.get("arq_service"))
+    if arq_service:
+        job = await arq_service.enqueue_job("deliver_to_stream", stream_name, payload, _defer_by=delay)
+        if job:
+            log.info(f"requeue_to_stream | Message scheduled to '{stream_name}' in {delay:.1f}s (retry #{retries})")
+            return
+
+    # Без ARQ отложить нельзя — возвращаем сразу, чтобы не потерять событие
+    log.warning(f"requeue_to_stream | Deferred requeue unavailable. Requeueing to '{stream_name}' immediately.")
+    await deliver_to_stream(ctx, stream_name, payload)
+
+
+async def deliver_to_stream(ctx: dict[str, Any], stream_name: str, payload: dict[str, Any]) -> None:
+    """
+    Отложенная часть ретрая: запись события обратно в Redis Stream.
+    """
+    sm = cast("StreamManager | None", ctx.get("stream_manager"))
+    if not sm:
+        log.error("deliver_to_stream | StreamManager not found in context")
+        return
 
     try:
         await sm.add_event(stream_name, payload)
-        log.info(f"requeue_to_stream | Message requeued to '{stream_name}' (retry #{retries})")
+        log.info(f"deliver_to_stream | Message requeued to '{stream_name}' (retry #{payload.get('_retries')})")
     except Exception as e:
-        log.error(f"requeue_to_stream | Failed to add event to stream: {e}")
+        log.error(f"deliver_to_stream | Failed to add event to stream: {e}")
+
+
+async def requeue_to_stream(ctx: dict[str, Any], stream_name: str, payload: dict[str, Any]) -> None:
+    """
+    Универсальная задача для возврата сообщения в Redis Stream.
+    Используется Ботом для повторной обработки событий при сбоях.
+    """
+    await schedule_stream_requeue(ctx, stream_name, payload)
 
 
 # Список базовых задач, которые должны быть в каждом воркере
 CORE_FUNCTIONS = [
     requeue_to_stream,
+    deliver_to_stream,
 ]
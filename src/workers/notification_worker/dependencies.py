@@ -2,24 +2,31 @@ from typing import Any
 
 from loguru import logger as log
 
+from src.shared.core.circuit_breaker import CircuitBreaker
+from src.shared.core.constants import ArqQueues, RedisStreams
+from src.shared.core.manager_redis.delay_queue_manager import DelayQueueManager
 from src.shared.core.manager_redis.manager import StreamManager
+from src.shared.core.rate_limiter import RedisRateLimiter
 from src.shared.schemas.site_settings import SiteSettingsSchema
 from src.workers.core.base import ArqService
 from src.workers.core.base_module.dependencies import (
     DependencyFunction,
     close_common_dependencies,
     init_common_dependencies,
+    requires,
 )
-from src.workers.core.base_module.twilio_service import TwilioService
+from src.workers.core.concurrency import AdaptiveConcurrencyLimiter
+from src.workers.core.delay_queue_poller import DelayQueuePoller
+from src.workers.core.metrics import observe_rate_limit_wait
+from src.workers.core.metrics_collector import MetricsCollector
 from src.workers.notification_worker.config import WorkerSettings
-from src.workers.notification_worker.services.notification_service import NotificationService
 
 
 async def init_arq_service(ctx: dict[str, Any], settings: WorkerSettings) -> None:
     """Инициализация ArqService."""
     log.info("Initializing ArqService...")
     try:
-        arq_service = ArqService(settings.arq_redis_settings)
+        arq_service = ArqService(settings.arq_redis_settings, default_queue_name=ArqQueues.TRANSACTIONAL)
         await arq_service.init()
         ctx["arq_service"] = arq_service
         log.info("ArqService initialized successfully.")
@@ -36,6 +43,7 @@ async def close_arq_service(ctx: dict[str, Any], settings: WorkerSettings) -> No
         log.info("ArqService closed.")
 
 
+@requires(init_common_dependencies)
 async def init_stream_manager(ctx: dict[str, Any], settings: WorkerSettings) -> None:
     """Инициализация Stream Manager."""
     log.info("Initializing Stream Manager...")
@@ -43,7 +51,10 @@ async def init_stream_manager(ctx: dict[str, Any], settings: WorkerSettings) ->
         redis_service = ctx.get("redis_service")
         if not redis_service:
             raise RuntimeError("RedisService not found in context.")
-        stream_manager = StreamManager(redis_service)
+        stream_manager = StreamManager(
+            redis_service,
+            partitioned_streams={RedisStreams.BotEvents.NAME: settings.redis_stream_partitions},
+        )
         ctx["stream_manager"] = stream_manager
         log.info("Stream Manager initialized successfully.")
     except Exception as e:
@@ -51,10 +62,138 @@ async def init_stream_manager(ctx: dict[str, Any], settings: WorkerSettings) ->
         raise
 
 
+@requires(init_common_dependencies, init_arq_service, init_stream_manager)
+async def init_delay_queue(ctx: dict[str, Any], settings: WorkerSettings) -> None:
+    """Инициализация очереди отложенных задач и запуск ее опроса."""
+    log.info("Initializing DelayQueue...")
+    try:
+        redis_service = ctx.get("redis_service")
+        if not redis_service:
+            raise RuntimeError("RedisService not found in context.")
+        delay_queue = DelayQueueManager(
+            redis_service, settings.delay_queue_name, visibility_timeout=settings.delay_queue_visibility_timeout
+        )
+        ctx["delay_queue"] = delay_queue
+
+        if settings.delay_queue_enabled:
+            poller = DelayQueuePoller(
+                delay_queue,
+                arq_service=ctx.get("arq_service"),
+                stream_manager=ctx.get("stream_manager"),
+                poll_interval=settings.delay_queue_poll_interval,
+                batch_size=settings.delay_queue_batch_size,
+                max_attempts=settings.delay_queue_max_attempts,
+            )
+            poller.start()
+            ctx["delay_queue_poller"] = poller
+        log.info("DelayQueue initialized successfully.")
+    except Exception as e:
+        log.exception(f"Failed to initialize DelayQueue: {e}")
+        raise
+
+
+async def close_delay_queue(ctx: dict[str, Any], settings: WorkerSettings) -> None:
+    """Остановка опроса очереди отложенных задач."""
+    poller = ctx.get("delay_queue_poller")
+    if poller:
+        await poller.stop()
+        log.info("DelayQueuePoller stopped.")
+
+
+@requires(init_common_dependencies)
+async def init_rate_limiter(ctx: dict[str, Any], settings: WorkerSettings) -> None:
+    """Инициализация распределенного rate limiter для провайдеров (SMTP, SendGrid, Twilio)."""
+    log.info("Initializing RateLimiter...")
+    try:
+        redis_service = ctx.get("redis_service")
+        if not redis_service:
+            raise RuntimeError("RedisService not found in context.")
+        ctx["rate_limiter"] = RedisRateLimiter(
+            redis_service,
+            limits=settings.provider_rate_limits,
+            max_wait=settings.RATE_LIMIT_MAX_WAIT,
+            on_wait=observe_rate_limit_wait,
+        )
+        log.info("RateLimiter initialized successfully.")
+    except Exception as e:
+        log.exception(f"Failed to initialize RateLimiter: {e}")
+        raise
+
+
+@requires(init_common_dependencies)
+async def init_circuit_breaker(ctx: dict[str, Any], settings: WorkerSettings) -> None:
+    """Инициализация circuit breaker для каналов доставки (состояние общее для всех воркеров)."""
+    log.info("Initializing CircuitBreaker...")
+    try:
+        redis_service = ctx.get("redis_service")
+        if not redis_service:
+            raise RuntimeError("RedisService not found in context.")
+        ctx["circuit_breaker"] = CircuitBreaker(
+            redis_service,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT,
+            failure_window=settings.CIRCUIT_BREAKER_FAILURE_WINDOW,
+        )
+        log.info("CircuitBreaker initialized successfully.")
+    except Exception as e:
+        log.exception(f"Failed to initialize CircuitBreaker: {e}")
+        raise
+
+
+async def init_concurrency_limiter(ctx: dict[str, Any], settings: WorkerSettings) -> None:
+    """Инициализация адаптивного лимита параллельности задач отправки."""
+    if not settings.arq_adaptive_concurrency:
+        log.info("Adaptive concurrency is disabled.")
+        return
+
+    ctx["concurrency_limiter"] = AdaptiveConcurrencyLimiter(
+        min_limit=settings.arq_min_jobs,
+        max_limit=settings.arq_max_jobs,
+        latency_target=settings.arq_latency_target,
+        job_timeout=settings.arq_job_timeout,
+        slot_wait_timeout=settings.arq_slot_wait_timeout,
+    )
+    log.info(f"AdaptiveConcurrencyLimiter initialized (min={settings.arq_min_jobs}, max={settings.arq_max_jobs}).")
+
+
+@requires(init_common_dependencies, init_arq_service, init_stream_manager, init_concurrency_limiter)
+async def init_metrics_collector(ctx: dict[str, Any], settings: WorkerSettings) -> None:
+    """Запуск фонового сбора метрик (глубина очередей ARQ, lag bot_events, адаптивный лимит)."""
+    if not settings.worker_metrics_enabled:
+        return
+
+    redis_service = ctx.get("redis_service")
+    if not redis_service:
+        raise RuntimeError("RedisService not found in context.")
+    collector = MetricsCollector(
+        redis_service,
+        arq_service=ctx.get("arq_service"),
+        stream_manager=ctx.get("stream_manager"),
+        queue_names=ArqQueues.ALL,
+        stream_names=[RedisStreams.BotEvents.NAME],
+        concurrency_limiter=ctx.get("concurrency_limiter"),
+        interval=settings.worker_metrics_interval,
+    )
+    collector.start()
+    ctx["metrics_collector"] = collector
+
+
+async def close_metrics_collector(ctx: dict[str, Any], settings: WorkerSettings) -> None:
+    """Остановка фонового сбора метрик."""
+    collector = ctx.get("metrics_collector")
+    if collector:
+        await collector.stop()
+
+
+@requires(init_common_dependencies, init_rate_limiter, init_circuit_breaker)
 async def init_notification_service(ctx: dict[str, Any], settings: WorkerSettings) -> None:
     """Инициализация NotificationService."""
     log.info("Initializing NotificationService...")
     try:
+        # Ленивый импорт: jinja2, aiosmtplib и т.д. загружаются только при инициализации сервиса
+        from src.workers.core.base_module.template_renderer import TemplateRenderer
+        from src.workers.notification_worker.services.notification_service import NotificationService
+
         raw_site_settings = ctx.get("site_settings")
         site_settings = raw_site_settings if isinstance(raw_site_settings, SiteSettingsSchema) else SiteSettingsSchema()
 
@@ -75,6 +214,15 @@ async def init_notification_service(ctx: dict[str, Any], settings: WorkerSetting
             url_path_contact_form=site_settings.url_path_contact_form,
             site_name=site_settings.company_name,
             address=site_settings.address,
+            rate_limiter=ctx.get("rate_limiter"),
+            circuit_breaker=ctx.get("circuit_breaker"),
+            renderer=TemplateRenderer(
+                str(settings.TEMPLATES_DIR),
+                minify=settings.EMAIL_MINIFY,
+                size_budget=settings.EMAIL_SIZE_BUDGET,
+                size_budgets=settings.EMAIL_SIZE_BUDGETS,
+                strict_size_budget=settings.EMAIL_SIZE_BUDGET_STRICT,
+            ),
         )
         ctx["notification_service"] = notification_service
         log.info("NotificationService initialized successfully.")
@@ -83,6 +231,7 @@ async def init_notification_service(ctx: dict[str, Any], settings: WorkerSetting
         raise
 
 
+@requires(init_rate_limiter, init_circuit_breaker)
 async def init_twilio_service(ctx: dict[str, Any], settings: WorkerSettings) -> None:
     """Инициализация TwilioService."""
     log.info("Initializing TwilioService...")
@@ -101,10 +250,16 @@ async def init_twilio_service(ctx: dict[str, Any], settings: WorkerSettings) ->
         assert auth_token is not None
         assert phone_number is not None
 
+        # Ленивый импорт: пакет twilio тяжелый и нужен только при настроенном канале
+        from src.workers.core.base_module.twilio_service import TwilioService
+
         twilio_service = TwilioService(
             account_sid=account_sid,
             auth_token=auth_token,
             from_number=phone_number,
+            rate_limiter=ctx.get("rate_limiter"),
+            circuit_breaker=ctx.get("circuit_breaker"),
+            default_country_code=settings.TWILIO_DEFAULT_COUNTRY_CODE,
         )
         ctx["twilio_service"] = twilio_service
         log.info("TwilioService initialized successfully.")
@@ -117,11 +272,18 @@ STARTUP_DEPENDENCIES: list[DependencyFunction] = [
     init_common_dependencies,
     init_arq_service,
     init_stream_manager,
+    init_delay_queue,
+    init_rate_limiter,
+    init_circuit_breaker,
+    init_concurrency_limiter,
+    init_metrics_collector,
     init_notification_service,
     init_twilio_service,
 ]
 
 SHUTDOWN_DEPENDENCIES: list[DependencyFunction] = [
+    close_metrics_collector,
+    close_delay_queue,
     close_arq_service,
     close_common_dependencies,
 ]
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+DATETIME_FORMAT = "%d.%m.%Y %H:%M"
+CALENDAR_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def _is_canonical(value: str) -> bool:
+    return len(value) == 16 and value[2] == "." and value[5] == "." and value[10] == " " and value[13] == ":"
+
+
+def parse_appointment_datetime(value: str) -> datetime | None:
+    """
+    Разбор даты записи "ДД.ММ.ГГГГ ЧЧ:ММ".
+    Строка в каноническом формате разбирается срезами (в разы быстрее strptime),
+    остальные варианты (например, без ведущих нулей) — через strptime.
+    """
+    if _is_canonical(value):
+        try:
+            return datetime(int(value[6:10]), int(value[3:5]), int(value[0:2]), int(value[11:13]), int(value[14:16]))
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(value, DATETIME_FORMAT)
+    except (ValueError, TypeError):
+        return None
+
+
+class AppointmentContext:
+    """
+    Нормализованные данные времени записи: дата разбирается один раз,
+    строки для Email, SMS/WhatsApp и Google Calendar вычисляются заранее.
+
+    Передается в задачи ARQ внутри data (ключ DATA_KEY), поэтому задачи отправки
+    не разбирают дату повторно.
+    """
+
+    __slots__ = ("raw", "start", "date", "time", "duration_minutes", "calendar_dates")
+
+    DATA_KEY = "appointment_context"
+
+    def __init__(
+        self,
+        raw: str,
+        start: datetime | None,
+        date: str,
+        time: str,
+        duration_minutes: int,
+        calendar_dates: str,
+    ):
+        self.raw = raw
+        self.start = start
+        self.date = date
+        self.time = time
+        self.duration_minutes = duration_minutes
+        self.calendar_dates = calendar_dates
+
+    @classmethod
+    def parse(cls, raw: str, duration_minutes: int = 30) -> "AppointmentContext":
+        """Разбирает строку даты записи и вычисляет производные значения."""
+        start = parse_appointment_datetime(raw)
+        if start is None:
+            return cls(raw, None, raw, "", duration_minutes, "")
+
+        if _is_canonical(raw):
+            # Канонический формат: дата и время уже в нужном виде
+            date, time = raw[:10], raw[11:]
+        else:
+            date, time = start.strftime("%d.%m.%Y"), start.strftime("%H:%M")
+        end = start + timedelta(minutes=duration_minutes)
+        calendar_dates = f"{start.strftime(CALENDAR_FORMAT)}/{end.strftime(CALENDAR_FORMAT)}"
+        return cls(raw, start, date, time, duration_minutes, calendar_dates)
+
+    @classmethod
+    def from_data(cls, data: dict[str, Any]) -> "AppointmentContext":
+        """
+        Контекст для данных записи: готовый (из data[DATA_KEY]) или разобранный заново.
+        Готовый контекст используется, только если он построен для той же даты.
+        """
+        raw = str(data.get("datetime") or "")
+        try:
+            duration = int(data.get("duration_minutes", 30))
+        except (ValueError, TypeError):
+            duration = 30
+
+        cached = data.get(cls.DATA_KEY)
+        if isinstance(cached, dict) and cached.get("raw") == raw and cached.get("duration_minutes") == duration:
+            return cls.from_dict(cached)
+        return cls.parse(raw, duration)
+
+    def split_date_time(self) -> tuple[str, str]:
+        """Дата и время для шаблонов WhatsApp: при неразобранной дате — части строки по пробелу."""
+        if self.start is not None:
+            return self.date, self.time
+        parts = self.raw.split(" ")
+        return parts[0], parts[1] if len(parts) > 1 else ""
+
+    def to_dict(self) -> dict[str, Any]:
+        """Сериализуемое (в том числе в JSON) представление для передачи в задачи ARQ."""
+        return {
+            "raw": self.raw,
+            "start": self.start.isoformat() if self.start else None,
+            "date": self.date,
+            "time": self.time,
+            "duration_minutes": self.duration_minutes,
+            "calendar_dates": self.calendar_dates,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "AppointmentContext":
+        return cls(
+            raw=data["raw"],
+            start=datetime.fromisoformat(data["start"]) if data.get("start") else None,
+            date=data["date"],
+            time=data["time"],
+            duration_minutes=data["duration_minutes"],
+            calendar_dates=data["calendar_dates"],
+        )
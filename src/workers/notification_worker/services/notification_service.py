@@ -1,9 +1,18 @@
-from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
 from urllib.parse import quote
 
+from arq import Retry
+from loguru import logger as log
+
 from src.shared.utils.text import transliterate
 from src.workers.core.base_module.email_client import AsyncEmailClient
 from src.workers.core.base_module.template_renderer import TemplateRenderer
+from src.workers.core.metrics import job_span
+from src.workers.notification_worker.services.appointment_context import AppointmentContext
+
+if TYPE_CHECKING:
+    from src.shared.core.circuit_breaker import CircuitBreaker
+    from src.shared.core.rate_limiter import RedisRateLimiter
 
 
 class NotificationService:
@@ -25,6 +34,9 @@ class NotificationService:
         url_path_contact_form: str | None = None,
         site_name: str = "Team",
         address: str = "",
+        rate_limiter: "RedisRateLimiter | None" = None,
+        circuit_breaker: "CircuitBreaker | None" = None,
+        renderer: TemplateRenderer | None = None,
     ):
         if not all([smtp_host, smtp_port, smtp_from_email]):
             raise ValueError("Core SMTP settings are missing.")
@@ -41,8 +53,10 @@ class NotificationService:
             smtp_from_email=smtp_from_email,
             smtp_use_tls=smtp_use_tls,
             sendgrid_api_key=sendgrid_api_key,
+            rate_limiter=rate_limiter,
+            circuit_breaker=circuit_breaker,
         )
-        self.renderer = TemplateRenderer(templates_dir)
+        self.renderer = renderer or TemplateRenderer(templates_dir)
         self.site_url = site_url.rstrip("/")
         self.logo_url = logo_url
 
@@ -62,33 +76,24 @@ class NotificationService:
         path = self.logo_url if self.logo_url.startswith("/") else f"/{self.logo_url}"
         return f"{self.site_url}{path}"
 
-    def get_sms_text(self, data: dict) -> str:
+    def get_sms_text(self, data: dict, appointment: AppointmentContext | None = None) -> str:
         """Генерирует текст SMS."""
         first_name = data.get("first_name", "Guest")
-        dt_str = data.get("datetime", "")
-        try:
-            dt_obj = datetime.strptime(dt_str, "%d.%m.%Y %H:%M")
-            date = dt_obj.strftime("%d.%m.%Y")
-            time = dt_obj.strftime("%H:%M")
-        except (ValueError, TypeError):  # Исправлено: специфичные исключения
-            date = dt_str
-            time = ""
+        appointment = appointment or AppointmentContext.from_data(data)
+        date = appointment.date
+        time = appointment.time
 
         clean_name = transliterate(first_name)
         return f"Hallo {clean_name}, Ihr Termin am {date} um {time} bei {self.site_name} ist bestätigt. Wir freuen uns auf Sie!"
 
-    def _generate_google_calendar_url(self, data: dict) -> str:
+    def _generate_google_calendar_url(self, data: dict, appointment: AppointmentContext | None = None) -> str:
         """Генерирует ссылку для Google Calendar."""
         try:
             service_name = data.get("service_name", "Termin")
-            dt_str = data.get("datetime")
-            duration = int(data.get("duration_minutes", 30))
-            if not dt_str:
+            appointment = appointment or AppointmentContext.from_data(data)
+            dates = appointment.calendar_dates
+            if not dates:
                 return ""
-            start_dt = datetime.strptime(dt_str, "%d.%m.%Y %H:%M")
-            end_dt = start_dt + timedelta(minutes=duration)
-            fmt = "%Y%m%dT%H%M%S"
-            dates = f"{start_dt.strftime(fmt)}/{end_dt.strftime(fmt)}"
 
             base_url = "https://www.google.com/calendar/render?action=TEMPLATE"
             params = {
@@ -106,15 +111,18 @@ class NotificationService:
 
     def enrich_email_context(self, data: dict) -> dict:
         """Подготавливает полный контекст для Email шаблона."""
+        context = self.build_base_context(data)
+        context.update(self.build_recipient_context(context))
+        return context
+
+    def build_base_context(self, data: dict) -> dict:
+        """Общая часть контекста письма: данные записи, сайт, ссылки, не зависящие от получателя."""
         context = data.copy()
-        dt_str = str(context.get("datetime", ""))
-        try:
-            dt_obj = datetime.strptime(dt_str, "%d.%m.%Y %H:%M")
-            context["date"] = dt_obj.strftime("%d.%m.%Y")
-            context["time"] = dt_obj.strftime("%H:%M")
-        except (ValueError, TypeError):  # Исправлено: специфичные исключения
-            context["date"] = dt_str
-            context["time"] = ""
+        # Дата разбирается один раз (или берется готовой из данных задачи)
+        appointment = AppointmentContext.from_data(data)
+        context.pop(AppointmentContext.DATA_KEY, None)
+        context["date"] = appointment.date
+        context["time"] = appointment.time
         context["site_url"] = self.site_url
         context["site_name"] = self.site_name
         context["address"] = self.address
@@ -128,10 +136,24 @@ class NotificationService:
             context["contact_form_url"] = f"{self.site_url}{path}"
         else:
             context["contact_form_url"] = "#"
-        context["calendar_url"] = self._generate_google_calendar_url(data)
-        if "name" in context and "greeting" not in context:
-            visits = int(context.get("visits_count", 0))
-            name = context["name"]
+        context["calendar_url"] = self._generate_google_calendar_url(data, appointment)
+        if self.url_path_reschedule:
+            path = (
+                self.url_path_reschedule if self.url_path_reschedule.startswith("/") else f"/{self.url_path_reschedule}"
+            )
+            context["link_reschedule"] = f"{self.site_url}{path}"
+            context["link_calendar"] = f"{self.site_url}{path}"
+        else:
+            context["link_reschedule"] = "#"
+            context["link_calendar"] = "#"
+        return context
+
+    def build_recipient_context(self, data: dict) -> dict:
+        """Персональная часть контекста: приветствие и ссылки с токеном получателя."""
+        context = {}
+        if "name" in data and "greeting" not in data:
+            visits = int(data.get("visits_count", 0))
+            name = data["name"]
             if visits == 0:
                 context["greeting"] = f"Sehr geehrte/r {name},"
             elif 1 <= visits <= 4:
@@ -147,18 +169,52 @@ class NotificationService:
             context["link_cancel"] = f"{self.site_url}{self.url_path_cancel.format(token=action_token)}"
         else:
             context["link_cancel"] = "#"
-        if self.url_path_reschedule:
-            path = (
-                self.url_path_reschedule if self.url_path_reschedule.startswith("/") else f"/{self.url_path_reschedule}"
-            )
-            context["link_reschedule"] = f"{self.site_url}{path}"
-            context["link_calendar"] = f"{self.site_url}{path}"
-        else:
-            context["link_reschedule"] = "#"
-            context["link_calendar"] = "#"
         return context
 
     async def send_notification(self, email: str, subject: str, template_name: str, data: dict):
-        full_context = self.enrich_email_context(data)
-        html_content = self.renderer.render(template_name, full_context)
-        await self.email_client.send_email(email, subject, html_content)
+        with job_span("render"):
+            full_context = self.enrich_email_context(data)
+            html_content, text_content = self.renderer.render_email(template_name, full_context)
+        with job_span("send"):
+            await self.email_client.send_email(email, subject, html_content, text_content=text_content)
+
+    async def send_bulk_notification(
+        self, subject: str, template_name: str, data: dict, recipients: list[dict]
+    ) -> list[bool]:
+        """
+        Рассылка одного письма множеству получателей.
+        Общий контекст и шаблон рендерятся один раз, персональные поля (`recipients[i]`,
+        кроме "email") подставляются для каждого получателя. Возвращает успех отправки по каждому получателю.
+
+        Если лимит провайдера исчерпан (arq.Retry), рассылка останавливается: результатов меньше,
+        чем получателей, оставшиеся не отправлялись.
+        """
+        with job_span("render"):
+            base_context = self.build_base_context(data)
+            recipient_contexts = []
+            for recipient in recipients:
+                personal = {key: value for key, value in recipient.items() if key != "email"}
+                recipient_contexts.append({**personal, **self.build_recipient_context({**data, **personal})})
+            html_contents = self.renderer.render_batch(template_name, base_context, recipient_contexts)
+            text_contents = self.renderer.render_batch(template_name, base_context, recipient_contexts, text=True)
+
+        results = []
+        for recipient, html_content, text_content in zip(recipients, html_contents, text_contents, strict=True):
+            try:
+                with job_span("send"):
+                    await self.email_client.send_email(
+                        recipient["email"], subject, html_content, text_content=text_content
+                    )
+                results.append(True)
+            except Retry:
+                log.warning(
+                    f"NotificationService | action=send_bulk status=rate_limited "
+                    f"sent={len(results)} deferred={len(recipients) - len(results)}"
+                )
+                break
+            except Exception as e:
+                log.error(
+                    f"NotificationService | action=send_bulk status=failed email={recipient.get('email')} error={e}"
+                )
+                results.append(False)
+        return results
@@ -0,0 +1,155 @@
+"""
+Супервизор Notification Worker: несколько процессов ARQ в одном контейнере.
+
+Запуск:
+    python -m src.workers.notification_worker.supervisor              # транзакционная очередь
+    python -m src.workers.notification_worker.supervisor --bulk       # массовые рассылки
+    python -m src.workers.notification_worker.supervisor --processes 4
+
+Модули воркера импортируются, а шаблоны прогреваются в родительском процессе до fork —
+дочерние процессы получают их (copy-on-write) без повторной загрузки и компиляции.
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+from types import FrameType
+
+from arq.worker import run_worker
+from loguru import logger as log
+
+from src.shared.core.logger import setup_logging
+from src.workers.core.base_module.template_renderer import TemplateRenderer
+from src.workers.notification_worker.worker import BulkWorkerSettings, WorkerSettings, settings
+
+# Если процесс упал быстрее, чем за это время, перезапуск откладывается с растущей задержкой (защита от crash loop)
+MIN_HEALTHY_UPTIME = 10.0
+MAX_RESTART_DELAY = 60.0
+# Секунд на shutdown воркера после ожидания задач (закрытие соединений, сброс логов)
+SHUTDOWN_GRACE = 5.0
+
+
+def run_worker_process(bulk: bool, slot: int) -> None:
+    """Точка входа дочернего процесса: обычный ARQ воркер."""
+    # У каждого процесса свой порт метрик и свои файлы логов
+    settings.worker_metrics_port += slot
+    settings.worker_process_index = slot
+    run_worker(BulkWorkerSettings if bulk else WorkerSettings)  # type: ignore[arg-type]
+
+
+class WorkerSupervisor:
+    """
+    Запускает N процессов воркера (fork), перезапускает упавшие
+    и корректно останавливает всех по SIGTERM/SIGINT.
+    """
+
+    def __init__(self, processes: int, bulk: bool, drain_timeout: float):
+        self.processes = processes
+        self.bulk = bulk
+        self.drain_timeout = drain_timeout
+        self.context = multiprocessing.get_context("fork")
+        self.children: dict[int, multiprocessing.process.BaseProcess] = {}
+        self.started_at: dict[int, float] = {}
+        self.restart_delay: dict[int, float] = {}
+        self.restart_at: dict[int, float] = {}
+        self.stopping = False
+
+    def _spawn(self, slot: int) -> None:
+        process = self.context.Process(
+            target=run_worker_process, args=(self.bulk, slot), name=f"notification-worker-{slot}", daemon=False
+        )
+        process.start()
+        self.children[slot] = process
+        self.started_at[slot] = time.monotonic()
+        log.info(f"WorkerSupervisor | action=spawn slot={slot} pid={process.pid}")
+
+    def _handle_signal(self, signum: int, frame: FrameType | None) -> None:
+        log.info(f"WorkerSupervisor | action=signal signal={signal.Signals(signum).name} status=draining")
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        for slot in range(self.processes):
+            self._spawn(slot)
+
+        while not self.stopping:
+            self._restart_crashed()
+            time.sleep(1)
+
+        self._drain()
+
+    def _restart_crashed(self) -> None:
+        now = time.monotonic()
+        for slot, process in list(self.children.items()):
+            if process.is_alive():
+                continue
+
+            restart_at = self.restart_at.get(slot)
+            if restart_at is None:
+                uptime = now - self.started_at[slot]
+                if uptime >= MIN_HEALTHY_UPTIME:
+                    self.restart_delay[slot] = 0.0
+                else:
+                    previous = self.restart_delay.get(slot, 0.0)
+                    self.restart_delay[slot] = min(MAX_RESTART_DELAY, max(1.0, previous * 2))
+                restart_at = now + self.restart_delay[slot]
+                self.restart_at[slot] = restart_at
+                log.warning(
+                    f"WorkerSupervisor | action=exited slot={slot} pid={process.pid} exitcode={process.exitcode} "
+                    f"uptime={uptime:.1f}s restart_in={self.restart_delay[slot]:.0f}s"
+                )
+
+            if now < restart_at:
+                continue
+
+            del self.restart_at[slot]
+            process.close()
+            self._spawn(slot)
+
+    def _drain(self) -> None:
+        """
+        Передает SIGTERM дочерним процессам и ждет их завершения: ARQ перестает брать задачи, ждет выполняемые
+        (job_completion_wait = worker_drain_timeout) и выполняет shutdown, на который отводится SHUTDOWN_GRACE.
+        """
+        for process in self.children.values():
+            if process.is_alive() and process.pid:
+                os.kill(process.pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.drain_timeout + SHUTDOWN_GRACE
+        for process in self.children.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+
+        for slot, process in self.children.items():
+            if process.is_alive():
+                log.warning(f"WorkerSupervisor | action=kill slot={slot} pid={process.pid} reason='drain timeout'")
+                process.kill()
+                process.join()
+
+        log.info("WorkerSupervisor | status=stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Notification Worker supervisor")
+    parser.add_argument("--processes", type=int, default=settings.worker_processes, help="0 = CPU count")
+    parser.add_argument("--bulk", action="store_true", help="Process the bulk (campaign) queue")
+    args = parser.parse_args()
+
+    # Без очереди loguru: обработчики супервизора наследуются дочерними процессами при fork
+    # и должны корректно закрываться их logger.remove()
+    setup_logging(settings, "notification_supervisor", enqueue=False)
+
+    processes = args.processes or os.cpu_count() or 1
+
+    # Прогрев шаблонов до fork
+    TemplateRenderer(str(settings.TEMPLATES_DIR), minify=settings.EMAIL_MINIFY).preload()
+
+    log.info(f"WorkerSupervisor | action=start processes={processes} bulk={args.bulk}")
+    WorkerSupervisor(processes, bulk=args.bulk, drain_timeout=settings.worker_drain_timeout).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,39 @@
 from typing import TYPE_CHECKING, Any, cast
 
+from arq import Retry
 from loguru import logger as log
 
+from src.shared.core.constants import ArqQueues
+from src.workers.core.concurrency import adaptive_concurrency, mark_job_failed
+from src.workers.notification_worker.tasks.utils import (
+    build_dedup_key,
+    claim_notification,
+    mark_notification_sent,
+    notification_version,
+    release_notification,
+)
 from src.workers.notification_worker.tasks.utils import send_status_update as _send_status_update
 
 if TYPE_CHECKING:
+    from src.workers.core.base import ArqService
     from src.workers.notification_worker.services.notification_service import NotificationService
 
+# Задержка повтора массовой рассылки после исчерпания лимита провайдера (сек)
+BULK_RATE_LIMIT_DEFER = 30
 
+
+@adaptive_concurrency
 async def send_email_task(
     ctx: dict[str, Any],
     recipient_email: str,
     subject: str,
     template_name: str,
     data: dict[str, Any],
+    dedup_version: str | None = None,
 ):
     """
     Задача для отправки email через ARQ.
+    dedup_version — версия уведомления для дедупликации (без нее — хеш письма, см. notification_version).
     """
     log.info(f"Sending email to {recipient_email} with subject '{subject}' using template '{template_name}'")
 
@@ -28,12 +45,118 @@ async def send_email_task(
         await _send_status_update(ctx, appointment_id, "email", "failed")
         return
 
+    # Повторный job (ретрай ARQ или ручной requeue) не должен отправить письмо второй раз
+    version = notification_version(dedup_version, {"subject": subject, "data": data})
+    dedup_key = build_dedup_key(appointment_id, "email", template_name, version)
+    if not await claim_notification(ctx, dedup_key):
+        log.info(f"Email '{template_name}' for appointment {appointment_id} already sent or in progress. Skipping.")
+        return
+
+    sent = False
     try:
         await notification_service.send_notification(
             email=recipient_email, subject=subject, template_name=template_name, data=data
         )
         log.success(f"Email sent successfully to {recipient_email}")
+        await mark_notification_sent(ctx, dedup_key)
+        sent = True
         await _send_status_update(ctx, appointment_id, "email", "success")
+    except Retry:
+        # Лимит провайдера исчерпан: ARQ повторит задачу позже
+        raise
     except Exception as e:
         log.error(f"Failed to send email to {recipient_email}: {e}", exc_info=True)
         await _send_status_update(ctx, appointment_id, "email", "failed")
+    finally:
+        # Блокировка снимается и при отмене job'а (таймаут ARQ, остановка воркера)
+        if not sent:
+            await release_notification(ctx, dedup_key)
+
+
+@adaptive_concurrency
+async def send_bulk_email_task(
+    ctx: dict[str, Any],
+    subject: str,
+    template_name: str,
+    data: dict[str, Any],
+    recipients: list[dict[str, Any]],
+    campaign_id: str | None = None,
+) -> None:
+    """
+    Массовая рассылка одного письма (очередь ArqQueues.BULK).
+    Шаблон рендерится один раз на пачку, персональные поля подставляются для каждого получателя.
+    С `campaign_id` повторный job не отправит письмо получателю второй раз; без него дедупликация
+    действует в пределах job'а (его ретраи после исчерпания лимита провайдера).
+    """
+    log.info(f"Sending bulk email '{template_name}' to {len(recipients)} recipients (campaign={campaign_id})")
+
+    notification_service = cast("NotificationService | None", ctx.get("notification_service"))
+    if not notification_service:
+        log.error("NotificationService not found in worker context!")
+        return
+
+    pending = []
+    dedup_keys = []
+    for recipient in recipients:
+        dedup_key = build_dedup_key(
+            campaign_id or ctx.get("job_id"), "email", f"{template_name}:{recipient.get('email')}"
+        )
+        if await claim_notification(ctx, dedup_key):
+            pending.append(recipient)
+            dedup_keys.append(dedup_key)
+
+    if not pending:
+        log.info(f"Bulk email '{template_name}' (campaign={campaign_id}) already sent. Skipping.")
+        return
+
+    results: list[bool] = []
+    try:
+        results = await notification_service.send_bulk_notification(
+            subject=subject, template_name=template_name, data=data, recipients=pending
+        )
+    finally:
+        # Получатели без результата (ошибка, отмена job'а, исчерпан лимит) освобождаются для повтора
+        statuses = results + [False] * (len(dedup_keys) - len(results))
+        for dedup_key, success in zip(dedup_keys, statuses, strict=True):
+            if success:
+                await mark_notification_sent(ctx, dedup_key)
+            else:
+                await release_notification(ctx, dedup_key)
+
+    sent = sum(results)
+    log.info(f"Bulk email '{template_name}' finished | sent={sent} failed={len(results) - sent}")
+    if sent < len(results):
+        mark_job_failed(ctx)
+
+    if len(results) < len(pending):
+        # Лимит провайдера исчерпан: остальные получатели — в ретрае job'а, отправленные пропустит дедупликация
+        raise Retry(defer=BULK_RATE_LIMIT_DEFER)
+
+
+async def enqueue_bulk_email(
+    arq_service: "ArqService",
+    subject: str,
+    template_name: str,
+    data: dict[str, Any],
+    recipients: list[dict[str, Any]],
+    campaign_id: str | None = None,
+    batch_size: int = 100,
+) -> int:
+    """
+    Постановка массовой рассылки в очередь ArqQueues.BULK пачками по `batch_size` получателей.
+    Возвращает количество поставленных job'ов.
+    """
+    enqueued = 0
+    for start in range(0, len(recipients), batch_size):
+        job = await arq_service.enqueue_job(
+            "send_bulk_email_task",
+            subject=subject,
+            template_name=template_name,
+            data=data,
+            recipients=recipients[start : start + batch_size],
+            campaign_id=campaign_id,
+            _queue_name=ArqQueues.BULK,
+        )
+        if job:
+            enqueued += 1
+    return enqueued
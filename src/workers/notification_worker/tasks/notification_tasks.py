@@ -3,6 +3,9 @@ from typing import TYPE_CHECKING, Any, cast
 from loguru import logger as log
 
 from src.shared.core.constants import RedisStreams
+from src.shared.schemas.notification import AppointmentNotificationPayload
+from src.workers.core.metrics import job_span
+from src.workers.core.tasks import schedule_stream_requeue
 
 if TYPE_CHECKING:
     from src.shared.core.manager_redis.manager import StreamManager
@@ -25,19 +28,20 @@ async def send_booking_notification_task(ctx: dict[str, Any], appointment_id: in
 
     # Fetch data from Redis
     cache_key = f"notifications:cache:{appointment_id}"
-    raw_data = await redis_service.get_value(cache_key)
+    with job_span("cache_fetch"):
+        raw_data = await redis_service.get_value(cache_key)
 
     if not raw_data:
         log.warning(f"No cache found for appointment {appointment_id}. Skipping notification.")
         return
 
     try:
-        import json
-
-        payload = json.loads(raw_data) if isinstance(raw_data, str) else raw_data
+        payload = AppointmentNotificationPayload.model_validate_json(raw_data)
 
-        event_data = payload.copy()
+        event_data = payload.to_data()
         event_data["type"] = "new_appointment"
+        # Ключ маршрутизации хранится в самом событии — повторная отправка попадет в ту же партицию
+        event_data["appointment_id"] = appointment_id
 
         stream_name = RedisStreams.BotEvents.NAME
         message_id = await stream_manager.add_event(stream_name, event_data)
@@ -67,7 +71,8 @@ async def send_contact_notification_task(ctx: dict[str, Any], request_id: int) -
 
     # Fetch data from Redis
     cache_key = f"notifications:contact_cache:{request_id}"
-    raw_data = await redis_service.get_value(cache_key)
+    with job_span("cache_fetch"):
+        raw_data = await redis_service.get_value(cache_key)
 
     if not raw_data:
         log.warning(f"No cache found for contact request {request_id}. Skipping notification.")
@@ -95,22 +100,7 @@ async def send_contact_notification_task(ctx: dict[str, Any], request_id: int) -
 async def requeue_event_task(ctx: dict[str, Any], event_data: dict[str, Any]) -> None:
     """
     Универсальная задача для возврата события в Redis Stream (Retry mechanism).
+    Использует общую политику ретраев: экспоненциальная задержка, лимит попыток, dead-letter стрим.
     """
     log.info(f"Task: requeue_event_task | type={event_data.get('type')}")
-
-    stream_manager = cast("StreamManager", ctx.get("stream_manager"))
-    if not stream_manager:
-        log.error("StreamManager not found in context.")
-        return
-
-    try:
-        stream_name = RedisStreams.BotEvents.NAME
-        # Увеличиваем счетчик попыток
-        retries = int(event_data.get("_retries", 0)) + 1
-        event_data["_retries"] = str(retries)
-
-        message_id = await stream_manager.add_event(stream_name, event_data)
-        log.info(f"Event requeued to '{stream_name}' | retry={retries} | msg_id={message_id}")
-
-    except Exception as e:
-        log.error(f"Failed to requeue event: {e}")
+    await schedule_stream_requeue(ctx, RedisStreams.BotEvents.NAME, event_data)
@@ -1,16 +1,30 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from src.workers.core.metrics import traced_job
 from src.workers.core.tasks import CORE_FUNCTIONS
 
-from .email_tasks import send_email_task
-from .notification_tasks import send_booking_notification_task, send_contact_notification_task
+from .email_tasks import send_bulk_email_task, send_email_task
+from .notification_tasks import (
+    requeue_event_task,
+    send_booking_notification_task,
+    send_contact_notification_task,
+)
 from .twilio_tasks import send_appointment_notification, send_twilio_task
 
 # Здесь агрегируются задачи для воркера уведомлений
 # Мы объединяем специфичные задачи воркера с базовыми задачами из core (ретраи и т.д.)
 
-FUNCTIONS = [
+TASKS: list[Callable[..., Awaitable[Any]]] = [
     send_booking_notification_task,
     send_contact_notification_task,
     send_email_task,
+    send_bulk_email_task,
     send_appointment_notification,
     send_twilio_task,
-] + CORE_FUNCTIONS
+    requeue_event_task,
+    *CORE_FUNCTIONS,
+]
+
+# Все задачи оборачиваются в traced_job: ArqService передает trace_id в kwargs зарегистрированных задач
+FUNCTIONS = [traced_job(func) for func in TASKS]
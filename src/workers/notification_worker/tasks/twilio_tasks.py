@@ -1,11 +1,24 @@
-import json
-from datetime import datetime
 from typing import TYPE_CHECKING, Any, cast
 
 from loguru import logger as log
+from pydantic import ValidationError
 
+from src.shared.core.constants import NotificationChannels
+from src.shared.schemas.notification import AppointmentNotificationPayload
 from src.shared.utils.text import transliterate
-
+from src.workers.core.concurrency import adaptive_concurrency, provider_call
+from src.workers.core.metrics import job_span
+from src.workers.notification_worker.services.appointment_context import AppointmentContext
+
+from .utils import (
+    build_dedup_key,
+    claim_notification,
+    get_appointment_debounce_key,
+    is_latest_version,
+    mark_notification_sent,
+    notification_version,
+    release_notification,
+)
 from .utils import send_status_update as _send_status_update
 
 if TYPE_CHECKING:
@@ -16,6 +29,7 @@ if TYPE_CHECKING:
     from src.workers.notification_worker.services.notification_service import NotificationService
 
 
+@adaptive_concurrency
 async def send_twilio_task(
     ctx: dict[str, Any],
     phone_number: str,
@@ -23,10 +37,13 @@ async def send_twilio_task(
     appointment_id: int | None = None,
     media_url: str | None = None,
     variables: dict[str, str] | None = None,
+    template_name: str | None = None,
+    dedup_version: str | None = None,
 ) -> None:
     """
     Задача для отправки сообщения через Twilio.
     Логика: WhatsApp Template (без медиа) -> WhatsApp Free (с медиа) -> SMS.
+    dedup_version — версия уведомления для дедупликации (без нее — хеш сообщения, см. notification_version).
     """
     twilio_service = cast("TwilioService | None", ctx.get("twilio_service"))
     settings = cast("WorkerSettings | None", ctx.get("settings"))
@@ -36,34 +53,102 @@ async def send_twilio_task(
         await _send_status_update(ctx, appointment_id, "twilio", "failed")
         return
 
+    # Повторный job не должен отправить сообщение второй раз (каждое сообщение Twilio платное)
+    version = notification_version(dedup_version, {"message": message, "variables": variables})
+    dedup_key = build_dedup_key(appointment_id, "twilio", template_name, version)
+    if not await claim_notification(ctx, dedup_key):
+        log.info(f"Twilio message for appointment {appointment_id} already sent or in progress. Skipping.")
+        return
+
+    sent = False
+    try:
+        sent = await _deliver_twilio_message(twilio_service, settings, phone_number, message, media_url, variables)
+        if sent:
+            await mark_notification_sent(ctx, dedup_key)
+    finally:
+        # Блокировка снимается и при отмене job'а (таймаут ARQ, остановка воркера)
+        if not sent:
+            await release_notification(ctx, dedup_key)
+
+    await _send_status_update(ctx, appointment_id, "twilio", "success" if sent else "failed")
+
+
+async def _deliver_twilio_message(
+    twilio_service: "TwilioService",
+    settings: "WorkerSettings | None",
+    phone_number: str,
+    message: str,
+    media_url: str | None,
+    variables: dict[str, str] | None,
+) -> bool:
+    """Отправка по цепочке каналов WhatsApp Template -> WhatsApp -> SMS. True — сообщение доставлено."""
     # 1. Попытка отправить WhatsApp Template
-    if variables and settings and settings.TWILIO_WHATSAPP_TEMPLATE_SID:
-        log.info(f"Attempting WhatsApp Template {settings.TWILIO_WHATSAPP_TEMPLATE_SID} to {phone_number}")
-        wa_success = twilio_service.send_whatsapp_template(
-            to_number=phone_number, content_sid=settings.TWILIO_WHATSAPP_TEMPLATE_SID, variables=variables
-        )
-        if wa_success:
-            log.info("WhatsApp Template sent successfully.")
-            await _send_status_update(ctx, appointment_id, "twilio", "success")
-            return
+    template_sid = settings.TWILIO_WHATSAPP_TEMPLATE_SID if settings else None
+    if variables and template_sid:
+        if await twilio_service.is_channel_available(NotificationChannels.WHATSAPP_TEMPLATE):
+            log.info(f"Attempting WhatsApp Template {template_sid} to {phone_number}")
+            await twilio_service.acquire_send_slot()
+            with job_span("send"), provider_call():
+                wa_success = twilio_service.send_whatsapp_template(
+                    to_number=phone_number, content_sid=template_sid, variables=variables
+                )
+            await twilio_service.record_channel_result(NotificationChannels.WHATSAPP_TEMPLATE, wa_success)
+            if wa_success:
+                log.info("WhatsApp Template sent successfully.")
+                return True
+        else:
+            log.warning("WhatsApp Template circuit is open. Skipping channel.")
 
     # 2. Попытка отправить обычный WhatsApp
-    log.info(f"Attempting Free-form WhatsApp to {phone_number}")
-    wa_success = twilio_service.send_whatsapp(phone_number, message, media_url=media_url)
-    if wa_success:
-        log.info("Free-form WhatsApp sent successfully.")
-        await _send_status_update(ctx, appointment_id, "twilio", "success")
-        return
+    if await twilio_service.is_channel_available(NotificationChannels.WHATSAPP):
+        log.info(f"Attempting Free-form WhatsApp to {phone_number}")
+        await twilio_service.acquire_send_slot()
+        with job_span("send"), provider_call():
+            wa_success = twilio_service.send_whatsapp(phone_number, message, media_url=media_url)
+        await twilio_service.record_channel_result(NotificationChannels.WHATSAPP, wa_success)
+        if wa_success:
+            log.info("Free-form WhatsApp sent successfully.")
+            return True
+        log.warning("WhatsApp failed. Falling back to SMS.")
+    else:
+        log.warning("WhatsApp circuit is open. Falling back to SMS.")
 
     # 3. Фолбек на SMS
-    log.warning("WhatsApp failed. Falling back to SMS.")
-    sms_success = twilio_service.send_sms(phone_number, message)
+    if not await twilio_service.is_channel_available(NotificationChannels.SMS):
+        log.warning("SMS circuit is open.")
+        log.error("Fallback SMS also failed.")
+        return False
+
+    await twilio_service.acquire_send_slot()
+    with job_span("send"), provider_call():
+        sms_success = twilio_service.send_sms(phone_number, message)
+    await twilio_service.record_channel_result(NotificationChannels.SMS, sms_success)
     if sms_success:
         log.info("Fallback SMS sent successfully.")
-        await _send_status_update(ctx, appointment_id, "twilio", "success")
     else:
         log.error("Fallback SMS also failed.")
-        await _send_status_update(ctx, appointment_id, "twilio", "failed")
+    return bool(sms_success)
+
+
+async def enqueue_appointment_notification(
+    arq_service: "ArqService",
+    appointment_id: int,
+    status: str,
+    reason_text: str | None = None,
+    debounce_seconds: float = 0,
+) -> Any | None:
+    """
+    Постановка send_appointment_notification с debounce по записи.
+    `debounce_seconds` обычно берется из WorkerSettings.notification_debounce_seconds.
+    """
+    return await arq_service.enqueue_debounced(
+        "send_appointment_notification",
+        get_appointment_debounce_key(appointment_id),
+        debounce_seconds,
+        appointment_id=appointment_id,
+        status=status,
+        reason_text=reason_text,
+    )
 
 
 async def send_appointment_notification(
@@ -71,22 +156,32 @@ async def send_appointment_notification(
     appointment_id: int,
     status: str,
     reason_text: str | None = None,
+    debounce_token: str | None = None,
 ) -> None:
-    """Автономный диспетчер уведомлений."""
+    """
+    Автономный диспетчер уведомлений.
+    При постановке через ArqService.enqueue_debounced доставляется только последняя версия
+    статуса записи в пределах окна — устаревшие job'ы пропускаются.
+    """
     redis_service = cast("RedisService | None", ctx.get("redis_service"))
     if not redis_service:
         return
 
+    if not await is_latest_version(ctx, get_appointment_debounce_key(appointment_id), debounce_token):
+        log.info(f"Notification for appointment {appointment_id} superseded by a newer status. Skipping.")
+        return
+
     cache_key = f"notifications:cache:{appointment_id}"
-    raw_data = await redis_service.get_value(cache_key)
+    with job_span("cache_fetch"):
+        raw_data = await redis_service.get_value(cache_key)
 
     if not raw_data:
         log.warning(f"No data in Redis for appointment {appointment_id}. Skipping.")
         return
 
     try:
-        appointment_data = json.loads(raw_data) if isinstance(raw_data, str) else raw_data
-    except Exception as e:
+        payload = AppointmentNotificationPayload.model_validate_json(raw_data)
+    except ValidationError as e:
         log.error(f"Failed to parse JSON from Redis for {appointment_id}: {e}")
         return
 
@@ -99,9 +194,18 @@ async def send_appointment_notification(
     if not arq_service or not notification_service:
         return
 
+    # Версия уведомления: каждая смена статуса (новый debounce-токен) отправляется заново,
+    # повтор этого job'а ставит задачи с той же версией — дедупликация их пропустит
+    dedup_version = debounce_token or ctx.get("job_id")
+
+    # Дата записи разбирается один раз и передается в задачи отправки готовой
+    appointment_data = payload.to_data()
+    appointment = AppointmentContext.parse(payload.datetime, payload.duration_minutes)
+    appointment_data[AppointmentContext.DATA_KEY] = appointment.to_dict()
+
     # Email...
-    email = appointment_data.get("client_email")
-    if email and email.lower() != "не указан":
+    email = payload.email
+    if email:
         subject = (
             f"Appointment Confirmation - {site_name}"
             if status == "confirmed"
@@ -113,29 +217,22 @@ async def send_appointment_notification(
             subject=subject,
             template_name="confirmation.html" if status == "confirmed" else "cancellation.html",
             data={**appointment_data, "site_name": site_name},
+            dedup_version=dedup_version,
         )
 
     # Twilio (WhatsApp/SMS)...
-    phone = appointment_data.get("client_phone")
+    phone = payload.client_phone
     if status == "confirmed" and phone:
-        dt_str = str(appointment_data.get("datetime", ""))
-        try:
-            dt_obj = datetime.strptime(dt_str, "%d.%m.%Y %H:%M")
-            date = dt_obj.strftime("%d.%m.%Y")
-            time = dt_obj.strftime("%H:%M")
-        except (ValueError, TypeError):
-            parts = dt_str.split(" ")
-            date = parts[0] if len(parts) > 0 else dt_str
-            time = parts[1] if len(parts) > 1 else ""
+        date, time = appointment.split_date_time()
 
         template_vars = {
-            "1": transliterate(appointment_data.get("first_name", "Guest")),
+            "1": transliterate(payload.first_name),
             "2": date,
             "3": time,
             "4": str(appointment_id),
         }
 
-        sms_text = notification_service.get_sms_text(appointment_data)
+        sms_text = notification_service.get_sms_text(appointment_data, appointment)
         logo_url = notification_service.get_absolute_logo_url()
 
         await arq_service.enqueue_job(
@@ -145,4 +242,6 @@ async def send_appointment_notification(
             appointment_id=appointment_id,
             variables=template_vars,
             media_url=logo_url,
+            template_name="confirmation",
+            dedup_version=dedup_version,
         )
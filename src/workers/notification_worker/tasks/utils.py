@@ -1,9 +1,17 @@
+import hashlib
+import json
 from typing import TYPE_CHECKING, Any, cast
 
 from loguru import logger as log
 
+from src.shared.core.constants import RedisStreams
+from src.workers.core.base import get_debounce_marker_key
+from src.workers.core.concurrency import mark_job_failed
+
 if TYPE_CHECKING:
     from src.shared.core.manager_redis.manager import StreamManager
+    from src.shared.core.redis_service import RedisService
+    from src.workers.core.config import WorkerSettings
 
 
 async def send_status_update(ctx: dict[str, Any], appointment_id: int | None, channel: str, status: str) -> None:
@@ -11,6 +19,10 @@ async def send_status_update(ctx: dict[str, Any], appointment_id: int | None, ch
     Отправка статуса отправки уведомления обратно в Redis Stream.
     Используется задачами Twilio и Email для обновления UI в боте.
     """
+    # Неудачная отправка — сигнал адаптивному лимиту параллельности
+    if status == "failed":
+        mark_job_failed(ctx)
+
     if not appointment_id:
         return
 
@@ -26,7 +38,114 @@ async def send_status_update(ctx: dict[str, Any], appointment_id: int | None, ch
         "status": status,
     }
     try:
-        await stream_manager.add_event("bot_events", payload)
+        await stream_manager.add_event(RedisStreams.BotEvents.NAME, payload)
         log.info(f"Status update sent: {payload}")
     except Exception as e:
         log.error(f"Failed to send status update: {e}")
+
+
+# --- Idempotency ---
+
+DEDUP_KEY_PREFIX = "notifications:sent"
+DEDUP_STATUS_PENDING = "pending"
+DEDUP_STATUS_SENT = "sent"
+
+
+def build_dedup_key(
+    appointment_id: int | str | None, channel: str, template: str | None, version: str | None = None
+) -> str | None:
+    """
+    Детерминированный ключ уведомления: запись + канал + шаблон + версия уведомления.
+    Версия отличает законные повторные отправки (подтверждение -> отмена -> подтверждение, перенос записи)
+    от повторов того же job'а: см. notification_version.
+    Без id записи дедупликация невозможна — возвращает None.
+    """
+    if not appointment_id:
+        return None
+    key = f"{DEDUP_KEY_PREFIX}:{appointment_id}:{channel}:{template or 'default'}"
+    return f"{key}:{version}" if version else key
+
+
+def notification_version(dedup_version: str | None, content: Any) -> str:
+    """
+    Версия уведомления для ключа дедупликации: переданная диспетчером (токен события смены статуса)
+    или хеш содержимого — новая дата или статус дают новую версию, повтор того же job'а — ту же.
+    """
+    if dedup_version:
+        return dedup_version
+    serialized = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(serialized.encode(), usedforsecurity=False).hexdigest()[:16]
+
+
+def _pending_value(ctx: dict[str, Any]) -> str:
+    """Значение блокировки: статус + id job'а, чтобы ретрай того же job'а мог забрать свою блокировку."""
+    job_id = ctx.get("job_id")
+    return f"{DEDUP_STATUS_PENDING}:{job_id}" if job_id else DEDUP_STATUS_PENDING
+
+
+async def claim_notification(ctx: dict[str, Any], dedup_key: str | None) -> bool:
+    """
+    Захватывает право на отправку уведомления (SET NX с TTL).
+    False — уведомление уже отправлено или отправляется другим job'ом.
+
+    Блокировка, оставшаяся от этого же job'а (таймаут или падение воркера до release), не мешает ретраю.
+    При ошибке Redis отправка разрешается: лучше возможный дубль, чем потерянное уведомление.
+    """
+    redis_service = cast("RedisService | None", ctx.get("redis_service"))
+    if not dedup_key or not redis_service:
+        return True
+
+    settings = cast("WorkerSettings | None", ctx.get("settings"))
+    lock_ttl = settings.notification_send_lock_ttl if settings else 120
+    pending_value = _pending_value(ctx)
+    claimed = await redis_service.set_value_if_not_exists(dedup_key, pending_value, ttl=lock_ttl)
+    if claimed is None:
+        log.warning(f"Dedup lock unavailable for {dedup_key}. Sending without deduplication.")
+        return True
+    if claimed:
+        return True
+    return bool(ctx.get("job_id")) and await redis_service.get_value(dedup_key) == pending_value
+
+
+async def mark_notification_sent(ctx: dict[str, Any], dedup_key: str | None) -> None:
+    """Фиксирует успешную отправку: повторные job'ы в течение TTL будут пропущены."""
+    redis_service = cast("RedisService | None", ctx.get("redis_service"))
+    if not dedup_key or not redis_service:
+        return
+
+    settings = cast("WorkerSettings | None", ctx.get("settings"))
+    dedup_ttl = settings.notification_dedup_ttl if settings else 86400
+    await redis_service.set_value(dedup_key, DEDUP_STATUS_SENT, ttl=dedup_ttl)
+
+
+async def release_notification(ctx: dict[str, Any], dedup_key: str | None) -> None:
+    """Снимает блокировку после неудачной отправки, чтобы ретрай мог отправить уведомление."""
+    redis_service = cast("RedisService | None", ctx.get("redis_service"))
+    if not dedup_key or not redis_service:
+        return
+    await redis_service.delete_key(dedup_key)
+
+
+# --- Debounce ---
+
+
+def get_appointment_debounce_key(appointment_id: int | str) -> str:
+    """Ключ debounce для уведомлений по записи (используется в ArqService.enqueue_debounced)."""
+    return f"appointment_notification:{appointment_id}"
+
+
+async def is_latest_version(ctx: dict[str, Any], debounce_key: str, debounce_token: str | None) -> bool:
+    """
+    Проверяет, что job несет токен последней поставленной версии.
+    Job без токена (поставлен без debounce) всегда актуален.
+    """
+    if not debounce_token:
+        return True
+
+    redis_service = cast("RedisService | None", ctx.get("redis_service"))
+    if not redis_service:
+        return True
+
+    latest_token = await redis_service.get_value(get_debounce_marker_key(debounce_key))
+    # Маркер истек — более новой версии точно нет
+    return latest_token is None or latest_token == debounce_token
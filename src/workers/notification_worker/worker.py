@@ -1,9 +1,12 @@
 from arq.connections import RedisSettings
 from loguru import logger as log
 
-from src.shared.core.logger import setup_logging
+from src.shared.core.constants import ArqQueues
+from src.shared.core.logger import flush_suppressed_errors, setup_logging
 from src.workers.core.base import BaseArqSettings, base_shutdown, base_startup
+from src.workers.core.base_module.dependencies import run_dependencies
 from src.workers.core.config import WorkerSettings as CoreWorkerSettings
+from src.workers.core.metrics import start_metrics_server
 
 from .dependencies import SHUTDOWN_DEPENDENCIES, STARTUP_DEPENDENCIES
 from .tasks.task_aggregator import FUNCTIONS
@@ -16,16 +19,24 @@ async def worker_startup(ctx: dict) -> None:
     """
     Инициализация воркера уведомлений.
     """
-    # Инициализируем логирование для этого воркера
-    setup_logging(settings, "notification_worker")
+    # Инициализируем логирование для этого воркера (процессы супервизора пишут в свои файлы)
+    setup_logging(settings, "notification_worker", process_index=settings.worker_process_index)
 
     await base_startup(ctx)
 
+    if settings.worker_metrics_enabled:
+        start_metrics_server(settings.worker_metrics_port)
+
     log.info("NotificationWorkerStartup | Initializing dependencies.")
-    for dependency_func in STARTUP_DEPENDENCIES:
-        await dependency_func(ctx, settings)
+    # Независимые зависимости инициализируются параллельно (граф задается через @requires)
+    await run_dependencies(ctx, settings, STARTUP_DEPENDENCIES, "NotificationWorkerStartup")
     log.info("NotificationWorkerStartup | All dependencies initialized.")
 
+    arq_service = ctx.get("arq_service")
+    if arq_service:
+        queue_depths = await arq_service.get_queue_depths(ArqQueues.ALL)
+        log.info(f"NotificationWorkerStartup | queue_depths={queue_depths}")
+
 
 async def worker_shutdown(ctx: dict) -> None:
     """
@@ -38,12 +49,20 @@ async def worker_shutdown(ctx: dict) -> None:
 
     await base_shutdown(ctx)
 
+    # Счетчики подавленных повторов ошибок и очередь записи логов — до выхода процесса
+    # (процессы супервизора завершаются без atexit)
+    flush_suppressed_errors()
+    await log.complete()
+
 
 class WorkerSettings(BaseArqSettings):
     """
     Настройки ARQ воркера для уведомлений.
+    Обрабатывает транзакционную очередь (подтверждения, отмены, статусы).
     """
 
+    queue_name = ArqQueues.TRANSACTIONAL
+
     # Используем умное определение хоста Redis
     redis_settings = RedisSettings(
         host=settings.effective_redis_host,
@@ -54,11 +73,39 @@ class WorkerSettings(BaseArqSettings):
 
     # Используем настройки из WorkerSettings для конфигурации ARQ
     max_jobs = settings.arq_max_jobs
-    job_timeout = settings.arq_job_timeout
+    job_timeout = settings.effective_job_timeout
     keep_result = settings.arq_keep_result
+    # После SIGTERM новые задачи не берутся, выполняемые дозавершаются (без ожидания ARQ отменяет их сразу —
+    # задача повторяется и уведомление уходит дважды)
+    job_completion_wait = int(settings.worker_drain_timeout)
+    max_tries = settings.arq_max_tries
 
     on_startup = worker_startup
     on_shutdown = worker_shutdown
 
     # Регистрация задач
     functions = FUNCTIONS
+
+
+class BulkWorkerSettings(WorkerSettings):
+    """
+    Настройки ARQ воркера для массовых рассылок.
+    Запуск: arq src.workers.notification_worker.worker.BulkWorkerSettings
+
+    ARQ читает только атрибуты самого класса (settings_cls.__dict__), унаследованные настройки он не видит,
+    поэтому общие настройки повторяются явно.
+    """
+
+    queue_name = ArqQueues.BULK
+    redis_settings = WorkerSettings.redis_settings
+
+    max_jobs = settings.arq_bulk_max_jobs
+    job_timeout = WorkerSettings.job_timeout
+    keep_result = WorkerSettings.keep_result
+    job_completion_wait = WorkerSettings.job_completion_wait
+    max_tries = WorkerSettings.max_tries
+
+    on_startup = worker_startup
+    on_shutdown = worker_shutdown
+
+    functions = FUNCTIONS
@@ -0,0 +1,80 @@
+"""
+Дата записи разбирается один раз (AppointmentContext) вместо strptime в каждом потребителе:
+обогащение контекста письма, текст SMS, ссылка Google Calendar и переменные шаблона WhatsApp.
+"""
+
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+
+from src.workers.notification_worker.services.appointment_context import AppointmentContext
+
+APPOINTMENT_DATA: dict[str, Any] = {
+    "id": 42,
+    "first_name": "Anna",
+    "datetime": "01.02.2026 10:00",
+    "duration_minutes": 60,
+    "service_name": "Maniküre",
+}
+
+# Контекст передается в задачи готовым (data[DATA_KEY]) и должен стоить заметно меньше четырех strptime
+# (локально около 0.05 от прежнего пути)
+CONTEXT_COST_RATIO_BUDGET = 0.6
+ROUNDS = 5
+MESSAGES_PER_ROUND = 2000
+
+
+def _legacy_dict_path(data: dict[str, Any]) -> tuple[str, str, str]:
+    """Прежний путь: каждый потребитель разбирал строку даты сам."""
+    dt_str = data["datetime"]
+    # enrich_email_context
+    dt_obj = datetime.strptime(dt_str, "%d.%m.%Y %H:%M")
+    date, time_ = dt_obj.strftime("%d.%m.%Y"), dt_obj.strftime("%H:%M")
+    # get_sms_text
+    dt_obj = datetime.strptime(dt_str, "%d.%m.%Y %H:%M")
+    date, time_ = dt_obj.strftime("%d.%m.%Y"), dt_obj.strftime("%H:%M")
+    # _generate_google_calendar_url
+    start = datetime.strptime(dt_str, "%d.%m.%Y %H:%M")
+    end = start + timedelta(minutes=int(data.get("duration_minutes", 30)))
+    calendar_dates = f"{start.strftime('%Y%m%dT%H%M%S')}/{end.strftime('%Y%m%dT%H%M%S')}"
+    # send_appointment_notification (переменные WhatsApp)
+    dt_obj = datetime.strptime(dt_str, "%d.%m.%Y %H:%M")
+    date, time_ = dt_obj.strftime("%d.%m.%Y"), dt_obj.strftime("%H:%M")
+    return date, time_, calendar_dates
+
+
+def _context_path(data: dict[str, Any]) -> tuple[str, str, str]:
+    """Текущий путь задачи отправки: контекст из data, построенный диспетчером."""
+    appointment = AppointmentContext.from_data(data)
+    date, time_ = appointment.split_date_time()
+    return date, time_, appointment.calendar_dates
+
+
+def _best_time(build: Callable[[dict[str, Any]], tuple[str, str, str]], data: dict[str, Any]) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for _ in range(MESSAGES_PER_ROUND):
+            build(data)
+        best = min(best, (time.perf_counter() - started) / MESSAGES_PER_ROUND)
+    return best
+
+
+@pytest.mark.unit
+def test_context_matches_legacy_dict_path():
+    data = {**APPOINTMENT_DATA, AppointmentContext.DATA_KEY: AppointmentContext.from_data(APPOINTMENT_DATA).to_dict()}
+    assert _context_path(data) == _legacy_dict_path(APPOINTMENT_DATA)
+
+
+@pytest.mark.unit
+def test_context_cost_per_message():
+    # Диспетчер строит контекст один раз на запись, задачи отправки получают его готовым
+    data = {**APPOINTMENT_DATA, AppointmentContext.DATA_KEY: AppointmentContext.from_data(APPOINTMENT_DATA).to_dict()}
+    legacy = _best_time(_legacy_dict_path, APPOINTMENT_DATA)
+    context = _best_time(_context_path, data)
+    assert context < legacy * CONTEXT_COST_RATIO_BUDGET, (
+        f"context {context * 1e6:.1f}us vs legacy dict path {legacy * 1e6:.1f}us per message"
+    )
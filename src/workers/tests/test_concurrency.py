@@ -0,0 +1,44 @@
+"""
+Отложенный запуск задачи (arq.Retry) не расходует попытки ARQ (max_tries).
+"""
+
+from typing import Any
+
+import pytest
+from arq import Retry
+
+from src.workers.core.concurrency import AdaptiveConcurrencyLimiter, adaptive_concurrency
+
+
+class RetryCounter:
+    """Счетчик попыток ARQ (arq:retry:<job_id>): ARQ увеличивает его при каждом запуске задачи."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, int] = {}
+
+    def start(self, job_id: str) -> int:
+        self.values[f"arq:retry:{job_id}"] = self.values.get(f"arq:retry:{job_id}", 0) + 1
+        return self.values[f"arq:retry:{job_id}"]
+
+    async def decr(self, key: str) -> int:
+        self.values[key] -= 1
+        return self.values[key]
+
+
+@adaptive_concurrency
+async def rate_limited_task(ctx: dict[str, Any]) -> None:
+    raise Retry(defer=1)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("limiter", [None, AdaptiveConcurrencyLimiter(min_limit=1, max_limit=2, latency_target=1.0)])
+async def test_deferred_job_keeps_its_try(limiter: AdaptiveConcurrencyLimiter | None):
+    redis = RetryCounter()
+    for _ in range(10):
+        ctx = {"redis": redis, "job_id": "job-1", "job_try": redis.start("job-1"), "concurrency_limiter": limiter}
+        with pytest.raises(Retry):
+            await rate_limited_task(ctx)
+
+    # Десять отложенных запусков — по-прежнему первая попытка (max_tries по умолчанию 5)
+    assert ctx["job_try"] == 1
+    assert redis.values == {"arq:retry:job-1": 0}
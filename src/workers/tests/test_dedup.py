@@ -0,0 +1,38 @@
+"""
+Ключ дедупликации уведомлений: повтор того же job'а пропускается, законная повторная отправка — нет.
+"""
+
+import pytest
+
+from src.workers.notification_worker.tasks.utils import build_dedup_key, notification_version
+
+CONFIRMED = {"id": 42, "datetime": "01.02.2026 10:00", "service_name": "Maniküre"}
+
+
+@pytest.mark.unit
+def test_retry_of_same_notification_has_same_key():
+    first = build_dedup_key(42, "email", "confirmation.html", notification_version("token-1", CONFIRMED))
+    retry = build_dedup_key(42, "email", "confirmation.html", notification_version("token-1", CONFIRMED))
+    assert first == retry
+
+
+@pytest.mark.unit
+def test_new_status_change_is_sent_again():
+    # Подтверждение -> отмена -> подтверждение: каждая смена статуса — новый токен события
+    first = build_dedup_key(42, "email", "confirmation.html", notification_version("token-1", CONFIRMED))
+    again = build_dedup_key(42, "email", "confirmation.html", notification_version("token-3", CONFIRMED))
+    assert first != again
+
+
+@pytest.mark.unit
+def test_content_version_without_dispatcher_token():
+    rescheduled = {**CONFIRMED, "datetime": "02.02.2026 12:00"}
+    reordered = dict(reversed(CONFIRMED.items()))
+
+    assert notification_version(None, CONFIRMED) == notification_version(None, reordered)
+    assert notification_version(None, CONFIRMED) != notification_version(None, rescheduled)
+
+
+@pytest.mark.unit
+def test_dedup_key_requires_appointment():
+    assert build_dedup_key(None, "email", "confirmation.html", "token-1") is None
@@ -0,0 +1,87 @@
+"""
+DelayQueuePoller: остановка посреди пачки не теряет забранные элементы.
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, cast
+
+import pytest
+
+from src.shared.core.manager_redis.delay_queue_manager import DelayQueueManager
+from src.workers.core.delay_queue_poller import DelayQueuePoller
+
+if TYPE_CHECKING:
+    from src.workers.core.base import ArqService
+
+
+class InMemoryDelayQueue:
+    """Очередь с семантикой DelayQueueManager (claim -> processing -> ack/release) без Redis."""
+
+    KIND_JOB = DelayQueueManager.KIND_JOB
+    KIND_EVENT = DelayQueueManager.KIND_EVENT
+    queue_key = "delay_queue:test"
+
+    def __init__(self, item_ids: list[str]) -> None:
+        self.queue = dict.fromkeys(item_ids, 0.0)
+        self.payloads = {
+            item_id: {"kind": self.KIND_JOB, "function": "send_email_task", "kwargs": {"_job_id": item_id}}
+            for item_id in item_ids
+        }
+        self.processing: set[str] = set()
+
+    async def claim_due(self, batch_size: int = 100) -> list[tuple[str, dict[str, Any]]]:
+        claimed = list(self.queue)[:batch_size]
+        for item_id in claimed:
+            del self.queue[item_id]
+            self.processing.add(item_id)
+        return [(item_id, self.payloads[item_id]) for item_id in claimed]
+
+    async def ack(self, item_id: str) -> bool:
+        self.processing.discard(item_id)
+        self.payloads.pop(item_id, None)
+        return True
+
+    async def release(self, item_ids: list[str]) -> int:
+        for item_id in item_ids:
+            self.processing.discard(item_id)
+            self.queue[item_id] = 0.0
+        return len(item_ids)
+
+
+class BlockingArq:
+    """ArqService, который зависает на постановке `block_on` (воркер останавливается в этот момент)."""
+
+    def __init__(self, block_on: str) -> None:
+        self.block_on = block_on
+        self.blocked = asyncio.Event()
+        self.enqueued: list[str] = []
+
+    async def enqueue_job(self, function: str, **kwargs: Any) -> str:
+        if kwargs["_job_id"] == self.block_on:
+            self.blocked.set()
+            await asyncio.Event().wait()
+        self.enqueued.append(kwargs["_job_id"])
+        return kwargs["_job_id"]
+
+
+@pytest.mark.unit
+async def test_cancel_mid_batch_keeps_unprocessed_items():
+    items = [f"reminder:{index}" for index in range(5)]
+    delay_queue = InMemoryDelayQueue(items)
+    arq = BlockingArq(block_on="reminder:2")
+    poller = DelayQueuePoller(
+        cast("DelayQueueManager", delay_queue), arq_service=cast("ArqService", arq), stream_manager=None
+    )
+
+    poll = asyncio.create_task(poller.poll_once())
+    await arq.blocked.wait()
+    poll.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await poll
+
+    # Доставленные подтверждены, не начатые сразу вернулись в очередь,
+    # прерванный остается в processing до visibility timeout
+    assert arq.enqueued == ["reminder:0", "reminder:1"]
+    assert list(delay_queue.queue) == ["reminder:3", "reminder:4"]
+    assert delay_queue.processing == {"reminder:2"}
+    assert set(delay_queue.payloads) == {"reminder:2", "reminder:3", "reminder:4"}
@@ -0,0 +1,66 @@
+"""
+Бюджет холодного импорта модуля воркера (`python -X importtime`).
+
+Импорт воркера выполняется при каждом запуске процесса (и в супервизоре до fork), поэтому
+SDK провайдеров загружаются лениво — только при инициализации канала. На пути импорта
+остаются arq, pydantic (настройки) и prometheus_client (метрики): вместе около 0.3 сек.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+WORKER_MODULE = "src.workers.notification_worker.worker"
+
+# Общий бюджет с запасом для медленных CI-машин (локально импорт занимает около 0.3 сек)
+IMPORT_TIME_BUDGET_SECONDS = 1.0
+
+# Импортируются лениво в dependencies.py / email_client.py и не должны попадать в импорт воркера
+LAZY_MODULES = ("twilio", "jinja2", "aiosmtplib", "httpx")
+
+# Ожидаемые тяжелые зависимости: их появление или исчезновение — повод пересмотреть бюджет
+EXPECTED_MODULES = ("arq", "pydantic", "prometheus_client")
+
+
+def _import_times(module: str) -> dict[str, int]:
+    """Кумулятивное время импорта (мкс) по модулям верхнего уровня из вывода `-X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.fixture(scope="module")
+def worker_import_times() -> dict[str, int]:
+    return _import_times(WORKER_MODULE)
+
+
+@pytest.mark.unit
+def test_worker_import_within_budget(worker_import_times: dict[str, int]):
+    total = worker_import_times[WORKER_MODULE] / 1_000_000
+    assert total < IMPORT_TIME_BUDGET_SECONDS, f"worker import took {total:.3f}s"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_provider_sdk_not_imported(worker_import_times: dict[str, int], module: str):
+    assert module not in worker_import_times
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("module", EXPECTED_MODULES)
+def test_expected_heavy_modules_on_import_path(worker_import_times: dict[str, int], module: str):
+    assert module in worker_import_times
@@ -0,0 +1,80 @@
+"""
+Пропускная способность пакетной нормализации номеров (normalize_phones) на списке рассылки из 100k номеров.
+"""
+
+import re
+import time
+
+import pytest
+
+from src.shared.utils.phone import normalize_phone, normalize_phones
+
+# Список рассылки: номера в разных форматах, часть получателей повторяется между рассылками
+CAMPAIGN_SIZE = 100_000
+UNIQUE_RECIPIENTS = 20_000
+# Локально около 0.1s на 100k номеров
+CAMPAIGN_TIME_BUDGET_SECONDS = 1.0
+# Прежний путь: re.sub со строковым шаблоном на каждый номер без кеша.
+# Получателей больше maxsize кеша, поэтому выигрыш дает только скомпилированный шаблон (локально около 0.9);
+# запас на шум, кеш не должен делать пакетную нормализацию медленнее
+LEGACY_COST_RATIO_BUDGET = 1.3
+ROUNDS = 3
+
+_FORMATS = ("+49 151 {}", "0049 (151) {}", "0151 {}", "49151{}", "0151-{}")
+
+
+def _campaign_phones() -> list[str | None]:
+    phones: list[str | None] = []
+    for i in range(CAMPAIGN_SIZE):
+        recipient = i % UNIQUE_RECIPIENTS
+        phones.append(_FORMATS[recipient % len(_FORMATS)].format(f"{recipient:07d}"))
+    # Пустые номера у клиентов без телефона
+    phones[::1000] = [None] * len(phones[::1000])
+    return phones
+
+
+def _legacy_normalize(phone: str) -> str:
+    clean_phone = re.sub(r"[\s\-\(\)]", "", phone)
+    if clean_phone.startswith("+"):
+        return clean_phone
+    if clean_phone.startswith("00"):
+        return "+" + clean_phone[2:]
+    if clean_phone.startswith("0"):
+        return "+49" + clean_phone[1:]
+    return "+" + clean_phone
+
+
+def _legacy_normalize_phones(phones: list[str | None]) -> list[str]:
+    return [_legacy_normalize(phone) if phone else "" for phone in phones]
+
+
+def _best_time(phones: list[str | None], *, legacy: bool) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        # Кеш сбрасывается, чтобы каждый раунд начинался как первая рассылка после старта воркера
+        normalize_phone.cache_clear()
+        started = time.perf_counter()
+        if legacy:
+            _legacy_normalize_phones(phones)
+        else:
+            normalize_phones(phones)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+@pytest.mark.unit
+def test_normalize_phones_matches_legacy_path():
+    phones = _campaign_phones()
+    assert normalize_phones(phones) == _legacy_normalize_phones(phones)
+
+
+@pytest.mark.unit
+def test_normalize_phones_throughput():
+    phones = _campaign_phones()
+    elapsed = _best_time(phones, legacy=False)
+    legacy = _best_time(phones, legacy=True)
+    print(
+        f"normalize_phones: {CAMPAIGN_SIZE / elapsed:,.0f} numbers/s (legacy {CAMPAIGN_SIZE / legacy:,.0f} numbers/s)"
+    )
+    assert elapsed < CAMPAIGN_TIME_BUDGET_SECONDS
+    assert elapsed < legacy * LEGACY_COST_RATIO_BUDGET
@@ -0,0 +1,95 @@
+"""
+Circuit breaker каналов учитывает только сбои канала (сеть, таймаут, 5xx, 429),
+ошибки получателя (адрес отклонен, неверный номер) канал не размыкают.
+"""
+
+from typing import TYPE_CHECKING, Any, cast
+
+import aiosmtplib
+import httpx
+import pytest
+from twilio.base.exceptions import TwilioRestException
+
+from src.shared.core.constants import NotificationChannels
+from src.workers.core.base_module.email_client import AsyncEmailClient, is_channel_error
+from src.workers.core.base_module.twilio_service import TwilioService
+
+if TYPE_CHECKING:
+    from src.shared.core.circuit_breaker import CircuitBreaker
+
+
+class RecordedBreaker:
+    """Circuit breaker, который только запоминает результаты по каналам."""
+
+    def __init__(self) -> None:
+        self.results: list[tuple[str, bool]] = []
+
+    async def allow_request(self, channel: str) -> bool:
+        return True
+
+    async def record_result(self, channel: str, success: bool) -> None:
+        self.results.append((channel, success))
+
+
+def _http_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.sendgrid.com/v3/mail/send")
+    return httpx.HTTPStatusError("SendGrid API failed", request=request, response=httpx.Response(status_code))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("error", "channel_error"),
+    [
+        (aiosmtplib.SMTPRecipientsRefused([]), False),
+        (aiosmtplib.SMTPRecipientRefused(550, "no such user", "anna@example.com"), False),
+        (aiosmtplib.SMTPDataError(554, "message rejected"), False),
+        (aiosmtplib.SMTPResponseException(421, "service not available"), True),
+        (aiosmtplib.SMTPAuthenticationError(535, "authentication failed"), True),
+        (aiosmtplib.SMTPServerDisconnected("connection lost"), True),
+        (aiosmtplib.SMTPTimeoutError("timed out"), True),
+        (_http_error(400), False),
+        (_http_error(429), True),
+        (_http_error(503), True),
+        (httpx.ConnectTimeout("timed out"), True),
+    ],
+)
+def test_is_channel_error(error: Exception, channel_error: bool):
+    assert is_channel_error(error) is channel_error
+
+
+@pytest.mark.unit
+async def test_smtp_recipient_error_does_not_trip_breaker(monkeypatch: pytest.MonkeyPatch):
+    breaker = RecordedBreaker()
+    client = AsyncEmailClient("smtp.example.com", 587, circuit_breaker=cast("CircuitBreaker", breaker))
+
+    async def refuse_recipient(*args: Any, **kwargs: Any) -> None:
+        raise aiosmtplib.SMTPRecipientsRefused([])
+
+    monkeypatch.setattr(client, "_send_via_smtp", refuse_recipient)
+    with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+        await client.send_email("anna@example.com", "Termin", "<p>Termin</p>")
+
+    assert breaker.results == [(NotificationChannels.SMTP, True)]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("status", "recorded"),
+    [(400, True), (404, True), (429, False), (503, False)],
+)
+async def test_twilio_recipient_error_does_not_trip_breaker(
+    monkeypatch: pytest.MonkeyPatch, status: int, recorded: bool
+):
+    breaker = RecordedBreaker()
+    service = TwilioService("AC" + "0" * 32, "token", "+4915100000000", circuit_breaker=cast("CircuitBreaker", breaker))
+
+    def create(**kwargs: Any) -> None:
+        # 21211 — неверный номер получателя
+        raise TwilioRestException(status, "/Messages.json", "Invalid 'To' Phone Number", code=21211)
+
+    monkeypatch.setattr(service.client.messages, "create", create)
+    result = service.send_sms("+49 176 12345678", "Termin")
+    await service.record_channel_result(NotificationChannels.SMS, result)
+
+    assert not result
+    assert breaker.results == [(NotificationChannels.SMS, recorded)]
@@ -0,0 +1,53 @@
+"""
+Метрики ожидания токена rate limiter обновляются в момент ожидания (RedisRateLimiter.acquire).
+"""
+
+from typing import TYPE_CHECKING, Any, cast
+
+import pytest
+from arq import Retry
+from prometheus_client import REGISTRY
+
+from src.shared.core.rate_limiter import RedisRateLimiter
+from src.workers.core.metrics import observe_rate_limit_wait
+
+if TYPE_CHECKING:
+    from src.shared.core.redis_service import RedisService
+
+
+class TokenBucket:
+    """Ответы TOKEN_BUCKET_SCRIPT по очереди: миллисекунды до следующего токена (0 — токен выдан)."""
+
+    def __init__(self, waits_ms: list[int]) -> None:
+        self.waits_ms = waits_ms
+
+    async def run_script(self, script: str, keys: list[str], args: list[Any]) -> int:
+        return self.waits_ms.pop(0)
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.unit
+async def test_rate_limit_wait_metrics():
+    provider = "test_provider"
+    waits_before = _sample("worker_rate_limit_waits_total", provider=provider, outcome="acquired")
+    deferred_before = _sample("worker_rate_limit_waits_total", provider=provider, outcome="deferred")
+    observed_before = _sample("worker_rate_limit_wait_seconds_count", provider=provider)
+
+    limiter = RedisRateLimiter(
+        cast("RedisService", TokenBucket([0, 20, 0, 5000])),
+        limits={provider: (1.0, 1)},
+        max_wait=1.0,
+        on_wait=observe_rate_limit_wait,
+    )
+    # Токен сразу — не ожидание; 20 мс ожидания — ожидание; 5 секунд больше max_wait — задача отложена
+    assert await limiter.acquire(provider) < 0.01
+    assert await limiter.acquire(provider) >= 0.02
+    with pytest.raises(Retry):
+        await limiter.acquire(provider)
+
+    assert _sample("worker_rate_limit_waits_total", provider=provider, outcome="acquired") == waits_before + 1
+    assert _sample("worker_rate_limit_waits_total", provider=provider, outcome="deferred") == deferred_before + 1
+    assert _sample("worker_rate_limit_wait_seconds_count", provider=provider) == observed_before + 2
@@ -0,0 +1,115 @@
+"""
+render_batch должен давать тот же результат, что и полный рендер для каждого получателя,
+на всех шаблонах писем из src/workers/templates (HTML и текстовая версия).
+Текстовая версия письма строится из шаблона, преобразованного один раз при загрузке, и стоит не дороже HTML.
+"""
+
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from src.workers.core.base_module.template_renderer import TemplateRenderer, fields_used_plainly
+
+TEMPLATES_DIR = Path(__file__).resolve().parents[1] / "templates"
+TEMPLATES = sorted(path.name for path in TEMPLATES_DIR.glob("*.html") if path.name != "base_email.html")
+
+BASE_CONTEXT = {
+    "site_name": "Lily Beauty Salon",
+    "site_url": "https://example.com",
+    "address": "Musterstraße 1, Köln",
+    "logo_url": "https://example.com/logo.png",
+    "contact_form_url": "https://example.com/de/contacts/",
+    "calendar_url": "https://calendar.google.com/event?x=1",
+    "link_reschedule": "https://example.com/de/booking/",
+    "link_calendar": "https://example.com/de/booking/",
+    "service_name": "Maniküre",
+    "date": "01.02.2026",
+    "time": "10:00",
+    "duration_minutes": 60,
+    "price": "45 €",
+    "data": {
+        "greeting": "Hallo",
+        "client_name": "Anna",
+        "message_text": "Erste Zeile\nZweite <Zeile>",
+        "reply_text": "Antwort\nmit Umbruch",
+        "signature": "Team",
+    },
+}
+
+# Заполненные, пустые, отсутствующие поля, ссылки-заглушки и значения, требующие экранирования
+RECIPIENTS: list[dict[str, Any]] = [
+    {"email": "a@example.com", "greeting": "Liebe Anna,", "link_confirm": "https://e.com/c/1", "link_cancel": "#"},
+    {
+        "email": "b@example.com",
+        "greeting": "Hallo <Ben> & Co,",
+        "link_confirm": "#",
+        "link_cancel": "https://e.com/x/2",
+    },
+    {"email": "c@example.com", "greeting": "", "link_confirm": "#", "link_cancel": "#"},
+    {"email": "d@example.com", "link_confirm": "https://e.com/c/4", "link_cancel": "https://e.com/x/4"},
+    {"email": "e@example.com", "greeting": None, "name": "O'Brien", "link_confirm": "#", "link_cancel": "#"},
+]
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["plain", "minify"])
+def renderer(request) -> TemplateRenderer:
+    return TemplateRenderer(str(TEMPLATES_DIR), minify=request.param)
+
+
+def _personal(recipient: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in recipient.items() if key != "email"}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("template_name", TEMPLATES)
+def test_batch_html_matches_full_render(renderer: TemplateRenderer, template_name: str):
+    personal = [_personal(recipient) for recipient in RECIPIENTS]
+    expected = [renderer.render(template_name, {**BASE_CONTEXT, **context}) for context in personal]
+    assert renderer.render_batch(template_name, BASE_CONTEXT, personal) == expected
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("template_name", TEMPLATES)
+def test_batch_text_matches_full_render(renderer: TemplateRenderer, template_name: str):
+    personal = [_personal(recipient) for recipient in RECIPIENTS]
+    expected = [renderer.render_text(template_name, {**BASE_CONTEXT, **context}) for context in personal]
+    assert renderer.render_batch(template_name, BASE_CONTEXT, personal, text=True) == expected
+
+
+@pytest.mark.unit
+def test_fields_used_plainly(renderer: TemplateRenderer):
+    # {{ greeting }} — подстановка пачкой; сравнение `link_confirm != '#'` — только полный рендер
+    assert fields_used_plainly(renderer.env, "confirmation.html", frozenset({"greeting"}))
+    assert fields_used_plainly(renderer.env, "reengagement.html", frozenset({"greeting"}))
+    assert not fields_used_plainly(renderer.env, "example_notification.html", frozenset({"link_confirm"}))
+
+
+# Текстовая часть письма не должна стоить больше HTML-части (локально около 0.5-0.9 от HTML)
+TEXT_RENDER_COST_RATIO_BUDGET = 1.5
+RENDER_ROUNDS = 5
+RENDERS_PER_ROUND = 200
+
+
+def _best_time(render: Callable[[], str]) -> float:
+    """Лучшее среднее время рендера за несколько раундов (меньше влияние шума CI)."""
+    best = float("inf")
+    for _ in range(RENDER_ROUNDS):
+        started = time.perf_counter()
+        for _ in range(RENDERS_PER_ROUND):
+            render()
+        best = min(best, (time.perf_counter() - started) / RENDERS_PER_ROUND)
+    return best
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("template_name", TEMPLATES)
+def test_text_render_cost(renderer: TemplateRenderer, template_name: str):
+    renderer.preload()
+    html = _best_time(lambda: renderer.render(template_name, BASE_CONTEXT))
+    text = _best_time(lambda: renderer.render_text(template_name, BASE_CONTEXT))
+    assert text < html * TEXT_RENDER_COST_RATIO_BUDGET, (
+        f"text render {text * 1e6:.0f}us vs html {html * 1e6:.0f}us per email"
+    )
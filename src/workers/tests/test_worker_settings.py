@@ -0,0 +1,67 @@
+"""
+Настройки ARQ воркеров уведомлений: arq.worker.get_kwargs берет только атрибуты самого класса настроек.
+"""
+
+import asyncio
+import os
+import signal
+from typing import Any
+
+import pytest
+from arq.worker import Worker, get_kwargs
+
+from src.shared.core.constants import ArqQueues
+from src.workers.notification_worker.worker import BulkWorkerSettings, WorkerSettings, settings
+
+
+def _worker_kwargs(settings_cls: type) -> dict[str, Any]:
+    # Как arq: только собственные атрибуты класса
+    return get_kwargs(dict(vars(settings_cls)))
+
+
+@pytest.mark.unit
+def test_bulk_worker_settings_pass_shared_options_to_arq():
+    transactional = _worker_kwargs(WorkerSettings)
+    bulk = _worker_kwargs(BulkWorkerSettings)
+
+    assert bulk.keys() == transactional.keys()
+    assert bulk["queue_name"] == ArqQueues.BULK
+    assert bulk["functions"] is transactional["functions"]
+    assert bulk["on_startup"] is transactional["on_startup"]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("settings_cls", [WorkerSettings, BulkWorkerSettings])
+async def test_running_job_finishes_after_sigterm(settings_cls: type):
+    # Worker не подключается к Redis до запуска: проверяется только обработка сигнала
+    worker = Worker(**_worker_kwargs(settings_cls))
+    loop = asyncio.get_running_loop()
+
+    async def send_notification() -> str:
+        await asyncio.sleep(0.2)
+        return "sent"
+
+    async def poll_queue() -> None:
+        await asyncio.Event().wait()
+
+    # Как в arq: задача убирается из worker.tasks по завершении
+    job = asyncio.create_task(send_notification())
+    job.add_done_callback(lambda _: worker.tasks.pop("job", None))
+    worker.tasks["job"] = job
+    worker.main_task = asyncio.create_task(poll_queue())
+    try:
+        os.kill(os.getpid(), signal.SIGTERM)
+        with pytest.raises(asyncio.CancelledError):
+            await worker.main_task
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        loop.remove_signal_handler(signal.SIGINT)
+
+    assert not worker.allow_pick_jobs
+    assert not job.cancelled() and job.result() == "sent"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("settings_cls", [WorkerSettings, BulkWorkerSettings])
+def test_worker_settings_set_arq_max_tries(settings_cls: type):
+    assert _worker_kwargs(settings_cls)["max_tries"] == settings.arq_max_tries